@@ -2,10 +2,38 @@
 # Date: November 2021
 # Description: Basic functionality for simple Janggi Ai
 import JanggiGame
+import itertools
+import multiprocessing
+import os
+import time
+from array import array
+from collections import namedtuple
 from heapq import heappop, heappush
 
 COLOR_SWITCH = {'blue':'red', 'red':'blue'}
 
+#Material value of each piece type, indexed by type code, used for ordering captures
+PIECE_VALUES = JanggiGame.DEFAULT_PIECE_VALUES
+MATE_SCORE = 100000
+MAX_SEARCH_DEPTH = 64
+DEFAULT_SEARCH_DEPTH = 3
+DEFAULT_TABLE_MB = 16
+#Size of the table each parallel search worker process keeps
+PARALLEL_TABLE_MB = 4
+
+#Bound types stored in the transposition table (never 0 so a stored entry is never all zero)
+EXACT_BOUND = 1
+LOWER_BOUND = 2
+UPPER_BOUND = 3
+
+#The pass the search tries (last) whenever the player to move is not in check
+PASS_MOVE = JanggiGame.PASS_MOVE
+
+#What search returns: the best Move (None if there are no legal moves, PASS_MOVE to pass), its score
+# for the player to move, the deepest completed depth, the principal variation as a list of Moves
+# and nodes searched.
+SearchResult = namedtuple('SearchResult', ['move', 'score', 'depth', 'pv', 'nodes'])
+
 def ai_move_simple(board: JanggiGame, color: str):
     """
     Given a janggi board object and a string for the color of the player ('blue' or 'red')
@@ -23,52 +51,492 @@ def ai_move_simple(board: JanggiGame, color: str):
     if color != board.get_whose_turn():
         return None
 
-    game_board = board.get_board()
+    in_check = board.is_in_check(color)
     move_list = list()
-    for i in range(len(game_board)):
-        for j in range(len(game_board[0])):
-            #i will be current row, j current col
-            if game_board[i][j] and game_board[i][j].get_color() == color:
-                possible_moves = board.list_moves((i,j))
-                piece_pos = board.convert_loc_to_str(i,j)
-                for move in possible_moves:
-                    if move != piece_pos:
-                        prioritize_move(board, piece_pos, move, move_list, color)
+    for move in board.generate_legal_moves(color):
+        prioritize_move(board, move, move_list, color, in_check)
     print(move_list)
     return move_list
 
 
-def prioritize_move(board, piece_pos, move, move_list, color):
-    """Given the JanggiBoard, the source piece, potential move and the priority queue of moves
-    applies the heuristic and pushes the move to the queue if it is valid
+def prioritize_move(board, move, move_list, color, in_check):
+    """Given the JanggiBoard, a legal Move from generate_legal_moves, the priority queue of moves
+    and whether the player is in check, applies the heuristic and pushes the move to the queue
+    as a tuple of priority then source and destination strings.
     HELPER FOR ai_move_simple"""
-    in_check = board.is_in_check(color)
-    # For each potential move, try it with try move
-    state_to_restore = board.try_move(piece_pos, move)
+    piece_pos = JanggiGame.SQUARE_NAMES[move.origin]
+    destination = JanggiGame.SQUARE_NAMES[move.destination]
 
-    # if we are in check and it results in getting out of check push with priority 0
+    # if we are in check every legal move gets us out of check, so push with priority 0
     if in_check:
-        if not board.is_in_check(color):
-            heappush(move_list, (0, piece_pos, move))
-        board.restore_board(state_to_restore)
+        heappush(move_list, (0, piece_pos, destination))
         return
 
+    # try the move with push_move, every path below takes it back with pop_move
+    board.push_move(move.origin, move.destination)
+
     # if it makes result desired color wins push move with 1 priority
     # if results in opponent being in check push with priority 2
     if board.is_in_check(COLOR_SWITCH[color]):
         if board.is_in_checkmate(COLOR_SWITCH[color]):
-            heappush(move_list, (1, piece_pos, move))
-            board.restore_board(state_to_restore)
+            heappush(move_list, (1, piece_pos, destination))
+            board.pop_move()
             return
-        heappush(move_list, (2, piece_pos, move))
-        board.restore_board(state_to_restore)
+        heappush(move_list, (2, piece_pos, destination))
+        board.pop_move()
         return
-    # restore board
-    board.restore_board(state_to_restore)
+    # take the move back
+    board.pop_move()
 
-    target_piece = board.get_piece(move)
     # after the try-move possibilites check if move captures an opponents piece (priority 3)
-    if target_piece and target_piece.get_color() == COLOR_SWITCH[color]:
-        heappush(move_list, (3, piece_pos, move))
-    if not target_piece:
-        heappush(move_list, (5, piece_pos, move))
\ No newline at end of file
+    if board.get_piece(destination):
+        heappush(move_list, (3, piece_pos, destination))
+    else:
+        heappush(move_list, (5, piece_pos, destination))
+
+
+def evaluate(board, color):
+    """
+    Given a janggi board object and a color ('blue' or 'red') returns the static score of the
+    position for that color, read from the board's incrementally kept material and piece-square scores.
+    """
+    return board.evaluation(color)
+
+
+def search(board, depth=None, time_limit=None, table=None, stop_event=None):
+    """
+    Searches the position for the player whose turn it is with negamax alpha-beta and
+    iterative deepening, one ply deeper each iteration until it reaches depth or runs out of
+    time_limit seconds of wall-clock time (whichever comes first). With neither given it searches
+    DEFAULT_SEARCH_DEPTH plies. Returns a SearchResult from the deepest iteration that finished,
+    an iteration cut short by the clock is thrown away (unless it was the first). The board is left
+    as it was found. Pass a TranspositionTable as table to keep what was learned between searches,
+    otherwise a new DEFAULT_TABLE_MB table is made for this search. Setting stop_event (a
+    threading.Event), from another thread say, stops the search as running out of time would.
+    """
+    if depth is None:
+        depth = DEFAULT_SEARCH_DEPTH if time_limit is None else MAX_SEARCH_DEPTH
+    if table is None:
+        table = TranspositionTable(DEFAULT_TABLE_MB)
+    table.new_search()
+    return AlphaBetaSearch(board, time_limit, table, stop_event).run(depth)
+
+
+def search_moves(board):
+    """
+    Returns the list of Moves the search tries for the player to move: every legal move, then
+    PASS_MOVE if they are not in check (passing is legal in Janggi, and sometimes the best move).
+    """
+    return board.generate_legal_moves(board.get_whose_turn(), True)
+
+
+def make_search_pool(workers=None, table_mb=PARALLEL_TABLE_MB):
+    """
+    Returns a multiprocessing.Pool of workers processes (default one per cpu) for search_parallel,
+    each process allocating a table_mb TranspositionTable once and reusing it for every task.
+    """
+    return multiprocessing.Pool(workers, initializer=_init_search_worker, initargs=(table_mb,))
+
+
+def search_parallel(board, depth=None, time_limit=None, workers=None, pool=None, table_mb=PARALLEL_TABLE_MB):
+    """
+    Same as search but splits the root moves across a multiprocessing pool of worker processes
+    (workers of them, default one per cpu). Pass a pool from make_search_pool as pool to reuse its
+    processes between searches, otherwise a pool is started and closed for this search.
+    Each iteration searches the first root move with a full window, then every other root move at
+    once with a null window around its score, then re-searches the ones that beat it. A task is
+    just the position's notation and a root move. Each worker keeps one table_mb table, emptied
+    before every task, and a task deepens one ply at a time within its window to fill it, so what a
+    task returns never depends on which worker ran it or what that worker ran before. Results are
+    merged in root move order (ties go to the earlier move), so without a time_limit the result is
+    the same however many workers there are.
+    """
+    if depth is None:
+        depth = DEFAULT_SEARCH_DEPTH if time_limit is None else MAX_SEARCH_DEPTH
+    #Wall-clock deadline, perf_counter can't be compared between processes
+    deadline = None if time_limit is None else time.time() + time_limit
+    root_moves = search_moves(board)
+    if not root_moves:
+        return search(board, 1)
+    weights = board.get_weights()
+    root = (type(board), board.to_notation(), None if weights is JanggiGame.DEFAULT_WEIGHTS else weights,
+            (os.getpid(), next(_search_ids)), table_mb)
+    if pool is None:
+        with make_search_pool(workers, table_mb) as pool:
+            return _parallel_root_search(root, root_moves, depth, deadline, pool)
+    return _parallel_root_search(root, root_moves, depth, deadline, pool)
+
+
+#Numbers each parallel search so its workers know when to set up a new root position
+_search_ids = itertools.count()
+
+
+def _parallel_root_search(root, root_moves, max_depth, deadline, pool):
+    """Iterative deepening loop of search_parallel, returns a SearchResult."""
+    result = SearchResult(root_moves[0], 0, 0, [root_moves[0]], 0)
+    nodes = 0
+    for depth in range(1, max_depth + 1):
+        best_index, score, pv, iteration_nodes = _parallel_root_iteration(root, root_moves, depth,
+                                                                          deadline, pool)
+        nodes += iteration_nodes
+        if best_index is None:
+            break
+        result = SearchResult(pv[0], score, depth, pv, nodes)
+        #The best move is searched first (with the full window) next iteration
+        root_moves.insert(0, root_moves.pop(best_index))
+        if abs(score) >= MATE_SCORE - MAX_SEARCH_DEPTH:
+            break
+    return result._replace(nodes=nodes)
+
+
+def _parallel_root_iteration(root, root_moves, depth, deadline, pool):
+    """
+    Searches every root move depth plies deep across the pool. Returns the index of the best root
+    move, its score and principal variation and the nodes searched, with None for the index (and
+    score and pv) if the time ran out before the iteration finished.
+    """
+    nodes = 0
+
+    def run_tasks(indices, alpha, beta):
+        nonlocal nodes
+        if deadline is not None and deadline <= time.time():
+            return None
+        tasks = [(root, root_moves[index], depth, alpha, beta, deadline) for index in indices]
+        outcomes = list()
+        for outcome, task_nodes in pool.map(_search_root_move, tasks, chunksize=1):
+            nodes += task_nodes
+            if outcome is None:
+                return None
+            outcomes.append(outcome)
+        return outcomes
+
+    first = run_tasks([0], -MATE_SCORE - 1, MATE_SCORE + 1)
+    if first is None:
+        return None, None, None, nodes
+    best_index = 0
+    best_score, best_pv = first[0]
+
+    others = range(1, len(root_moves))
+    scouts = run_tasks(others, best_score, best_score + 1)
+    if scouts is None:
+        return None, None, None, nodes
+    failed_high = [index for index, (score, pv) in zip(others, scouts) if score > best_score]
+    if failed_high:
+        researches = run_tasks(failed_high, best_score, MATE_SCORE + 1)
+        if researches is None:
+            return None, None, None, nodes
+        for index, (score, pv) in zip(failed_high, researches):
+            if score > best_score:
+                best_index, best_score, best_pv = index, score, pv
+    return best_index, best_score, best_pv, nodes
+
+
+#Worker process state for search_parallel: the process's table, the search it last ran a task for
+# and that search's root position
+_worker_table = None
+_worker_search = None
+_worker_board = None
+
+
+def _init_search_worker(table_mb):
+    """Pool initializer for search_parallel workers, allocates the process's table."""
+    global _worker_table
+    _worker_table = TranspositionTable(table_mb)
+
+
+def _search_root_move(task):
+    """
+    Worker side of search_parallel: makes the root move on the worker's copy of the root position
+    and searches the reply within the window, starting from an empty table. The first task of a new
+    search sets up the root position from its notation. Returns ((score, pv) or None if out of time, nodes).
+    """
+    global _worker_search, _worker_board
+    (game_class, notation, weights, search_id, table_mb), move, depth, alpha, beta, deadline = task
+    time_limit = None if deadline is None else deadline - time.time()
+    if time_limit is not None and time_limit <= 0:
+        return None, 0
+    if _worker_table is None:
+        #A pool that wasn't made by make_search_pool
+        _init_search_worker(table_mb)
+    if search_id != _worker_search:
+        _worker_board = game_class.from_notation(notation, weights=weights)
+        _worker_search = search_id
+    #Nothing is kept from earlier tasks, they may have been for other root moves or windows
+    _worker_table.clear()
+    _worker_table.new_search()
+    board = _worker_board
+    board.push_move(move.origin, move.destination)
+    searcher = AlphaBetaSearch(board, time_limit, _worker_table)
+    outcome = searcher.run_window(depth - 1, -beta, -alpha, 1)
+    board.pop_move()
+    if outcome is None:
+        return None, searcher.get_nodes()
+    score, pv = outcome
+    return (-score, [move] + pv), searcher.get_nodes()
+
+
+class TranspositionTable:
+    """
+    Fixed size table of search results keyed by JanggiGame.position_hash(). All memory is
+    allocated up front as two flat arrays of 64 bit words (the keys and the packed entries) so it
+    never grows. Entries sit in buckets of two: the first slot keeps the deepest result (unless it is
+    left over from an earlier search) and the second is always replaced.
+    A packed entry holds, from the low bits up: the move (14 bits, origin * 90 + destination + 1,
+    0 for none), bound type (2 bits), depth (8 bits), search generation (8 bits) and score (offset to
+    be positive).
+    """
+
+    _ENTRY_BYTES = 16
+    _SCORE_OFFSET = 1 << 20
+
+    def __init__(self, size_mb=DEFAULT_TABLE_MB):
+        """Allocates a table using about size_mb megabytes."""
+        self._bucket_count = max(1, int(size_mb * (1 << 20)) // (2 * self._ENTRY_BYTES))
+        self._keys = array('Q', bytes(16 * self._bucket_count))
+        self._entries = array('Q', bytes(16 * self._bucket_count))
+        self._generation = 0
+
+    def __len__(self):
+        """Returns the number of slots in the table."""
+        return len(self._keys)
+
+    def new_search(self):
+        """Marks the start of a new search so results from earlier searches are replaced first."""
+        self._generation = (self._generation + 1) & 0xFF
+
+    def clear(self):
+        """Empties the table without giving back its memory."""
+        empty = array('Q', bytes(8 * len(self._keys)))
+        self._keys[:] = empty
+        self._entries[:] = empty
+
+    def probe(self, key):
+        """
+        Looks up a position hash, returns a (depth, score, bound, move) tuple for it (move a Move or
+        None) or None if the position isn't stored.
+        """
+        index = (key % self._bucket_count) * 2
+        keys = self._keys
+        if keys[index] != key:
+            index += 1
+            if keys[index] != key:
+                return None
+        entry = self._entries[index]
+        if not entry:
+            return None
+        move_code = entry & 0x3FFF
+        move = JanggiGame.Move(*divmod(move_code - 1, JanggiGame.BOARD_SIZE)) if move_code else None
+        return ((entry >> 16) & 0xFF, (entry >> 32) - self._SCORE_OFFSET, (entry >> 14) & 0x3, move)
+
+    def store(self, key, depth, score, bound, move):
+        """Stores a search result for the position hash, following the bucket replacement policy."""
+        index = (key % self._bucket_count) * 2
+        keys = self._keys
+        entries = self._entries
+        if keys[index] != key:
+            stored = entries[index]
+            #Keep the deeper result from this search in the first slot, push the new one to the second
+            if stored and (stored >> 24) & 0xFF == self._generation and (stored >> 16) & 0xFF > depth:
+                index += 1
+        move_code = 0 if move is None else move.origin * JanggiGame.BOARD_SIZE + move.destination + 1
+        keys[index] = key
+        entries[index] = ((score + self._SCORE_OFFSET) << 32) | (self._generation << 24) | (depth << 16) | \
+            (bound << 14) | move_code
+
+
+class MoveOrdering:
+    """
+    Orders the moves at each node of a search so the best ones are likely to be searched first,
+    which is what lets alpha-beta prune. The order is: the hash move from the transposition table,
+    captures ranked by most valuable victim then least valuable attacker (MVV-LVA), the two killer
+    moves remembered for this ply, then every other quiet move by its history score.
+    """
+
+    _HASH_MOVE_RANK = 1 << 30
+    _CAPTURE_RANK = 1 << 24
+    _KILLER_RANK = 1 << 22
+    _HISTORY_LIMIT = 1 << 20
+
+    def __init__(self):
+        """Starts with no killer moves and an empty history table."""
+        self._killers = [[None, None] for ply in range(MAX_SEARCH_DEPTH + 1)]
+        #history score of each quiet move, indexed origin * 90 + destination
+        self._history = [0] * (JanggiGame.BOARD_SIZE * JanggiGame.BOARD_SIZE)
+
+    def order(self, square_codes, moves, hash_move, ply):
+        """
+        Takes the board's square codes, a list of legal Moves, the hash move (or None) and the ply,
+        and sorts the moves in place best first.
+        """
+        killers = self._killers[ply]
+        history = self._history
+
+        def rank(move):
+            if move == hash_move:
+                return self._HASH_MOVE_RANK
+            victim = square_codes[move.destination]
+            if victim:
+                attacker = square_codes[move.origin]
+                return self._CAPTURE_RANK + PIECE_VALUES[victim & JanggiGame.TYPE_MASK] * 16 - \
+                    PIECE_VALUES[attacker & JanggiGame.TYPE_MASK] // 100
+            if move == killers[0]:
+                return self._KILLER_RANK + 1
+            if move == killers[1]:
+                return self._KILLER_RANK
+            return history[move.origin * JanggiGame.BOARD_SIZE + move.destination]
+
+        moves.sort(key=rank, reverse=True)
+
+    def record_cutoff(self, move, depth, ply):
+        """Records a quiet move that caused a beta cutoff as a killer for its ply and in the history table."""
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        index = move.origin * JanggiGame.BOARD_SIZE + move.destination
+        self._history[index] += depth * depth
+        if self._history[index] > self._HISTORY_LIMIT:
+            #Halve everything so old cutoffs fade and scores stay below the killer rank
+            self._history = [score // 2 for score in self._history]
+
+
+class AlphaBetaSearch:
+    """
+    A single negamax alpha-beta search over a JanggiGame, made with push_move/pop_move so the
+    board is never copied. Use search() rather than making these directly.
+    """
+
+    def __init__(self, board, time_limit, table, stop_event=None):
+        """
+        Takes the game to search, an optional wall-clock budget in seconds, a TranspositionTable
+        and an optional threading.Event that stops the search once it is set.
+        """
+        self._board = board
+        self._deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self._stop_event = stop_event
+        self._table = table
+        self._ordering = MoveOrdering()
+        self._stopped = False
+        self._nodes = 0
+        #triangular principal variation table, _pv[ply] is the best line found from that ply
+        self._pv = [list() for ply in range(MAX_SEARCH_DEPTH + 1)]
+
+    def run(self, max_depth):
+        """Runs the iterative deepening loop up to max_depth plies and returns a SearchResult."""
+        board = self._board
+        root_moves = search_moves(board)
+        if not root_moves:
+            return SearchResult(None, -MATE_SCORE, 0, list(), 0)
+
+        result = SearchResult(root_moves[0], 0, 0, [root_moves[0]], 0)
+        for depth in range(1, max_depth + 1):
+            score = self._negamax(depth, -MATE_SCORE - 1, MATE_SCORE + 1, 0)
+            if self._stopped and depth > 1:
+                break
+            pv = list(self._pv[0]) or result.pv
+            result = SearchResult(pv[0], score, depth, pv, self._nodes)
+            #Once a forced mate is found searching deeper can't change the outcome
+            if self._stopped or abs(score) >= MATE_SCORE - MAX_SEARCH_DEPTH:
+                break
+        return result._replace(nodes=self._nodes)
+
+    def get_nodes(self):
+        """Returns the number of nodes searched so far."""
+        return self._nodes
+
+    def run_window(self, depth, alpha, beta, ply):
+        """
+        Searches the board one ply deeper at a time up to depth plies, within the alpha-beta window,
+        as if it were ply plies below the root, so the shallower searches fill the table with hash
+        moves for the deeper ones. Returns the score and principal variation of the depth plies
+        search, or None if the time ran out first. Used by the parallel root search.
+        """
+        for iteration_depth in range(min(depth, 1), depth + 1):
+            score = self._negamax(iteration_depth, alpha, beta, ply)
+            if self._stopped:
+                return None
+        return score, list(self._pv[ply])
+
+    def _out_of_time(self):
+        """Checks the clock and stop event every 1024 nodes, returns True once the search should stop."""
+        if self._nodes & 1023 == 0 and \
+                ((self._deadline is not None and time.perf_counter() >= self._deadline) or
+                 (self._stop_event is not None and self._stop_event.is_set())):
+            self._stopped = True
+        return self._stopped
+
+    def _negamax(self, depth, alpha, beta, ply):
+        """
+        Returns the score of the position for the player to move searched depth plies deep,
+        within the alpha-beta window, filling in _pv[ply]. Results are stored in and reused
+        from the transposition table, its best move is searched first.
+        """
+        self._nodes += 1
+        self._pv[ply] = list()
+        if self._out_of_time():
+            return 0
+
+        board = self._board
+        key = board.position_hash()
+        hash_move = None
+        entry = self._table.probe(key)
+        if entry is not None:
+            stored_depth, stored_score, bound, hash_move = entry
+            if stored_depth >= depth and ply > 0:
+                #Mate scores are stored relative to the position, put them back relative to the root
+                if stored_score >= MATE_SCORE - MAX_SEARCH_DEPTH:
+                    stored_score -= ply
+                elif stored_score <= -MATE_SCORE + MAX_SEARCH_DEPTH:
+                    stored_score += ply
+                if bound == EXACT_BOUND or (bound == LOWER_BOUND and stored_score >= beta) or \
+                        (bound == UPPER_BOUND and stored_score <= alpha):
+                    if hash_move is not None:
+                        self._pv[ply] = [hash_move]
+                    return stored_score
+
+        color = board.get_whose_turn()
+        if depth == 0 or ply >= MAX_SEARCH_DEPTH:
+            return evaluate(board, color)
+        moves = board.generate_legal_moves(color, True)
+        if not moves:
+            return -MATE_SCORE + ply
+        can_pass = moves[-1] == PASS_MOVE
+        if can_pass:
+            moves.pop()
+
+        square_codes = board.get_square_codes()
+        self._ordering.order(square_codes, moves, hash_move, ply)
+        #Passing is tried last, it is only best when every move makes things worse
+        if can_pass:
+            moves.append(PASS_MOVE)
+
+        original_alpha = alpha
+        best_move = None
+        for move in moves:
+            board.push_move(move.origin, move.destination)
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            board.pop_move()
+            if self._stopped:
+                return 0
+            if score > alpha:
+                alpha = score
+                best_move = move
+                self._pv[ply] = [move] + self._pv[ply + 1]
+                if alpha >= beta:
+                    if not square_codes[move.destination] and move != PASS_MOVE:
+                        self._ordering.record_cutoff(move, depth, ply)
+                    break
+
+        if alpha >= beta:
+            bound = LOWER_BOUND
+        elif alpha > original_alpha:
+            bound = EXACT_BOUND
+        else:
+            bound = UPPER_BOUND
+        stored_score = alpha
+        if stored_score >= MATE_SCORE - MAX_SEARCH_DEPTH:
+            stored_score += ply
+        elif stored_score <= -MATE_SCORE + MAX_SEARCH_DEPTH:
+            stored_score -= ply
+        self._table.store(key, depth, stored_score, bound, best_move or hash_move)
+        return alpha
@@ -0,0 +1,255 @@
+# Author: Stew Towle
+# Date: November 2022
+# Description: Micro-benchmarks for the hot JanggiGame and JanggiAi calls. Times make_move,
+#       is_in_check, _is_in_checkmate, list_moves and ai_move_simple call by call over a fixed
+#       corpus of middle-game and near-mate positions and reports percentiles in microseconds.
+#       make_move_check times only the moves that give check, which is the path that has to
+#       look for checkmate. Results can be saved as a JSON baseline that later runs compare
+#       against to flag regressions. Run as a script for the CLI:
+#           python JanggiBench.py --save baseline.json
+#           python JanggiBench.py --compare baseline.json
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+
+import JanggiAi
+import JanggiBitboard
+import JanggiGame
+import JanggiPerft
+
+#The corpus is every position along these perft test lines from CORPUS_FIRST_PLY moves in
+CORPUS_LINES = ('middlegame', 'palace', 'near_mate')
+CORPUS_FIRST_PLY = 10
+
+PERCENTILES = (50, 90, 99)
+DEFAULT_TOLERANCE = 0.25
+
+
+def build_corpus():
+    """Returns a list of the corpus positions in JanggiGame notation."""
+    corpus = list()
+    for name in CORPUS_LINES:
+        game = JanggiGame.JanggiGame()
+        for ply, (origin, destination) in enumerate(JanggiPerft.TEST_POSITIONS[name][0], 1):
+            game.make_move(origin, destination)
+            if ply >= CORPUS_FIRST_PLY:
+                corpus.append(game.to_notation())
+    return corpus
+
+
+def load_game(notation, game_class=JanggiGame.JanggiGame):
+    """Returns a new game of game_class (JanggiGame or a subclass) set up at the position in notation."""
+    return game_class.from_notation(notation)
+
+
+def _move_names(move):
+    """Returns the (origin, destination) square names of a Move."""
+    return JanggiGame.SQUARE_NAMES[move.origin], JanggiGame.SQUARE_NAMES[move.destination]
+
+
+def _gives_check(game, move):
+    """Returns True if the player to move puts the opponent in check with the given Move."""
+    opponent = JanggiAi.COLOR_SWITCH[game.get_whose_turn()]
+    game.push_move(move.origin, move.destination)
+    check = game.is_in_check(opponent)
+    game.pop_move()
+    return check
+
+
+def _time_call(function, *arguments):
+    """Returns how long one call of function took in nanoseconds."""
+    start = time.perf_counter_ns()
+    function(*arguments)
+    return time.perf_counter_ns() - start
+
+
+def bench_make_move(corpus, game_class, checks_only=False):
+    """
+    Times make_move for every legal move of every corpus position (only the moves that give
+    check if checks_only). Each move is made on a freshly loaded game, loading isn't timed.
+    """
+    times = list()
+    for notation in corpus:
+        game = load_game(notation, game_class)
+        for move in game.generate_legal_moves(game.get_whose_turn()):
+            if checks_only and not _gives_check(game, move):
+                continue
+            fresh = load_game(notation, game_class)
+            times.append(_time_call(fresh.make_move, *_move_names(move)))
+    return times
+
+
+def bench_is_in_check(corpus, game_class):
+    """Times is_in_check for both players of every corpus position."""
+    times = list()
+    for notation in corpus:
+        game = load_game(notation, game_class)
+        for color in ('blue', 'red'):
+            times.append(_time_call(game.is_in_check, color))
+    return times
+
+
+def bench_is_in_checkmate(corpus, game_class):
+    """
+    Times _is_in_checkmate for the checked player after every checking move of every corpus
+    position, the positions where it can't stop at the is_in_check test.
+    """
+    times = list()
+    for notation in corpus:
+        game = load_game(notation, game_class)
+        opponent = JanggiAi.COLOR_SWITCH[game.get_whose_turn()]
+        for move in game.generate_legal_moves(game.get_whose_turn()):
+            game.push_move(move.origin, move.destination)
+            if game.is_in_check(opponent):
+                times.append(_time_call(game._is_in_checkmate, opponent))
+            game.pop_move()
+    return times
+
+
+def bench_list_moves(corpus, game_class):
+    """Times list_moves for every piece of every corpus position."""
+    times = list()
+    for notation in corpus:
+        game = load_game(notation, game_class)
+        board = game.get_board()
+        for row in range(JanggiGame.BOARD_ROWS):
+            for col in range(JanggiGame.BOARD_COLS):
+                if board[row][col] is not None:
+                    times.append(_time_call(game.list_moves, (row, col)))
+    return times
+
+
+def bench_ai_move_simple(corpus, game_class):
+    """Times ai_move_simple for the player to move in every corpus position (its printing muted)."""
+    times = list()
+    for notation in corpus:
+        game = load_game(notation, game_class)
+        with contextlib.redirect_stdout(io.StringIO()):
+            times.append(_time_call(JanggiAi.ai_move_simple, game, game.get_whose_turn()))
+    return times
+
+
+BENCHMARKS = {
+    'make_move': bench_make_move,
+    'make_move_check': lambda corpus, game_class: bench_make_move(corpus, game_class, checks_only=True),
+    'is_in_check': bench_is_in_check,
+    '_is_in_checkmate': bench_is_in_checkmate,
+    'list_moves': bench_list_moves,
+    'ai_move_simple': bench_ai_move_simple,
+}
+
+
+def percentile(sorted_times, percent):
+    """Returns the nearest-rank percentile of an ascending list of times."""
+    rank = max(1, -(-len(sorted_times) * percent // 100))
+    return sorted_times[rank - 1]
+
+
+def summarize(times):
+    """Returns a dict of the call count, mean, percentiles and max of a list of times, in microseconds."""
+    ordered = sorted(times)
+    summary = {'calls': len(ordered)}
+    if not ordered:
+        return summary
+    summary['mean'] = sum(ordered) / len(ordered) / 1000
+    for percent in PERCENTILES:
+        summary['p' + str(percent)] = percentile(ordered, percent) / 1000
+    summary['max'] = ordered[-1] / 1000
+    return summary
+
+
+def run_benchmarks(names=None, repeat=1, game_class=JanggiGame.JanggiGame):
+    """
+    Runs the named benchmarks (default all) over the corpus repeat times each, on games of
+    game_class (JanggiGame or a subclass), and returns a dict of benchmark name to its summary.
+    """
+    corpus = build_corpus()
+    results = dict()
+    for name in names or list(BENCHMARKS):
+        times = list()
+        for _ in range(repeat):
+            times.extend(BENCHMARKS[name](corpus, game_class))
+        results[name] = summarize(times)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns a list of (benchmark, statistic, baseline, current) for every median or p90 that is
+    more than tolerance (a fraction) slower than the baseline's.
+    """
+    regressions = list()
+    for name, summary in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for statistic in ('p50', 'p90'):
+            if statistic in summary and statistic in previous and \
+                    summary[statistic] > previous[statistic] * (1 + tolerance):
+                regressions.append((name, statistic, previous[statistic], summary[statistic]))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    """Prints a table of the results, with the change against the baseline's median if given."""
+    columns = ['mean'] + ['p' + str(percent) for percent in PERCENTILES] + ['max']
+    print(f"{'benchmark':<18}{'calls':>7}" + ''.join(f"{column + ' us':>11}" for column in columns))
+    for name, summary in results.items():
+        line = f"{name:<18}{summary['calls']:>7}"
+        line += ''.join(f"{summary[column]:>11.1f}" if column in summary else f"{'-':>11}"
+                        for column in columns)
+        if baseline and 'p50' in baseline.get(name, {}) and 'p50' in summary:
+            line += f"  {summary['p50'] / baseline[name]['p50'] - 1:+.0%} p50"
+        print(line)
+
+
+def main(arguments=None):
+    """Runs the benchmark CLI, returns 1 if a regression against the baseline was found, 0 otherwise."""
+    parser = argparse.ArgumentParser(description="Time the hot JanggiGame and JanggiAi calls.")
+    parser.add_argument('--only', choices=list(BENCHMARKS), action='append',
+                        help="benchmark to run (repeatable, default all)")
+    parser.add_argument('--repeat', type=int, default=3, help="passes over the corpus (default 3)")
+    parser.add_argument('--save', metavar='PATH', help="write the results to a JSON baseline file")
+    parser.add_argument('--compare', metavar='PATH', help="compare against a JSON baseline file")
+    parser.add_argument('--bitboard', action='store_true', help="time JanggiBitboard.BitboardJanggiGame")
+    parser.add_argument('--move-cache', type=int, metavar='SIZE',
+                        help="turn on each game's move list cache with room for SIZE lists")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="slowdown allowed before flagging a regression (default 0.25)")
+    options = parser.parse_args(arguments)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baseline = json.load(baseline_file)['benchmarks']
+
+    game_class = JanggiBitboard.BitboardJanggiGame if options.bitboard else JanggiGame.JanggiGame
+    if options.move_cache is not None:
+        JanggiGame.MOVE_CACHE_SIZE = options.move_cache
+    results = run_benchmarks(options.only, options.repeat, game_class)
+    print_results(results, baseline)
+
+    if options.save:
+        with open(options.save, 'w') as baseline_file:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'repeat': options.repeat, 'move_cache': JanggiGame.MOVE_CACHE_SIZE,
+                       'game_class': game_class.__name__, 'benchmarks': results}, baseline_file, indent=2)
+        print("baseline saved to", options.save)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, options.tolerance)
+        for name, statistic, previous, current in regressions:
+            print(f"REGRESSION {name} {statistic}: {previous:.1f}us -> {current:.1f}us")
+        if regressions:
+            return 1
+        print("no regressions against", options.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# Author: Stew Towle
+# Date: November 2022
+# Description: Optional bitboard version of JanggiGame. BitboardJanggiGame keeps the same board
+#       and API as JanggiGame (it is a subclass, anything that takes a JanggiGame takes one) but
+#       also keeps the occupancy of the board as 90 bit Python ints, bit n for square n: one for
+#       all pieces, one per color and one per piece code. Chariot and cannon moves and attacks
+#       then find the nearest piece along each ray (orthogonals and palace diagonals) with a mask
+#       and a lowest/highest bit lookup instead of stepping one square at a time. Pick it in the
+#       benchmarks with --bitboard:
+#           python JanggiPerft.py --bitboard
+#           python JanggiBench.py --bitboard --compare baseline.json
+
+import JanggiGame
+from JanggiGame import CANNON, CHARIOT, COLOR_MASK, EMPTY, RED, TYPE_MASK
+
+
+def _build_ray_masks():
+    """
+    Builds the bitboard version of JanggiGame's rays, once at import. For each square number a
+    tuple of (ray, mask, step, increasing) for each of its rays: the ray's squares nearest first,
+    the mask of their bits, the square number step from one to the next, and whether the squares
+    go up (so the nearest piece on the ray is its lowest set bit) or down (its highest).
+    Also returns the union of every ray's mask for each square.
+    """
+    ray_masks = list()
+    unions = list()
+    for square, rays in enumerate(JanggiGame._RAYS):
+        square_rays = list()
+        union = 0
+        for ray in rays:
+            mask = 0
+            for ray_square in ray:
+                mask |= 1 << ray_square
+            square_rays.append((ray, mask, ray[0] - square, ray[0] > square))
+            union |= mask
+        ray_masks.append(tuple(square_rays))
+        unions.append(union)
+    return tuple(ray_masks), tuple(unions)
+
+
+_RAY_MASKS, _RAY_UNIONS = _build_ray_masks()
+
+
+def _nearest(bits, increasing):
+    """Returns the square number of the set bit nearest the start of a ray (lowest if increasing, else highest)."""
+    if increasing:
+        return (bits & -bits).bit_length() - 1
+    return bits.bit_length() - 1
+
+
+def _beyond(bits, square, increasing):
+    """Returns the set bits of bits that are further along a ray than square."""
+    if increasing:
+        return bits & ~((2 << square) - 1)
+    return bits & ((1 << square) - 1)
+
+
+class BitboardJanggiGame(JanggiGame.JanggiGame):
+    """
+    A JanggiGame that also keeps bitboards of the pieces and uses them for chariot and cannon
+    move generation and attack detection. Everything else, and every result, is the same as
+    JanggiGame's.
+    """
+
+    def _set_up(self, board, turn, counters, debug, weights):
+        """Sets up the game as JanggiGame does, then builds the bitboards from the board."""
+        self._occupied = 0
+        #Occupancy of each color keyed by color code, and of each piece code (indexed by code)
+        self._color_bits = {JanggiGame.BLUE: 0, RED: 0}
+        self._piece_bits = [0] * (COLOR_MASK * 2)
+        for square, code in enumerate(board):
+            if code:
+                bit = 1 << square
+                self._occupied |= bit
+                self._color_bits[code & COLOR_MASK] |= bit
+                self._piece_bits[code] |= bit
+        super()._set_up(board, turn, counters, debug, weights)
+
+    def push_move(self, origin, destination):
+        """Makes the move as JanggiGame.push_move does, keeping the bitboards up to date."""
+        if origin != destination:
+            board = self._board
+            moving = board[origin]
+            captured = board[destination]
+            origin_bit = 1 << origin
+            destination_bit = 1 << destination
+            if captured:
+                self._color_bits[captured & COLOR_MASK] ^= destination_bit
+                self._piece_bits[captured] ^= destination_bit
+                self._occupied ^= origin_bit
+            else:
+                self._occupied ^= origin_bit | destination_bit
+            self._color_bits[moving & COLOR_MASK] ^= origin_bit | destination_bit
+            self._piece_bits[moving] ^= origin_bit | destination_bit
+        super().push_move(origin, destination)
+
+    def pop_move(self):
+        """Takes back the last move as JanggiGame.pop_move does, keeping the bitboards up to date."""
+        origin, destination, captured = self._move_stack[-1][:3]
+        if origin != destination:
+            moving = self._board[destination]
+            origin_bit = 1 << origin
+            destination_bit = 1 << destination
+            if captured:
+                self._color_bits[captured & COLOR_MASK] ^= destination_bit
+                self._piece_bits[captured] ^= destination_bit
+                self._occupied ^= origin_bit
+            else:
+                self._occupied ^= origin_bit | destination_bit
+            self._color_bits[moving & COLOR_MASK] ^= origin_bit | destination_bit
+            self._piece_bits[moving] ^= origin_bit | destination_bit
+        return super().pop_move()
+
+    def _check_consistency(self):
+        """Checks everything JanggiGame._check_consistency does, and that the bitboards match the board."""
+        super()._check_consistency()
+        for square, code in enumerate(self._board):
+            bit = 1 << square
+            if bool(self._occupied & bit) != bool(code) or \
+                    any(bool(bits & bit) != (piece_code == code) for piece_code, bits in enumerate(self._piece_bits)
+                        if piece_code & TYPE_MASK != EMPTY) or \
+                    any(bool(bits & bit) != (bool(code) and code & COLOR_MASK == color)
+                        for color, bits in self._color_bits.items()):
+                raise RuntimeError("bitboards do not match the board at " + JanggiGame.SQUARE_NAMES[square])
+
+    def _cannons(self):
+        """Returns the bitboard of every cannon on the board."""
+        return self._piece_bits[CANNON] | self._piece_bits[CANNON | RED]
+
+    def _slider_attacks(self, square, attacker_color):
+        """
+        Returns True if a chariot or cannon of the attacker color code could move onto the square,
+        found with the ray masks: the first piece along a ray for a chariot, the second for a cannon.
+        """
+        chariots = self._piece_bits[CHARIOT | attacker_color]
+        attacking_cannons = self._piece_bits[CANNON | attacker_color]
+        if not (chariots | attacking_cannons) & _RAY_UNIONS[square]:
+            return False
+        occupied = self._occupied
+        cannons = self._cannons()
+        if cannons >> square & 1:
+            #A cannon can never capture another cannon
+            attacking_cannons = 0
+        for ray, mask, step, increasing in _RAY_MASKS[square]:
+            blockers = occupied & mask
+            if not blockers or not (chariots | attacking_cannons) & mask:
+                continue
+            first = _nearest(blockers, increasing)
+            if chariots >> first & 1:
+                return True
+            if not attacking_cannons & mask or cannons >> first & 1:
+                continue
+            beyond = _beyond(blockers, first, increasing)
+            if beyond and attacking_cannons >> _nearest(beyond, increasing) & 1:
+                return True
+        return False
+
+    def _chariot_moves(self, square, piece_color):
+        """
+        Same as JanggiGame._chariot_moves: the chariot slides along each ray up to the nearest
+        piece, which it can capture if it is an opponent's.
+        """
+        occupied = self._occupied
+        own = self._color_bits[piece_color]
+        move_list = [square]
+        for ray, mask, step, increasing in _RAY_MASKS[square]:
+            blockers = occupied & mask
+            if not blockers:
+                move_list.extend(ray)
+                continue
+            blocker = _nearest(blockers, increasing)
+            move_list.extend(ray[:(blocker - square) // step - 1])
+            if not own >> blocker & 1:
+                move_list.append(blocker)
+        return move_list
+
+    def _cannon_moves(self, square, piece_color):
+        """
+        Same as JanggiGame._cannon_moves: the cannon jumps the nearest piece along each ray (unless
+        it is a cannon) and lands on any empty square before the next piece, or captures that piece
+        if it is an opponent's and not a cannon.
+        """
+        occupied = self._occupied
+        cannons = self._cannons()
+        move_list = [square]
+        for ray, mask, step, increasing in _RAY_MASKS[square]:
+            blockers = occupied & mask
+            if not blockers:
+                continue
+            screen = _nearest(blockers, increasing)
+            if cannons >> screen & 1:
+                continue
+            beyond = _beyond(blockers, screen, increasing)
+            first_landing = (screen - square) // step
+            if not beyond:
+                move_list.extend(ray[first_landing:])
+                continue
+            target = _nearest(beyond, increasing)
+            move_list.extend(ray[first_landing:(target - square) // step - 1])
+            if not (self._color_bits[piece_color] | cannons) >> target & 1:
+                move_list.append(target)
+        return move_list
@@ -13,28 +13,284 @@
 #   'RED_WON' or 'BLUE_WON), and is_in_check which takes a player color (either 'red'
 #   or 'blue') and returns if that player is currently in check.
 
-import JanggiAi as ja
+import json
+import random
+from collections import OrderedDict, namedtuple
+
+# The board is stored as a flat bytearray of 90 small integer piece codes indexed by
+# square number (row * BOARD_COLS + col, so 'a1' is 0 and 'i10' is 89).  A piece code
+# is its type code combined with its color bit, 0 is an empty vertex.
+BOARD_ROWS = 10
+BOARD_COLS = 9
+BOARD_SIZE = BOARD_ROWS * BOARD_COLS
+
+EMPTY = 0
+GENERAL = 1
+GUARD = 2
+ELEPHANT = 3
+HORSE = 4
+CHARIOT = 5
+CANNON = 6
+SOLDIER = 7
+TYPE_MASK = 7
+
+BLUE = 0
+RED = 8
+COLOR_MASK = 8
+
+PIECE_NAMES = ('', 'GENERAL', 'GUARD', 'ELEPHANT', 'HORSE', 'CHARIOT', 'CANNON', 'SOLDIER')
+COLOR_CODES = {'blue': BLUE, 'red': RED}
+COLOR_NAMES = {BLUE: 'blue', RED: 'red'}
+
+COL_LETTERS = 'abcdefghi'
+SQUARE_NAMES = tuple(COL_LETTERS[square % BOARD_COLS] + str(square // BOARD_COLS + 1)
+                     for square in range(BOARD_SIZE))
+SQUARE_BY_NAME = {name: square for square, name in enumerate(SQUARE_NAMES)}
+
+#Both palaces as sets of square numbers, red on top (rows 1-3) and blue on the bottom (rows 8-10).
+PALACES = {RED: frozenset(row * BOARD_COLS + col for row in range(0, 3) for col in range(3, 6)),
+           BLUE: frozenset(row * BOARD_COLS + col for row in range(7, 10) for col in range(3, 6))}
+
+
+def _on_board(row, col):
+    """Returns True if the given row and collumn (0 indexed) is a vertex on the board."""
+    return 0 <= row < BOARD_ROWS and 0 <= col < BOARD_COLS
+
+
+def _build_move_tables():
+    """
+    Builds the move tables used by the move generators, once at import. Every table is
+    a tuple indexed by square number:
+      palace_diagonals: squares joined to the square by a palace diagonal line
+      rays: the squares a chariot slides along in each direction (orthogonals plus palace
+            diagonals), nearest first.  Cannons use the same rays.
+      horse: (leg, target) pairs, the leg must be empty for the move
+      elephant: (first leg, second leg, target) triples
+      soldier: {color: targets}, sideways, forwards and forwards along palace diagonals
+      palace: targets for a guard or general, one step along any palace line
+    """
+    palace_diagonals = [list() for square in range(BOARD_SIZE)]
+    for palace in PALACES.values():
+        center = min(palace) + BOARD_COLS + 1
+        for corner in (center - BOARD_COLS - 1, center - BOARD_COLS + 1,
+                       center + BOARD_COLS - 1, center + BOARD_COLS + 1):
+            palace_diagonals[center].append(corner)
+            palace_diagonals[corner].append(center)
+
+    rays = list()
+    horse = list()
+    elephant = list()
+    soldier = {BLUE: list(), RED: list()}
+    palace_steps = list()
+    for square in range(BOARD_SIZE):
+        row, col = divmod(square, BOARD_COLS)
+
+        square_rays = list()
+        for row_step, col_step in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+            ray = list()
+            ray_row, ray_col = row + row_step, col + col_step
+            while _on_board(ray_row, ray_col):
+                ray.append(ray_row * BOARD_COLS + ray_col)
+                ray_row += row_step
+                ray_col += col_step
+            if ray:
+                square_rays.append(tuple(ray))
+        for next_square in palace_diagonals[square]:
+            #A diagonal ray keeps going through the center of the palace to the far corner
+            step = next_square - square
+            ray = [next_square]
+            if step + next_square in palace_diagonals[next_square]:
+                ray.append(step + next_square)
+            square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+
+        #Horses step once orthogonally then once diagonally outward, elephants step once
+        # orthogonally then twice diagonally outward.
+        square_horse = list()
+        square_elephant = list()
+        for row_step, col_step in ((-1, 0), (1, 0), (0, 1), (0, -1)):
+            leg_row, leg_col = row + row_step, col + col_step
+            for side in (-1, 1):
+                diag_row = row_step + (side if col_step else 0)
+                diag_col = col_step + (side if row_step else 0)
+                if _on_board(leg_row + diag_row, leg_col + diag_col):
+                    square_horse.append((leg_row * BOARD_COLS + leg_col,
+                                         (leg_row + diag_row) * BOARD_COLS + leg_col + diag_col))
+                if _on_board(leg_row + 2 * diag_row, leg_col + 2 * diag_col):
+                    square_elephant.append((leg_row * BOARD_COLS + leg_col,
+                                            (leg_row + diag_row) * BOARD_COLS + leg_col + diag_col,
+                                            (leg_row + 2 * diag_row) * BOARD_COLS + leg_col + 2 * diag_col))
+        horse.append(tuple(square_horse))
+        elephant.append(tuple(square_elephant))
+
+        #Blue soldiers move up the board and red soldiers move down it
+        for color, vertical_move in ((BLUE, -1), (RED, 1)):
+            targets = list()
+            if col > 0:
+                targets.append(square - 1)
+            if col < BOARD_COLS - 1:
+                targets.append(square + 1)
+            if 0 <= row + vertical_move < BOARD_ROWS:
+                targets.append(square + vertical_move * BOARD_COLS)
+            for next_square in palace_diagonals[square]:
+                if next_square // BOARD_COLS == row + vertical_move:
+                    targets.append(next_square)
+            soldier[color].append(tuple(targets))
+
+        steps = list()
+        for palace in PALACES.values():
+            if square in palace:
+                for row_step, col_step in ((0, -1), (0, 1), (-1, 0), (1, 0)):
+                    next_square = (row + row_step) * BOARD_COLS + col + col_step
+                    if _on_board(row + row_step, col + col_step) and next_square in palace:
+                        steps.append(next_square)
+                steps.extend(palace_diagonals[square])
+        palace_steps.append(tuple(steps))
+
+    return (tuple(tuple(diagonals) for diagonals in palace_diagonals), tuple(rays), tuple(horse),
+            tuple(elephant), {color: tuple(targets) for color, targets in soldier.items()},
+            tuple(palace_steps))
+
+
+_PALACE_DIAGONALS, _RAYS, _HORSE_TABLE, _ELEPHANT_TABLE, _SOLDIER_TABLE, _PALACE_TABLE = _build_move_tables()
+
+
+def _build_attack_tables():
+    """
+    Inverts the horse, elephant and soldier move tables so attack detection can look
+    outward from the square being attacked. Every table is a tuple indexed by the attacked square:
+      horse: (origin, leg) pairs of horses that could reach the square
+      elephant: (origin, first leg, second leg) triples of elephants that could reach the square
+      soldier: {color: origins} of soldiers of that color that could reach the square
+    Rays and palace steps read the same in both directions so they need no inverse.
+    """
+    horse = [list() for square in range(BOARD_SIZE)]
+    elephant = [list() for square in range(BOARD_SIZE)]
+    soldier = {BLUE: [list() for square in range(BOARD_SIZE)], RED: [list() for square in range(BOARD_SIZE)]}
+    for origin in range(BOARD_SIZE):
+        for leg, target in _HORSE_TABLE[origin]:
+            horse[target].append((origin, leg))
+        for first_leg, second_leg, target in _ELEPHANT_TABLE[origin]:
+            elephant[target].append((origin, first_leg, second_leg))
+        for color in (BLUE, RED):
+            for target in _SOLDIER_TABLE[color][origin]:
+                soldier[color][target].append(origin)
+    return (tuple(tuple(attacks) for attacks in horse), tuple(tuple(attacks) for attacks in elephant),
+            {color: tuple(tuple(origins) for origins in targets) for color, targets in soldier.items()})
+
+
+_HORSE_ATTACKS, _ELEPHANT_ATTACKS, _SOLDIER_ATTACKS = _build_attack_tables()
 
 
+def _build_check_lines():
+    """
+    For each square a general could stand on, builds the set of squares whose contents decide
+    whether it is attacked: every square on its rays, the legs and origins of horses and elephants
+    that could reach it, and the soldier and palace squares next to it. A move that neither
+    leaves nor lands on one of these squares can't put that general into check or out of it.
+    """
+    check_lines = list()
+    for square in range(BOARD_SIZE):
+        lines = set()
+        for ray in _RAYS[square]:
+            lines.update(ray)
+        for origin, leg in _HORSE_ATTACKS[square]:
+            lines.update((origin, leg))
+        for origin, first_leg, second_leg in _ELEPHANT_ATTACKS[square]:
+            lines.update((origin, first_leg, second_leg))
+        for color in (BLUE, RED):
+            lines.update(_SOLDIER_ATTACKS[color][square])
+        lines.update(_PALACE_TABLE[square])
+        check_lines.append(frozenset(lines))
+    return tuple(check_lines)
+
+
+_CHECK_LINES = _build_check_lines()
+
+#A move as handed out by generate_legal_moves, origin and destination are square numbers.
+Move = namedtuple('Move', ['origin', 'destination'])
+#A pass, moves with the same origin and destination are all passes (make_move, push_move), this is the a1a1 one
+PASS_MOVE = Move(0, 0)
+
+#Zobrist keys, one random 64 bit number per piece code per square (indexed code * BOARD_SIZE + square,
+# all zero for EMPTY) plus one that is mixed in when it is red's turn. Seeded so hashes are the
+# same from run to run and between processes.
+_ZOBRIST_SEED = 0x4A414E47
+_zobrist_random = random.Random(_ZOBRIST_SEED)
+_ZOBRIST_PIECES = tuple(0 if code & TYPE_MASK == EMPTY else _zobrist_random.getrandbits(64)
+                        for code in range(COLOR_MASK * 2) for square in range(BOARD_SIZE))
+_ZOBRIST_RED_TURN = _zobrist_random.getrandbits(64)
+del _zobrist_random
+
+#Move lists kept per game by _list_moves, keyed by the position's hash (without the side to move,
+# which doesn't change how a piece moves) and square, least recently used dropped first. Off (0) by
+# default: generating a list costs about half a cache miss, so it only pays with a high hit rate.
+MOVE_CACHE_SIZE = 0
+
+#Position notation, FEN style: the ranks from 10 down to 1 separated by '/', each rank its pieces
+# from file a to i as letters (upper case blue, lower case red) with a digit for each run of empty
+# squares, then the side to move ('b' or 'r') and optionally the number of plies since the last
+# capture and the move number. The letters are the ones other Janggi software uses: general k,
+# guard a, elephant b, horse n, chariot r, cannon c, soldier p.
+NOTATION_LETTERS = ('', 'k', 'a', 'b', 'n', 'r', 'c', 'p')
+NOTATION_TURNS = {'blue': 'b', 'red': 'r'}
+START_NOTATION = 'RBNA1ABNR/4K4/1C5C1/P1P1P1P1P/9/9/p1p1p1p1p/1c5c1/4k4/rbna1abnr b 0 1'
+_NOTATION_CHARS = tuple('.' if code & TYPE_MASK == EMPTY else
+                        (NOTATION_LETTERS[code & TYPE_MASK].upper() if code & COLOR_MASK == BLUE
+                         else NOTATION_LETTERS[code & TYPE_MASK]) for code in range(COLOR_MASK * 2))
+#bytes.translate table from a notation character to its piece code, 255 for anything that isn't one
+_NOTATION_CODES = bytes(_NOTATION_CHARS.index(chr(char)) if chr(char) in _NOTATION_CHARS else 255
+                        for char in range(256))
+#str.translate table expanding each digit to that many empty squares
+_NOTATION_EMPTIES = str.maketrans({str(count): '.' * count for count in range(1, BOARD_COLS + 1)})
+_NOTATION_TURN_NAMES = {'b': 'blue', 'r': 'red'}
+#bytes.translate table from a piece code back to its notation character
+_NOTATION_BYTES = bytes(ord(_NOTATION_CHARS[code]) if code < len(_NOTATION_CHARS) else ord('?')
+                        for code in range(256))
 
 class GamePiece:
     """
     Defines objects to represent game pieces on Janggi board.  Each object has a name
     and a color, which must be passed when initializing. GamePieces are used by the
     JanggiGame class to represent the pieces on the board. Has get methods
-    for name and color.
+    for name and color, and for the integer type, color and piece codes the board uses.
+    GamePieces are immutable flyweights: there is only ever one of each of the 14 kinds
+    (7 types in 2 colors), asking for the same name and color again returns the same object.
     """
 
-    def __init__(self, name, color):
-        """Initializes a given game piece with the given name (which is th pieces type:
+    __slots__ = ('_piece_name', '_color', '_type_code', '_color_code', '_code', '_text')
+    _interned = dict()
+
+    def __new__(cls, name, color):
+        """Returns the piece with the given name (which is th pieces type:
         'GENERAL','GUARD','SOLDIER','CANNON','ELEPHANT','HORSE', or 'CHARIOT')
-        and color ('red' or 'blue')"""
-        self._piece_name = name
-        self._color = color
+        and color ('red' or 'blue'), made the first time it is asked for."""
+        piece = cls._interned.get((name, color))
+        if piece is None:
+            if name not in PIECE_NAMES[GENERAL:] or color not in COLOR_CODES:
+                raise ValueError("no " + str(color) + " " + str(name) + " piece")
+            piece = object.__new__(cls)
+            type_code = PIECE_NAMES.index(name)
+            for slot, value in (('_piece_name', name), ('_color', color), ('_type_code', type_code),
+                                ('_color_code', COLOR_CODES[color]), ('_code', type_code | COLOR_CODES[color]),
+                                ('_text', name + color)):
+                object.__setattr__(piece, slot, value)
+            cls._interned[(name, color)] = piece
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GamePiece objects can't be changed")
+
+    def __delattr__(self, name):
+        raise AttributeError("GamePiece objects can't be changed")
+
+    def __reduce__(self):
+        """Pickles as a call to GamePiece(name, color) so unpickling gives back the shared piece."""
+        return GamePiece, (self._piece_name, self._color)
 
     def __repr__(self):
         """REturns a stirng representation of the piece which is its name followed by color"""
-        return self._piece_name + self._color
+        return self._text
 
     def get_color(self):
         """Returns a string that is the color of the piece, either 'blue' or 'red'."""
@@ -47,6 +303,134 @@ class GamePiece:
         """
         return self._piece_name
 
+    def get_type_code(self):
+        """Returns the piece's type code (GENERAL, GUARD, ELEPHANT, HORSE, CHARIOT, CANNON or SOLDIER)."""
+        return self._type_code
+
+    def get_color_code(self):
+        """Returns the piece's color code, BLUE or RED."""
+        return self._color_code
+
+    def get_code(self):
+        """Returns the piece code stored on the board for this piece, its type code combined with its color code."""
+        return self._code
+
+
+#The shared GamePiece for every piece code, indexed by code (None for codes that aren't a piece),
+# used when handing the board out to the GUI and AI.
+_PIECES = tuple(None if code & TYPE_MASK == EMPTY else
+                GamePiece(PIECE_NAMES[code & TYPE_MASK], COLOR_NAMES[code & COLOR_MASK])
+                for code in range(COLOR_MASK * 2))
+
+#Material value of each piece type, indexed by type code (the general can't be captured so is worth nothing)
+DEFAULT_PIECE_VALUES = (0, 0, 300, 300, 500, 1300, 700, 200)
+
+#Default piece-square bonuses, by piece name. Each table lists rows from the owner's own back rank
+# (first) to the opponent's back rank (last), so the same table serves both colors.
+DEFAULT_PIECE_SQUARE = {
+    'SOLDIER': [[0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [10, 10, 10, 15, 15, 15, 10, 10, 10],
+                [20, 20, 20, 25, 25, 25, 20, 20, 20],
+                [30, 30, 30, 40, 40, 40, 30, 30, 30],
+                [30, 30, 40, 60, 70, 60, 40, 30, 30],
+                [20, 20, 30, 60, 80, 60, 30, 20, 20],
+                [0, 0, 10, 30, 40, 30, 10, 0, 0]],
+    'HORSE': [[-20, -10, 0, 0, 0, 0, 0, -10, -20],
+              [-10, 0, 0, 0, 0, 0, 0, 0, -10],
+              [-10, 0, 10, 10, 10, 10, 10, 0, -10],
+              [-10, 0, 10, 15, 15, 15, 10, 0, -10],
+              [-10, 5, 15, 20, 20, 20, 15, 5, -10],
+              [-10, 5, 15, 20, 20, 20, 15, 5, -10],
+              [-10, 0, 10, 20, 20, 20, 10, 0, -10],
+              [-10, 0, 10, 15, 20, 15, 10, 0, -10],
+              [-10, 0, 0, 10, 10, 10, 0, 0, -10],
+              [-20, -10, 0, 0, 0, 0, 0, -10, -20]],
+    'CHARIOT': [[-5, 0, 0, 5, 5, 5, 0, 0, -5],
+                [0, 0, 0, 0, 5, 0, 0, 0, 0],
+                [0, 0, 0, 0, 5, 0, 0, 0, 0],
+                [5, 5, 5, 5, 10, 5, 5, 5, 5],
+                [5, 5, 5, 5, 10, 5, 5, 5, 5],
+                [5, 5, 5, 5, 10, 5, 5, 5, 5],
+                [10, 10, 10, 10, 15, 10, 10, 10, 10],
+                [10, 10, 10, 15, 20, 15, 10, 10, 10],
+                [10, 10, 10, 15, 20, 15, 10, 10, 10],
+                [5, 5, 5, 10, 10, 10, 5, 5, 5]],
+    'GENERAL': [[0, 0, 0, -5, -5, -5, 0, 0, 0],
+                [0, 0, 0, 0, 10, 0, 0, 0, 0],
+                [0, 0, 0, -10, -5, -10, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0, 0]],
+}
+
+
+class EvalWeights:
+    """
+    Holds the weights the incremental evaluation uses: a material value per piece type and a
+    piece-square table per piece type. They are expanded once into flat tables indexed by piece
+    code (and code * BOARD_SIZE + square for the piece-square table) so games can look them up
+    directly. One EvalWeights can be shared by any number of games.
+    """
+
+    def __init__(self, piece_values=None, piece_square=None):
+        """
+        Takes optional piece values (a dict of piece name to value) and piece-square tables
+        (a dict of piece name to 10 rows of 9 bonuses, listed from the owner's back rank outward).
+        Anything not given uses DEFAULT_PIECE_VALUES and DEFAULT_PIECE_SQUARE.
+        """
+        values = list(DEFAULT_PIECE_VALUES)
+        for name, value in (piece_values or dict()).items():
+            values[PIECE_NAMES.index(name)] = int(value)
+        tables = dict(DEFAULT_PIECE_SQUARE)
+        tables.update(piece_square or dict())
+
+        self._piece_values = tuple(values)
+        self._code_values = tuple(values[code & TYPE_MASK] for code in range(COLOR_MASK * 2))
+        piece_square_codes = [0] * (COLOR_MASK * 2 * BOARD_SIZE)
+        for name, rows in tables.items():
+            if len(rows) != BOARD_ROWS or any(len(row) != BOARD_COLS for row in rows):
+                raise ValueError("piece-square table for " + name + " must be 10 rows of 9")
+            piece_type = PIECE_NAMES.index(name)
+            for square in range(BOARD_SIZE):
+                row, col = divmod(square, BOARD_COLS)
+                #Blue's back rank is row 10, red's is row 1
+                piece_square_codes[(piece_type | BLUE) * BOARD_SIZE + square] = int(rows[BOARD_ROWS - 1 - row][col])
+                piece_square_codes[(piece_type | RED) * BOARD_SIZE + square] = int(rows[row][col])
+        self._piece_square_codes = tuple(piece_square_codes)
+
+    def get_piece_values(self):
+        """Returns the material value of each piece type, indexed by type code."""
+        return self._piece_values
+
+    def get_code_values(self):
+        """Returns the material value of each piece code."""
+        return self._code_values
+
+    def get_piece_square_codes(self):
+        """Returns the piece-square bonus of each piece code on each square, indexed code * BOARD_SIZE + square."""
+        return self._piece_square_codes
+
+
+def load_eval_weights(file_path):
+    """
+    Reads evaluation weights from a JSON file holding an object with optional "piece_values"
+    (piece name to value) and "piece_square" (piece name to 10 rows of 9 bonuses) entries,
+    and returns them as an EvalWeights.
+    """
+    with open(file_path) as weights_file:
+        weights = json.load(weights_file)
+    return EvalWeights(weights.get('piece_values'), weights.get('piece_square'))
+
+
+DEFAULT_WEIGHTS = EvalWeights()
+
 
 class JanggiGame:
     """
@@ -57,21 +441,157 @@ class JanggiGame:
     getting the game's current state.
     """
 
-    def __init__(self):
+    def __init__(self, debug=False, weights=None):
         """
         Initializes an instance of the JanggiGame with the default board setup
         and a number of private data members for storing and updating the game.
         Game begins with it being 'blue' player's turn and ends when a player
         puts another in check_mate.  Does not allow for elephant-horse swapping.
+        If debug is True every push_move and pop_move checks the tracked general
+        squares, position hash and evaluation against the board (slow, for testing only).
+        weights is the EvalWeights for the evaluation, DEFAULT_WEIGHTS if not given.
+        """
+        self._set_up(self._construct_board(), 'blue', (0, 1), debug, weights)
+
+    def get_weights(self):
+        """Returns the EvalWeights the game scores positions with."""
+        return self._weights
+
+    def get_start_position(self):
+        """
+        Returns the position the game started from as a tuple of its square codes (bytes), the
+        side to move and its (plies since a capture, move number) counters.
+        """
+        return self._start_position
+
+    def get_move_history(self):
+        """Returns a list of the Moves made since the start position, a pass has the same origin and destination."""
+        return [Move(entry[0], entry[1]) for entry in self._move_stack]
+
+    def _set_up(self, board, turn, counters, debug, weights):
+        """
+        Initializes the data members for a game starting from the given bytearray of piece codes with
+        turn ('blue' or 'red') to move. counters is the (plies since a capture, move number) of the
+        position. Used by __init__ and from_notation.
         """
         self._game_state = "UNFINISHED"
-        self._board = self._construct_board()
-        self._temp_board = list()
-        self._current_turn = 'blue'
+        self._board = board
+        self._move_stack = list()
+        self._current_turn = turn
         self._color_dict = {'blue':'red','red':'blue'}
+        self._debug = debug
+        #Square of each general keyed by color code (None if it has been captured during a trial move),
+        # every board set up has exactly one of each
+        self._generals = {BLUE: board.index(GENERAL | BLUE), RED: board.index(GENERAL | RED)}
+        self._weights = DEFAULT_WEIGHTS if weights is None else weights
+        self._code_values = self._weights.get_code_values()
+        self._piece_square = self._weights.get_piece_square_codes()
+        #Material and piece-square score of each side keyed by color code, updated as pieces move
+        self._hash, self._material, self._positional = self._compute_position()
         self._col_conversion = {0:'a', 1:'b', 2:'c', 3:'d', 4:'e', 5:'f', 6:'g', 7:'h', 8:'i',
                                 'a':0, 'b':1, 'c':2, 'd':3, 'e':4, 'f':5, 'g':6, 'h':7, 'i':8}
-        self._col_label = self._col_label_gen(14)
+        #Move generator for each piece type indexed by type code, bound here so a subclass can
+        # override them. General moves identical to guard, so there is no general_moves.
+        self._move_generators = (None, self._guard_moves, self._guard_moves, self._ele_moves, self._horse_moves,
+                                 self._chariot_moves, self._cannon_moves, self._soldier_moves)
+        #Board, side to move and (plies since a capture, move number) of the position the game started from
+        self._start_position = (bytes(board), turn, tuple(counters))
+        self._move_cache = OrderedDict()
+        self._move_cache_size = MOVE_CACHE_SIZE
+        self._move_cache_hits = 0
+        self._move_cache_misses = 0
+
+    @classmethod
+    def from_notation(cls, notation, debug=False, weights=None):
+        """
+        Returns a new JanggiGame set up at the position written in notation (see START_NOTATION),
+        debug and weights as for JanggiGame(). Raises ValueError if notation isn't a valid position:
+        every rank must have 9 squares and each player exactly one general, inside their palace,
+        and only a checkmated player can be in check when it isn't their turn. A checkmate is set
+        up as a finished game, see from_square_codes.
+        """
+        fields = notation.split()
+        if len(fields) not in (2, 4) or fields[1] not in _NOTATION_TURN_NAMES:
+            raise ValueError("notation needs a board, side to move (b or r) and optionally two counters: " +
+                             repr(notation))
+        ranks = fields[0].translate(_NOTATION_EMPTIES).split('/')
+        if len(ranks) != BOARD_ROWS or set(map(len, ranks)) != {BOARD_COLS}:
+            raise ValueError("notation board must be 10 ranks of 9 squares: " + repr(fields[0]))
+        #Ranks are written from 10 down to 1, the board is stored from rank 1 up
+        board = bytearray(''.join(reversed(ranks)).encode('ascii', 'replace').translate(_NOTATION_CODES))
+        if 255 in board:
+            raise ValueError("notation board has an unknown piece letter: " + repr(fields[0]))
+        counters = (0, 1)
+        if len(fields) == 4:
+            if not (fields[2].isdigit() and fields[3].isdigit()):
+                raise ValueError("notation counters must be whole numbers: " + repr(notation))
+            counters = (int(fields[2]), int(fields[3]))
+
+        return cls.from_square_codes(board, _NOTATION_TURN_NAMES[fields[1]], counters, debug, weights)
+
+    @classmethod
+    def from_square_codes(cls, square_codes, turn='blue', counters=(0, 1), debug=False, weights=None):
+        """
+        Returns a new JanggiGame set up with the piece code on each square number given by
+        square_codes (90 bytes, as get_square_codes returns) and turn ('blue' or 'red') to move.
+        counters is the (plies since a capture, move number) of the position. Raises ValueError
+        unless every code is a piece code and each player has exactly one general, inside their
+        palace, or if the player not to move is in check without being checkmated (they can't have
+        left their general attacked). A checkmated player's opponent has won and, as make_move
+        leaves a finished game, is the one to move, whichever of them turn gives.
+        """
+        board = bytearray(square_codes)
+        #Valid codes are below 16 and never an empty square with the red bit set
+        if len(board) != BOARD_SIZE or max(board) >= COLOR_MASK * 2 or EMPTY | RED in board:
+            raise ValueError("square codes must be 90 piece codes")
+        if turn not in COLOR_CODES:
+            raise ValueError("turn must be 'blue' or 'red', not " + repr(turn))
+        for player_color, player_code in COLOR_CODES.items():
+            general_code = GENERAL | player_code
+            if board.count(general_code) != 1 or board.index(general_code) not in PALACES[player_code]:
+                raise ValueError("board must give " + player_color + " one general, inside their palace")
+
+        game = cls.__new__(cls)
+        game._set_up(board, turn, counters, debug, weights)
+        waiting = game._color_dict[turn]
+        if game.is_in_check(waiting):
+            if not game._is_in_checkmate(waiting):
+                raise ValueError(waiting + " is in check but it is " + turn + "'s turn")
+            game._game_state = 'BLUE_WON' if turn == 'blue' else 'RED_WON'
+        elif game.is_in_check(turn) and game._is_in_checkmate(turn):
+            game._game_state = 'RED_WON' if turn == 'blue' else 'BLUE_WON'
+            game._current_turn = waiting
+            game._hash ^= _ZOBRIST_RED_TURN
+            game._start_position = (game._start_position[0], waiting, game._start_position[2])
+        return game
+
+    def to_notation(self, counters=True):
+        """
+        Returns the position written in notation (see START_NOTATION), with the plies since the
+        last capture and the move number unless counters is False. from_notation reads it back.
+        """
+        board_text = self._board.translate(_NOTATION_BYTES).decode('ascii')
+        ranks = list()
+        for row in range(BOARD_ROWS - 1, -1, -1):
+            rank = board_text[row * BOARD_COLS:(row + 1) * BOARD_COLS]
+            for count in range(BOARD_COLS, 0, -1):
+                rank = rank.replace('.' * count, str(count))
+            ranks.append(rank)
+        notation = '/'.join(ranks) + ' ' + NOTATION_TURNS[self._current_turn]
+        if not counters:
+            return notation
+
+        start_turn, (quiet_plies, move_number) = self._start_position[1:]
+        plies = len(self._move_stack)
+        for index in range(plies - 1, -1, -1):
+            if self._move_stack[index][2]:
+                quiet_plies = plies - 1 - index
+                break
+        else:
+            quiet_plies += plies
+        #The move number goes up after each of red's moves, blue moves first
+        move_number += (plies + (start_turn == 'red')) // 2
+        return notation + ' ' + str(quiet_plies) + ' ' + str(move_number)
 
     def get_whose_turn(self):
         return self._current_turn
@@ -79,19 +599,120 @@ class JanggiGame:
     def get_col_conv(self):
         return self._col_conversion
 
+    def get_square_codes(self):
+        """Returns a copy of the board as bytes, the piece code on each square number. For use by JanggiAi."""
+        return bytes(self._board)
+
     def get_board(self):
-        """Returns the board object contained in this game.  For use by GUI"""
-        return self._board
+        """
+        Returns a two dimensional list (rows then collumns) view of the board holding
+        GamePiece objects or None.  For use by GUI, changing it does not change the game.
+        """
+        board = self._board
+        return [[_PIECES[board[row_start + col]] for col in range(BOARD_COLS)]
+                for row_start in range(0, BOARD_SIZE, BOARD_COLS)]
 
-    def try_move(self, src, dest):
-        """Calls the private try move method, only to be used by JanggiAi.  Returns the board to restore to after try"""
-        starting_board = self._copy_2d_list(self._board)
-        self._try_move(src, dest)
-        return starting_board
+    def push_move(self, origin, destination):
+        """
+        Makes the move from the origin square number to the destination square number
+        (without checking if the piece can actually move in that way or if it leaves
+        its general in check) and passes the turn to the other player. The same square for
+        origin and destination is a pass. Only the origin, destination, captured piece and
+        previous position hash are recorded on the undo stack, pop_move should always be called
+        to take the move back unless the move has been certified as legal by make_move.
+        """
+        board = self._board
+        previous_hash = self._hash
+        if origin != destination:
+            captured = board[destination]
+            moving = board[origin]
+            board[destination] = moving
+            board[origin] = EMPTY
+            self._hash = previous_hash ^ _ZOBRIST_RED_TURN ^ _ZOBRIST_PIECES[moving * BOARD_SIZE + origin] ^ \
+                _ZOBRIST_PIECES[moving * BOARD_SIZE + destination] ^ _ZOBRIST_PIECES[captured * BOARD_SIZE + destination]
+            piece_square = self._piece_square
+            self._positional[moving & COLOR_MASK] += piece_square[moving * BOARD_SIZE + destination] - \
+                piece_square[moving * BOARD_SIZE + origin]
+            if captured:
+                self._material[captured & COLOR_MASK] -= self._code_values[captured]
+                self._positional[captured & COLOR_MASK] -= piece_square[captured * BOARD_SIZE + destination]
+            if moving & TYPE_MASK == GENERAL:
+                self._generals[moving & COLOR_MASK] = destination
+            if captured & TYPE_MASK == GENERAL:
+                self._generals[captured & COLOR_MASK] = None
+        else:
+            captured = EMPTY
+            self._hash = previous_hash ^ _ZOBRIST_RED_TURN
+        self._move_stack.append((origin, destination, captured, previous_hash))
+        self._current_turn = self._color_dict[self._current_turn]
+        if self._debug:
+            self._check_consistency()
 
-    def restore_board(self, board):
-        """Given a board state to restore to, restores the board to that state."""
-        self._board = self._copy_2d_list(board)
+    def pop_move(self):
+        """
+        Takes back the last move made with push_move (or make_move), putting back any
+        captured piece and giving the turn back. Returns the (origin, destination) of the move.
+        """
+        origin, destination, captured, self._hash = self._move_stack.pop()
+        if origin != destination:
+            board = self._board
+            moving = board[destination]
+            board[origin] = moving
+            board[destination] = captured
+            piece_square = self._piece_square
+            self._positional[moving & COLOR_MASK] += piece_square[moving * BOARD_SIZE + origin] - \
+                piece_square[moving * BOARD_SIZE + destination]
+            if captured:
+                self._material[captured & COLOR_MASK] += self._code_values[captured]
+                self._positional[captured & COLOR_MASK] += piece_square[captured * BOARD_SIZE + destination]
+            if moving & TYPE_MASK == GENERAL:
+                self._generals[moving & COLOR_MASK] = origin
+            if captured & TYPE_MASK == GENERAL:
+                self._generals[captured & COLOR_MASK] = destination
+        self._current_turn = self._color_dict[self._current_turn]
+        if self._debug:
+            self._check_consistency()
+        return origin, destination
+
+    def position_hash(self):
+        """
+        Returns the 64 bit Zobrist hash of the current position (pieces on squares and whose turn it is).
+        It is kept up to date as moves are made and taken back, so this costs nothing.
+        """
+        return self._hash
+
+    def evaluation(self, player_color):
+        """
+        Takes 'red' or 'blue' and returns the static evaluation of the position for that player:
+        their material and piece-square score minus the opponent's. Kept up to date as moves are
+        made and taken back, so this never looks at the board.
+        """
+        player_code = COLOR_CODES[player_color]
+        enemy_code = player_code ^ COLOR_MASK
+        return self._material[player_code] + self._positional[player_code] - \
+            self._material[enemy_code] - self._positional[enemy_code]
+
+    def get_material(self, player_color):
+        """Takes 'red' or 'blue' and returns the total material value of that player's pieces."""
+        return self._material[COLOR_CODES[player_color]]
+
+    def _compute_position(self):
+        """
+        Computes the Zobrist hash of the current position and each side's material and piece-square
+        scores (two dicts keyed by color code) from scratch, in one pass over the board.
+        """
+        position_hash = _ZOBRIST_RED_TURN if self._current_turn == 'red' else 0
+        material = {BLUE: 0, RED: 0}
+        positional = {BLUE: 0, RED: 0}
+        code_values = self._code_values
+        piece_square = self._piece_square
+        for square, code in enumerate(self._board):
+            if code:
+                index = code * BOARD_SIZE + square
+                position_hash ^= _ZOBRIST_PIECES[index]
+                material[code & COLOR_MASK] += code_values[code]
+                positional[code & COLOR_MASK] += piece_square[index]
+        return position_hash, material, positional
 
     def is_in_checkmate(self, color):
         """calls the private is in checkmate, only to be used by ai and gui"""
@@ -99,36 +720,30 @@ class JanggiGame:
 
     def _construct_board(self):
         """
-        Creates and returns a two dimensional list to represent a Janggi Board. Populates empty verticies
-        with None and the correct starting location with GamePiece objects of each piece
+        Creates and returns a flat bytearray of piece codes to represent a Janggi Board. Empty verticies
+        hold EMPTY and the correct starting locations hold the code of each piece
         and the appropriate color to have red on top and blue on bottom.
         """
-
-        board_source = [[None for counter in range(9)] for count in range(10)]
-        for row_num, row in enumerate(board_source):
-            for col_num, col in enumerate(row):
-                if row_num == 0 or row_num == 9:
-                    #end rows
-                    if col_num == 0 or col_num == 8:
-                        board_source[row_num][col_num] = GamePiece("CHARIOT", ('blue' if row_num == 9 else 'red'))
-                    if col_num == 1 or col_num == 6:
-                        board_source[row_num][col_num] = GamePiece("ELEPHANT", ('blue' if row_num == 9 else 'red'))
-                    if col_num == 2 or col_num == 7:
-                        board_source[row_num][col_num] = GamePiece("HORSE", ('blue' if row_num == 9 else 'red'))
-                    if col_num == 3 or col_num == 5:
-                        board_source[row_num][col_num] = GamePiece("GUARD", ('blue' if row_num == 9 else 'red'))
-                if row_num == 1 or row_num == 8:
-                    #second rows
-                    if col_num == 4:
-                        board_source[row_num][col_num] = GamePiece("GENERAL", ('blue' if row_num == 8 else 'red'))
-                if row_num == 2 or row_num == 7:
-                    #third rows
-                    if col_num == 1 or col_num == 7:
-                        board_source[row_num][col_num] = GamePiece("CANNON", ('blue' if row_num == 7 else 'red'))
-                if row_num == 3 or row_num == 6:
-                    #Fourth rows
-                    if col_num == 0 or col_num == 8 or col_num == 2 or col_num == 4 or col_num == 6:
-                        board_source[row_num][col_num] = GamePiece("SOLDIER", ('blue' if row_num == 6 else 'red'))
+        board_source = bytearray(BOARD_SIZE)
+        back_row = (CHARIOT, ELEPHANT, HORSE, GUARD, EMPTY, GUARD, ELEPHANT, HORSE, CHARIOT)
+        for col_num, piece_type in enumerate(back_row):
+            if piece_type:
+                board_source[col_num] = piece_type | RED
+                board_source[9 * BOARD_COLS + col_num] = piece_type | BLUE
+
+        #generals on the second rows
+        board_source[1 * BOARD_COLS + 4] = GENERAL | RED
+        board_source[8 * BOARD_COLS + 4] = GENERAL | BLUE
+
+        #cannons on the third rows
+        for col_num in (1, 7):
+            board_source[2 * BOARD_COLS + col_num] = CANNON | RED
+            board_source[7 * BOARD_COLS + col_num] = CANNON | BLUE
+
+        #soldiers on the fourth rows
+        for col_num in (0, 2, 4, 6, 8):
+            board_source[3 * BOARD_COLS + col_num] = SOLDIER | RED
+            board_source[6 * BOARD_COLS + col_num] = SOLDIER | BLUE
 
         return board_source
 
@@ -148,7 +763,7 @@ class JanggiGame:
         actual board takes up.
         """
         label_string = "    "
-        for index in range(len(self._board[0])):
+        for index in range(BOARD_COLS):
             label_string += self._col_conversion[index]
             label_string += (" " * (spacing - 1))
         return label_string + '\n'
@@ -161,48 +776,56 @@ class JanggiGame:
         and row labels and a message on the bottom saying whose turn it is and
         the current game state.
         """
-        board_string = self._col_label
-        for row in range(len(self._board)):
+        board_string = self._col_label_gen(14)
+        for row in range(BOARD_ROWS):
             if row < 9:
                 board_string += str(row + 1) + "  "
             else:
                 board_string += str(row + 1) + " "
-            for vertex in self._board[row]:
-                board_string += str(vertex)
-                for space_count in range((14 - len(str(vertex)))):
-                    board_string += " "
+            for col in range(BOARD_COLS):
+                vertex = str(_PIECES[self._board[row * BOARD_COLS + col]])
+                board_string += vertex
+                board_string += " " * (14 - len(vertex))
             board_string += "\n"
         board_string += "It is " + self._current_turn + " player's turn. The game state is " \
                         + self._game_state + ". \n"
         return board_string
 
 
-    def _set_vertex(self, location, value):
-        """
-        Takes a vertex location on the board and sets the value
-        at the location to the value given. Should only be given None
-        or a GamePiece as value.  Location in col-letter/row-num string format.
-        """
-        col_num = self._col_conversion[location[0]]
-        row_num = int(location[1:]) - 1
-        self._board[row_num][col_num] = value
-
     def get_game_state(self):
         """Returns whether the game is 'UNFINISHED', 'RED_WON', or 'BLUE_WON'"""
         return self._game_state
 
     def _find_general(self, player_color):
-        """Returns the location of the given player's general in col-letter/row-num string format"""
-        if player_color == 'blue':
-            for row_index in range(7,10):
-                for col_index in range(3,6):
-                    if str(self._board[row_index][col_index]) == ("GENERAL" + player_color):
-                        return self._col_conversion[col_index] + str(row_index + 1)
-        else:
-            for row_index in range(0,3):
-                for col_index in range(3,6):
-                    if str(self._board[row_index][col_index]) == ("GENERAL" + player_color):
-                        return self._col_conversion[col_index] + str(row_index + 1)
+        """
+        Returns the square number of the given player's general by scanning their palace.
+        The game tracks the generals as they move, so this is only used to set up and check that tracking.
+        """
+        general_code = GENERAL | COLOR_CODES[player_color]
+        first_row = 7 if player_color == 'blue' else 0
+        for row_index in range(first_row, first_row + 3):
+            for col_index in range(3,6):
+                square = row_index * BOARD_COLS + col_index
+                if self._board[square] == general_code:
+                    return square
+
+    def _check_consistency(self):
+        """
+        Debug helper that raises a RuntimeError if the tracked general squares, the
+        position hash or the evaluation scores don't match what is actually on the board.
+        """
+        for player_color in ('blue', 'red'):
+            tracked = self._generals[COLOR_CODES[player_color]]
+            found = self._find_general(player_color)
+            if tracked != found:
+                raise RuntimeError("tracked " + player_color + " general at " + str(tracked) +
+                                   " but the board has it at " + str(found))
+        position_hash, material, positional = self._compute_position()
+        if self._hash != position_hash:
+            raise RuntimeError("position hash " + hex(self._hash) + " does not match the board")
+        if (self._material, self._positional) != (material, positional):
+            raise RuntimeError("evaluation scores " + str((self._material, self._positional)) +
+                               " do not match the board")
 
     def convert_loc_to_str(self, row, col):
         """given a row and col (0 indexed) returns the string janggiGame representation of that cell"""
@@ -222,48 +845,138 @@ class JanggiGame:
         Takes as a parameter either 'red' or 'blue' and returns True
         if that player is in check, but returns False otherwise.
         """
-        general_location = self._find_general(player)
-        for row_index in range(len(self._board)):
-            for col_index in range(len(self._board[row_index])):
-                current_piece = self._board[row_index][col_index]
-                if current_piece is not None:
-                    if current_piece.get_color() != player:
-                        #At this point we have found a piece that belongs to the opponent
-                        #so we check if the general's location is in that pieces move_list, and if so it is in check
-                        if general_location in self._list_moves(self._convert_to_string_location(row_index, col_index)):
-                            return True
+        general_location = self._generals[COLOR_CODES[player]]
+        if general_location is None:
+            return False
+        return self._is_attacked(general_location, COLOR_CODES[player] ^ COLOR_MASK)
+
+    def _is_attacked(self, square, attacker_color):
+        """
+        Takes a square number and a player color code and returns True if any piece of that
+        color could move onto the square (ignoring check). Rather than generating every move
+        of every piece it looks outward from the square at only the places an attacker could be.
+        """
+        if self._slider_attacks(square, attacker_color):
+            return True
+
+        board = self._board
+        horse = HORSE | attacker_color
+        for origin, leg in _HORSE_ATTACKS[square]:
+            if board[origin] == horse and not board[leg]:
+                return True
+
+        elephant = ELEPHANT | attacker_color
+        for origin, first_leg, second_leg in _ELEPHANT_ATTACKS[square]:
+            if board[origin] == elephant and not board[first_leg] and not board[second_leg]:
+                return True
+
+        soldier = SOLDIER | attacker_color
+        for origin in _SOLDIER_ATTACKS[attacker_color][square]:
+            if board[origin] == soldier:
+                return True
+
+        #Generals and guards only reach squares one palace line away inside their own palace
+        for origin in _PALACE_TABLE[square]:
+            piece = board[origin]
+            if piece & COLOR_MASK == attacker_color and (piece & TYPE_MASK == GENERAL or piece & TYPE_MASK == GUARD):
+                return True
+        return False
+
+    def _slider_attacks(self, square, attacker_color):
+        """
+        Returns True if a chariot or cannon of the attacker color code could move onto the square.
+        Chariots are the first piece along a ray, cannons the second with a non-cannon screen
+        between (and a cannon can never capture another cannon).
+        """
+        board = self._board
+        cannon_can_capture = board[square] & TYPE_MASK != CANNON
+        chariot = CHARIOT | attacker_color
+        cannon = CANNON | attacker_color
+        for ray in _RAYS[square]:
+            screened = False
+            for ray_square in ray:
+                piece = board[ray_square]
+                if not piece:
+                    continue
+                if screened:
+                    if piece == cannon and cannon_can_capture:
+                        return True
+                    break
+                if piece == chariot:
+                    return True
+                if piece & TYPE_MASK == CANNON:
+                    break
+                screened = True
         return False
 
     def _is_in_checkmate(self, player_color):
         """
-        Takes as a parameter either 'red' or 'blue' and assumes that the given
-        player is in check (should only be called when a player is in check)
-        and returns True if there are no legal moves that would result in the player
+        Takes as a parameter either 'red' or 'blue' and returns True if that player
+        is in check and there are no legal moves that would result in the player
         not being in check, False otherwise.
         """
-        checkmate_bool = True
-
-        #We begin by iterating through every vertex on the board, looking for piece's the current player contorls
-        for row_index in range(len(self._board)):
-            for col_index in range(len(self._board[0])):
-                current_piece = self._board[row_index][col_index]
-                if current_piece is not None and current_piece.get_color() == player_color:
-
-                    #if we find one of current player's pieces then we see if any of its moves
-                    # result in being not in check.
-                    current_position = self._convert_to_string_location(row_index, col_index)
-                    potential_moves = self._list_moves(current_position)
-                    for move_to_try in potential_moves:
-                        self._try_move(current_position, move_to_try)
-                        checkmate_bool = self.is_in_check(player_color)
-                        self._restore_board()
-                        if not checkmate_bool:
-                            break
-                if not checkmate_bool:
-                    break
-            if not checkmate_bool:
-                break
-        return checkmate_bool
+        if not self.is_in_check(player_color):
+            #Passing is always legal when not in check
+            return False
+        for move in self._legal_moves(COLOR_CODES[player_color], False):
+            return False
+        return True
+
+    def generate_legal_moves(self, player_color, with_pass=False):
+        """
+        Takes as a parameter either 'red' or 'blue' and returns a list of Move tuples
+        (origin and destination square numbers) for every move that player could legally make,
+        whether or not it is their turn. Passing is legal whenever the player is not in check,
+        it is only listed (last, as PASS_MOVE) if with_pass.
+        """
+        return list(self._legal_moves(COLOR_CODES[player_color], False, with_pass))
+
+    def generate_legal_captures(self, player_color):
+        """Same as generate_legal_moves but only lists the moves that capture an opponents piece."""
+        return list(self._legal_moves(COLOR_CODES[player_color], True))
+
+    def _legal_moves(self, player_code, captures_only, with_pass=False):
+        """
+        Generator yielding a Move for every legal move of the player with the given color code
+        (only captures if captures_only), then PASS_MOVE if with_pass and they are not in check. Moves of the general, and moves leaving or landing on
+        one of the squares that decide whether the general is attacked (pins, screens, blocks
+        and captures of the checking piece) are tried with push_move to see if they leave the general
+        attacked. Every other move is legal unless the player is already in check, in which case
+        it can't be.
+        """
+        board = self._board
+        enemy_code = player_code ^ COLOR_MASK
+        general = self._generals[player_code]
+        if general is None:
+            check_lines = frozenset()
+            in_check = False
+        else:
+            check_lines = _CHECK_LINES[general]
+            in_check = self._is_attacked(general, enemy_code)
+
+        for origin in range(BOARD_SIZE):
+            piece = board[origin]
+            if not piece or piece & COLOR_MASK != player_code:
+                continue
+            is_general = piece & TYPE_MASK == GENERAL
+            origin_on_lines = origin in check_lines
+            for destination in self._list_moves(origin):
+                if destination == origin:
+                    continue
+                if captures_only and not board[destination]:
+                    continue
+                if is_general or origin_on_lines or destination in check_lines:
+                    self.push_move(origin, destination)
+                    king_square = self._generals[player_code]
+                    legal = not self._is_attacked(king_square, enemy_code)
+                    self.pop_move()
+                    if not legal:
+                        continue
+                elif in_check:
+                    continue
+                yield Move(origin, destination)
+        if with_pass and not in_check:
+            yield PASS_MOVE
 
     def make_move(self, piece_origin, piece_destination):
         """
@@ -281,40 +994,39 @@ class JanggiGame:
         if self._game_state != 'UNFINISHED':
             return False
         try:
-            #catching invalid inputs
-            validate_col = self._col_conversion[piece_origin[0]]
-            validate_row = int(piece_origin[1:])
-            if validate_col < 0 or validate_col > 8 or validate_row < 1 or validate_row > 10:
-                return False
-        except:
+            #catching invalid inputs, anything not naming a square on the board is rejected
+            origin = SQUARE_BY_NAME.get(piece_origin)
+            destination = SQUARE_BY_NAME.get(piece_destination)
+        except TypeError:
             print("error in make_move", piece_origin, piece_destination)
             return False
+        if origin is None:
+            return False
 
         #per a note from Piazza I have made it so any input of the same location for origin and destination
         # will result in a pass-turn legal move unless, of course, the game is already won.
 
-        piece_to_move = self._get_piece(piece_origin)
+        piece_to_move = self._board[origin]
+        moving_player = self._current_turn
         if piece_origin != piece_destination:
-            if piece_to_move is None:
+            if not piece_to_move:
                 return False
-            if piece_to_move.get_color() != self._current_turn:
+            if piece_to_move & COLOR_MASK != COLOR_CODES[moving_player]:
                 return False
-            potential_moves = self._list_moves(piece_origin)
-            if piece_destination not in potential_moves:
+            if destination not in self._list_moves(origin):
                 return False
-            self._try_move(piece_origin, piece_destination)
+            self.push_move(origin, destination)
 
-            #We check if making the given move is self-check, if so restore the board and return False
-            if self.is_in_check(self._current_turn):
-                self._restore_board()
+            #We check if making the given move is self-check, if so take it back and return False
+            if self.is_in_check(moving_player):
+                self.pop_move()
                 return False
         else:
             #Here we are in a situation where a player is trying to pass. This is a valid move unless that player
             # is currently in check.
-            if self.is_in_check(self._current_turn):
+            if self.is_in_check(moving_player):
                 return False
-
-        self._current_turn = self._color_dict[self._current_turn]
+            self.push_move(origin, origin)
 
         #Check if the player whose turn it is becoming is in checkmate
         if self.is_in_check(self._current_turn):
@@ -324,830 +1036,211 @@ class JanggiGame:
                 else:
                     self._game_state = 'BLUE_WON'
                 self._current_turn = self._color_dict[self._current_turn]
+                self._hash ^= _ZOBRIST_RED_TURN
 
         return True
 
-    def _try_move(self, piece_origin, piece_destination):
-        """
-        Stores a temporary board state before attempting to move a piece.
-        Then (without checking if it is their turn or if the game has ended
-        or if the piece can actually move in that way)
-        it makes the move. _restore_board should always be called
-        after _try_move unless the move has been certified as legal by make_move
-        """
-        self._temp_board = self._copy_2d_list(self._board)
-        piece_moving = self._get_piece(piece_origin)
-        if piece_moving is None:
-            return
-        if piece_origin == piece_destination:
-            return
-        self._set_vertex(piece_destination, piece_moving)
-        self._set_vertex(piece_origin, None)
-
-
-    def _copy_2d_list(self, list_to_copy):
-        """
-        Special helper function used for storing and restoring the locations
-        of all the pieces on the board without mutating the original or the copy.
-        Given a two dimensional list of standard dimensions (every row has the same
-        number of collums) returns a copy of that list that is a separate instance.
-        """
-        copy = [list() for counter in range(len(list_to_copy))]
-        for row in range(len(list_to_copy)):
-            for col in range(len(list_to_copy[0])):
-                copy[row].append(list_to_copy[row][col])
-        return copy
-
-    def _restore_board(self):
-        """
-        Only to be called after _try_move, restores the board to the state
-        it was in before try_move
-        """
-        self._board = self._copy_2d_list(self._temp_board)
-
     def get_piece(self, piece_location):
         """Get piece method for public use.  Takes a location string and returns the game piece (or None)"""
-        return self._get_piece(piece_location)
+        square = SQUARE_BY_NAME.get(piece_location)
+        if square is None:
+            return None
+        return _PIECES[self._get_piece(square)]
 
-    def _get_piece(self, piece_location):
+    def _get_piece(self, square):
         """
-        This function is used to get the piece (or None) at a given location.
-        Takes as parameter a vertex location that is a string of form
-        '[collumn letter][row number]' (ie 'a1' or 'i10') and returns the piece
-        at that location (or None if no piece there or if the location is off the board).'
+        This function is used to get the piece code at a given square number
+        (EMPTY if there is no piece there).
         """
-        if piece_location[0] not in self._col_conversion or 10 < int(piece_location[1:]) < 0:
-            return None
-        col = self._col_conversion[piece_location[0]]
-        row = int(piece_location[1:]) - 1
-        return self._board[row][col]
+        return self._board[square]
 
     def list_moves(self, piece_tuple):
         """Given a tuple or row,col for a piece returns a list of the possible locations
         that piece could move to (ignore check limitations)"""
-        return self._list_moves(self._convert_to_string_location(piece_tuple[0], piece_tuple[1]))
+        return [SQUARE_NAMES[square] for square in
+                self._list_moves(piece_tuple[0] * BOARD_COLS + piece_tuple[1])]
 
-    def _list_moves(self, piece_location):
+    def _list_moves(self, square):
         """
-        Takes as parameter a vertex location, in the form '[collumn letter][row number]'
-        and returns a list of all possible location the piece might move to
+        Takes as parameter a square number and returns a list of all possible square
+        numbers the piece might move to (starting with its own square, a pass)
         based on how that piece moves and its color. Does not consider if the moves
         would put the moving player in check. Returns an empty list if there is
-        no piece at the location or if the piece_location is off the board.
+        no piece at the square. With the move cache on (see set_move_cache_size) the
+        list may be shared with later calls, so it must not be changed. Any change
+        to the board changes the hash, so a cached list is never used for another position.
         """
-        piece_to_check = self._get_piece(piece_location)
-        if piece_to_check is None:
+        piece_to_check = self._board[square]
+        if not piece_to_check:
             return list()
-        if piece_to_check.get_name() == "GENERAL":
-            #General moves identical to guard, so removed earlier redundant method
-            # for general_moves.
-            return self._guard_moves(piece_location, piece_to_check.get_color())
-        if piece_to_check.get_name() == "GUARD":
-            return self._guard_moves(piece_location, piece_to_check.get_color())
-        if piece_to_check.get_name() == "SOLDIER":
-            return self._soldier_moves(piece_location, piece_to_check.get_color())
-        if piece_to_check.get_name() == "CHARIOT":
-            return self._chariot_moves(piece_location, piece_to_check.get_color())
-        if piece_to_check.get_name() == "HORSE":
-            return self._horse_moves(piece_location, piece_to_check.get_color())
-        if piece_to_check.get_name() == "ELEPHANT":
-            return self._ele_moves(piece_location, piece_to_check.get_color())
-        if piece_to_check.get_name() == "CANNON":
-            return self._cannon_moves(piece_location, piece_to_check.get_color())
-        return list()
+        if not self._move_cache_size:
+            return self._move_generators[piece_to_check & TYPE_MASK](square, piece_to_check & COLOR_MASK)
+        position_hash = self._hash if self._current_turn == 'blue' else self._hash ^ _ZOBRIST_RED_TURN
+        key = (position_hash, square)
+        cache = self._move_cache
+        moves = cache.get(key)
+        if moves is not None:
+            self._move_cache_hits += 1
+            cache.move_to_end(key)
+            return moves
+        self._move_cache_misses += 1
+        moves = self._move_generators[piece_to_check & TYPE_MASK](square, piece_to_check & COLOR_MASK)
+        cache[key] = moves
+        if len(cache) > self._move_cache_size:
+            cache.popitem(last=False)
+        return moves
+
+    def get_move_cache_stats(self):
+        """
+        Returns the move list cache's (hits, misses, lists held) since the game was made or the
+        cache cleared. Only lookups made while the cache is on are counted.
+        """
+        return self._move_cache_hits, self._move_cache_misses, len(self._move_cache)
+
+    def set_move_cache_size(self, size):
+        """Sets how many move lists the cache holds (0 turns it off), dropping the least recently used over it."""
+        self._move_cache_size = size
+        while len(self._move_cache) > size:
+            self._move_cache.popitem(last=False)
+
+    def clear_move_cache(self):
+        """Empties the move list cache and resets its counters."""
+        self._move_cache.clear()
+        self._move_cache_hits = 0
+        self._move_cache_misses = 0
 
 ##############   METHODS FOR GENERATING MOVES FOR DIFFERENT TYPES OF PIECES  ##############
-    def _cannon_moves(self, piece_location, piece_color):
+    def _cannon_moves(self, square, piece_color):
         """
-        Takes as a parameter a vertex location in form '[col letter][row num]'
-        and a player color and returns a list of string locations of the same form
-        of all valid moves for a cannon of the given color at the given location.
+        Takes as a parameter a square number and a player color code and returns a list
+        of square numbers of all valid moves for a cannon of the given color at the given square.
         Checks that any move includes a single piece jump over something
         that is not a cannon and does not arrive on
         a friendly piece or an opponents cannon.  Does not consider check.
         """
-        move_list = list()
-        move_list.append(piece_location)
-        current_row = int(piece_location[1:]) - 1
-        current_col = self._col_conversion[piece_location[0]]
-        slide_move_counter = 1
-
-        # integer values that counts the number of pieces encountered
-        # along that direction. Notable become 1 once we jumped over a non-cannon piece,
-        # and becomes 2 or greater when movement in that direction invalid.
-        # Becomes 2 if we hit edge of board
-        left_piece_count = 0
-        right_piece_count = 0
-        up_piece_count = 0
-        down_piece_count = 0
-        left_down_piece_count = 0
-        right_down_piece_count = 0
-        left_up_piece_count = 0
-        right_up_piece_count = 0
-
-        while left_piece_count < 2 or right_piece_count < 2 or up_piece_count < 2 or \
-                down_piece_count < 2 or left_down_piece_count < 2 or right_down_piece_count < 2 or \
-                left_up_piece_count < 2 or right_up_piece_count < 2:
-            if current_row - slide_move_counter < 0:
-                up_piece_count = 2
-            if current_row + slide_move_counter >= len(self._board):
-                down_piece_count = 2
-            if current_col + slide_move_counter >= len(self._board[0]):
-                right_piece_count = 2
-            if current_col - slide_move_counter < 0:
-                left_piece_count = 2
-
-            # moving left
-            # Once we have passed one piece each move is valid until we hit another pieces
-            # (scenarios of this in connected if and elif's)
-            if left_piece_count == 1 and self._board[current_row][current_col - slide_move_counter] is None:
-                move_list.append(self._convert_to_string_location(current_row, current_col - slide_move_counter))
-            elif left_piece_count == 1 and self._board[current_row][current_col - slide_move_counter].get_color() != piece_color:
-                if self._board[current_row][current_col - slide_move_counter].get_name() != 'CANNON':
-                    move_list.append(self._convert_to_string_location(current_row, current_col - slide_move_counter))
-                left_piece_count += 1
-            elif left_piece_count == 1:
-                left_piece_count += 1
-
-            #If we have not hit a piece yet checks if we hit a piece
-            if left_piece_count == 0 and self._board[current_row][current_col - slide_move_counter] is not None:
-
-                #if the piece we hit is a cannon set direction invalid, otherwise set pieces jumped to 1
-                if self._board[current_row][current_col - slide_move_counter].get_name() == 'CANNON':
-                    left_piece_count = 2
-                else:
-                    left_piece_count += 1
-
-            # movin right, see moving left comments for specific check breakdowns
-            if right_piece_count == 1 and self._board[current_row][current_col + slide_move_counter] is None:
-                move_list.append(self._convert_to_string_location(current_row, current_col + slide_move_counter))
-            elif right_piece_count == 1 and self._board[current_row][current_col + slide_move_counter].get_color() != piece_color:
-                if self._board[current_row][current_col + slide_move_counter].get_name() == "CANNON":
-                    right_piece_count += 2
-                else:
-                    move_list.append(self._convert_to_string_location(current_row, current_col + slide_move_counter))
-                    right_piece_count += 1
-            elif right_piece_count == 1:
-                right_piece_count += 1
-
-            if right_piece_count == 0 and self._board[current_row][current_col + slide_move_counter] is not None:
-                if self._board[current_row][current_col + slide_move_counter].get_name() == "CANNON":
-                    right_piece_count += 2
-                else:
-                    right_piece_count += 1
-
-            # moving up, see moving left comments for specific check breakdowns
-            if up_piece_count == 1 and self._board[current_row - slide_move_counter][current_col] is None:
-                move_list.append(self._convert_to_string_location(current_row - slide_move_counter, current_col))
-            elif up_piece_count == 1 and self._board[current_row - slide_move_counter][current_col].get_color() != piece_color:
-                if self._board[current_row - slide_move_counter][current_col].get_name() == 'CANNON':
-                    up_piece_count = 2
-                else:
-                    move_list.append(self._convert_to_string_location(current_row - slide_move_counter, current_col))
-                    up_piece_count += 1
-            elif up_piece_count == 1:
-                up_piece_count += 1
-
-            if up_piece_count == 0 and self._board[current_row - slide_move_counter][current_col] is not None:
-                if self._board[current_row - slide_move_counter][current_col].get_name() == 'CANNON':
-                    up_piece_count += 2
-                else:
-                    up_piece_count += 1
-
-
-            # moving down, see moving left for specific check breakdowns
-            if down_piece_count == 1 and self._board[current_row + slide_move_counter][current_col] is None:
-                move_list.append(self._convert_to_string_location(current_row + slide_move_counter, current_col))
-            elif down_piece_count == 1 and self._board[current_row + slide_move_counter][current_col].get_color() != piece_color:
-                if self._board[current_row + slide_move_counter][current_col].get_name() != 'CANNON':
-                    move_list.append(self._convert_to_string_location(current_row + slide_move_counter, current_col))
-                down_piece_count += 1
-            elif down_piece_count == 1:
-                down_piece_count += 1
-
-            if down_piece_count == 0 and self._board[current_row + slide_move_counter][current_col] is not None:
-                if self._board[current_row + slide_move_counter][current_col].get_name() == "CANNON":
-                    down_piece_count = 2
-                else:
-                    down_piece_count += 1
-
-            #Now for the rare Diagonal scenarios
-            if slide_move_counter == 3:
-                left_up_piece_count = 2
-                left_down_piece_count = 2
-                right_up_piece_count = 2
-                right_down_piece_count = 2
-
-            # diagonal left down, first we check if we are on a square in the palace we could move diagonally
-            #  left and down from.
-            if not self._diag_left(piece_location, 1):
-                left_down_piece_count = 2
-
-            #if we have one intervining piece and could move down-left then check if it is a valid place to move
-            if left_down_piece_count == 1 and self._diag_left(piece_location, 1):
-                if slide_move_counter + current_row >= len(self._board) or \
-                        current_col - slide_move_counter < 0:
-                    left_down_piece_count = 2
-                elif self._board[current_row + slide_move_counter][current_col - slide_move_counter] is None:
-                    move_list.append(self._convert_to_string_location(current_row + slide_move_counter,
-                                                                      current_col - slide_move_counter))
-                    left_down_piece_count = 2
-                elif self._board[current_row + slide_move_counter][current_col - slide_move_counter].get_color() != piece_color:
-                    if self._board[current_row + slide_move_counter][current_col - slide_move_counter].get_name() != 'CANNON':
-                        move_list.append(self._convert_to_string_location(current_row + slide_move_counter,
-                                                                      current_col - slide_move_counter))
-                    left_down_piece_count = 2
-                else:
-                    left_down_piece_count = 2
-
-            #if we have not encountered a piece and can move diagonally down, check if there is a valid piece to jump
-            if left_down_piece_count == 0 and \
-                    self._board[current_row + slide_move_counter][current_col - slide_move_counter] is not None:
-                if self._board[current_row + slide_move_counter][current_col - slide_move_counter].get_name() != 'CANNON':
-                    left_down_piece_count += 1
-                else:
-                    left_down_piece_count += 2
-
-            #If we dont find a valid jump on the first pass then there will never be a valid move, so set
-            # piece count for left-down to 2
-            elif left_down_piece_count == 0:
-                left_down_piece_count = 2
-
-
-            # diagonal left up, see diag left-down for logical breakdwon of parts
-            if not self._diag_left(piece_location, -1):
-                left_up_piece_count = 2
-
-            if left_up_piece_count == 1 and self._diag_left(piece_location, -1):
-                if current_row - slide_move_counter < 0 or \
-                        current_col - slide_move_counter < 0:
-                    left_up_piece_count = 2
-                elif self._board[current_row - slide_move_counter][current_col - slide_move_counter] is None:
-                    move_list.append(self._convert_to_string_location(current_row - slide_move_counter,
-                                                                      current_col - slide_move_counter))
-                    left_up_piece_count = 2
-                elif self._board[current_row - slide_move_counter][current_col - slide_move_counter].get_color() != piece_color:
-                    if self._board[current_row - slide_move_counter][current_col - slide_move_counter].get_name() != 'CANNON':
-                        move_list.append(self._convert_to_string_location(current_row - slide_move_counter,
-                                                                      current_col - slide_move_counter))
-                    left_up_piece_count = 2
-                else:
-                    left_up_piece_count = 2
-
-            if left_up_piece_count == 0 and \
-                    self._board[current_row - slide_move_counter][current_col - slide_move_counter] is not None:
-                if self._board[current_row - slide_move_counter][current_col - slide_move_counter].get_name() != 'CANNON':
-                    left_up_piece_count = 1
-                else:
-                    left_up_piece_count = 2
-            elif left_up_piece_count == 0:
-                left_up_piece_count = 2
-
-            # diagonal right up, see diag left-down for logical breakdwon of parts
-            if not self._diag_right(piece_location, -1):
-                right_up_piece_count = 2
-
-            if right_up_piece_count == 1:
-                if current_row - slide_move_counter < 0 or \
-                        current_col + slide_move_counter >= len(self._board[0]):
-                    right_up_piece_count = 2
-                elif self._board[current_row - slide_move_counter][current_col + slide_move_counter] is None:
-                    move_list.append(self._convert_to_string_location(current_row - slide_move_counter,
-                                                                      current_col + slide_move_counter))
-                    right_up_piece_count += 1
-                elif self._board[current_row - slide_move_counter][current_col + slide_move_counter].get_color() != piece_color:
-                    if self._board[current_row - slide_move_counter][current_col + slide_move_counter].get_name() != 'CANNON':
-                        move_list.append(self._convert_to_string_location(current_row - slide_move_counter,
-                                                                            current_col + slide_move_counter))
-                    right_up_piece_count = 2
-                else:
-                    right_up_piece_count = 2
-
-            if right_up_piece_count == 0:
-                if self._board[current_row - slide_move_counter][current_col + slide_move_counter] is not None:
-                    if self._board[current_row - slide_move_counter][current_col + slide_move_counter].get_name() != 'CANNON':
-                        right_up_piece_count += 1
-                    else:
-                        right_up_piece_count = 2
-                else:
-                    right_up_piece_count = 2
-
-            # diagonal right down, see diag left-down for logical breakdwon of parts
-            if not self._diag_right(piece_location, 1):
-                right_down_piece_count = 2
-
-            if right_down_piece_count == 1:
-                if current_row + slide_move_counter >= len(self._board) or \
-                        current_col + slide_move_counter >= len(self._board[0]):
-                    right_down_piece_count = 2
-                elif self._board[current_row + slide_move_counter][current_col + slide_move_counter] is None:
-                    move_list.append(self._convert_to_string_location(current_row + slide_move_counter,
-                                                                      current_col + slide_move_counter))
-                    right_down_piece_count += 1
-                elif self._board[current_row + slide_move_counter][current_col + slide_move_counter].get_color() != piece_color:
-                    if self._board[current_row + slide_move_counter][current_col + slide_move_counter].get_name() != 'CANNON':
-                        move_list.append(self._convert_to_string_location(current_row + slide_move_counter,
-                                                                      current_col + slide_move_counter))
-                    right_down_piece_count = 2
-                else:
-                    right_down_piece_count = 2
-
-            if right_down_piece_count == 0:
-                if self._board[current_row + slide_move_counter][current_col + slide_move_counter] is not None:
-                    if self._board[current_row + slide_move_counter][current_col + slide_move_counter].get_name() != 'CANNON':
-                        right_down_piece_count += 1
-                    else:
-                        right_down_piece_count = 2
+        board = self._board
+        move_list = [square]
+        for ray in _RAYS[square]:
+            jumped = False
+            for ray_square in ray:
+                target = board[ray_square]
+                if not jumped:
+                    #Until we hit a piece nothing is reachable, and a cannon can't be jumped
+                    if target:
+                        if target & TYPE_MASK == CANNON:
+                            break
+                        jumped = True
+                elif not target:
+                    move_list.append(ray_square)
                 else:
-                    right_down_piece_count = 2
-
-            slide_move_counter += 1
-
+                    #Once we have passed one piece each move is valid until we hit another piece
+                    if target & COLOR_MASK != piece_color and target & TYPE_MASK != CANNON:
+                        move_list.append(ray_square)
+                    break
         return move_list
 
-    def _horse_moves(self, piece_location, piece_color):
+    def _horse_moves(self, square, piece_color):
         """
-        Takes as a parameter a vertex location in form '[col letter][row num]'
-        and a player color and returns a list of possible moves for a horse
-        at the given location of the given color. Considers to make sure
+        Takes as a parameter a square number and a player color code and returns a list
+        of possible moves for a horse at the given square of the given color. Considers to make sure
         it does not require moving through a piece illegally or arrive
         on a friendly piece when making the list of moves. Does not consider check.
-        Moves returned in same string location form as locations are inputted.
-        """
-        move_list = list()
-        move_list.append(piece_location)
-        current_row = int(piece_location[1:]) - 1
-        current_col = self._col_conversion[piece_location[0]]
-
-        #check upward motion
-        if current_row - 2 >= 0:
-            if self._board[current_row - 1][current_col] is None:
-                if current_col - 1 >= 0:
-                    if self._board[current_row - 2][current_col - 1] is None or \
-                            self._board[current_row - 2][current_col - 1].get_color() != piece_color:
-                        move_list.append(self._convert_to_string_location(current_row - 2, current_col - 1))
-                if current_col + 1 < len(self._board[0]):
-                    if self._board[current_row - 2][current_col + 1] is None or \
-                            self._board[current_row - 2][current_col + 1].get_color() != piece_color:
-                        move_list.append(self._convert_to_string_location(current_row - 2, current_col + 1))
-
-        #check downward motion
-        if current_row + 2 < len(self._board):
-            if self._board[current_row + 1][current_col] is None:
-                if current_col - 1 >= 0:
-                    if self._board[current_row + 2][current_col - 1] is None or \
-                            self._board[current_row + 2][current_col - 1].get_color() != piece_color:
-                        move_list.append(self._convert_to_string_location(current_row + 2, current_col - 1))
-                if current_col + 1 < len(self._board[0]):
-                    if self._board[current_row + 2][current_col + 1] is None or \
-                            self._board[current_row + 2][current_col + 1].get_color() != piece_color:
-                        move_list.append(self._convert_to_string_location(current_row + 2, current_col + 1))
-
-        #check rightward motion
-        if current_col + 2 < len(self._board[0]):
-            if self._board[current_row][current_col + 1] is None:
-                if current_row - 1 >= 0:
-                    if self._board[current_row - 1][current_col + 2] is None or \
-                        self._board[current_row - 1][current_col + 2].get_color() != piece_color:
-                        move_list.append(self._convert_to_string_location(current_row - 1, current_col + 2))
-                if current_row + 1 < len(self._board):
-                    if self._board[current_row + 1][current_col + 2] is None or \
-                            self._board[current_row + 1][current_col + 2].get_color() != piece_color:
-                        move_list.append(self._convert_to_string_location(current_row + 1, current_col + 2))
-
-        #check leftward motion
-        if current_col - 2 >= 0:
-            if self._board[current_row][current_col - 1] is None:
-                if current_row - 1 >= 0:
-                    if self._board[current_row - 1][current_col - 2] is None or \
-                            self._board[current_row - 1][current_col - 2].get_color() != piece_color:
-                        move_list.append(self._convert_to_string_location(current_row - 1, current_col - 2))
-                if current_row + 1 < len(self._board):
-                    if self._board[current_row + 1][current_col - 2] is None or \
-                            self._board[current_row + 1][current_col - 2].get_color() != piece_color:
-                        move_list.append(self._convert_to_string_location(current_row + 1, current_col - 2))
-
+        Moves returned as square numbers.
+        """
+        board = self._board
+        move_list = [square]
+        for leg, target_square in _HORSE_TABLE[square]:
+            if not board[leg]:
+                target = board[target_square]
+                if not target or target & COLOR_MASK != piece_color:
+                    move_list.append(target_square)
         return move_list
 
-    def _ele_moves(self, piece_location, piece_color):
+    def _ele_moves(self, square, piece_color):
         """
-        Takes as a parameter a vertex location in form '[col letter][row num]'
-        and a player color and returns a list of possible moves for a elephant
-        at the given location of the given color. Considers to make sure
+        Takes as a parameter a square number and a player color code and returns a list
+        of possible moves for a elephant at the given square of the given color. Considers to make sure
         it does not require moving through a piece illegally or arrive
         on a friendly piece when making the list of moves. Does not consider check.
-        Moves returned in same string location form as locations are inputted.
-        """
-        move_list = list()
-        move_list.append(piece_location)
-        current_row = int(piece_location[1:]) - 1
-        current_col = self._col_conversion[piece_location[0]]
-
-        # check upward motion
-        if current_row - 3 >= 0:
-            if self._board[current_row - 1][current_col] is None:
-                if current_col - 2 >= 0:
-                    if self._board[current_row - 2][current_col - 1] is None:
-                        if self._board[current_row - 3][current_col - 2] is None or \
-                                self._board[current_row - 3][current_col - 2].get_color() != piece_color:
-                            move_list.append(self._convert_to_string_location(current_row - 3, current_col - 2))
-                if current_col + 2 < len(self._board[0]):
-                    if self._board[current_row - 2][current_col + 1] is None:
-                        if self._board[current_row - 3][current_col + 2] is None or \
-                                self._board[current_row - 3][current_col + 2].get_color() != piece_color:
-                            move_list.append(self._convert_to_string_location(current_row - 3, current_col + 2))
-
-        # check downward motion
-        if current_row + 3 < len(self._board):
-            if self._board[current_row + 1][current_col] is None:
-                if current_col - 2 >= 0:
-                    if self._board[current_row + 2][current_col - 1] is None:
-                        if self._board[current_row + 3][current_col - 2] is None or \
-                                self._board[current_row + 3][current_col - 2].get_color() != piece_color:
-                            move_list.append(self._convert_to_string_location(current_row + 3, current_col - 2))
-                if current_col + 2 < len(self._board[0]):
-                    if self._board[current_row + 2][current_col + 1] is None:
-                        if self._board[current_row + 3][current_col + 2] is None or \
-                                self._board[current_row + 3][current_col + 2].get_color() != piece_color:
-                            move_list.append(self._convert_to_string_location(current_row + 3, current_col + 2))
-
-        # check rightward motion
-        if current_col + 3 < len(self._board[0]):
-            if self._board[current_row][current_col + 1] is None:
-                if current_row - 2 >= 0:
-                    if self._board[current_row - 1][current_col + 2] is None:
-                        if self._board[current_row - 2][current_col + 3] is None or \
-                                self._board[current_row - 2][current_col + 3].get_color() != piece_color:
-                            move_list.append(self._convert_to_string_location(current_row - 2, current_col + 3))
-                if current_row + 2 < len(self._board):
-                    if self._board[current_row + 1][current_col + 2] is None:
-                        if self._board[current_row + 2][current_col + 3] is None or \
-                                self._board[current_row + 2][current_col + 3].get_color() != piece_color:
-                            move_list.append(self._convert_to_string_location(current_row + 2, current_col + 3))
-
-        # check leftward motion
-        if current_col - 3 >= 0:
-            if self._board[current_row][current_col - 1] is None:
-                if current_row - 2 >= 0:
-                    if self._board[current_row - 1][current_col - 2] is None:
-                        if self._board[current_row - 2][current_col - 3] is None or \
-                                self._board[current_row - 2][current_col - 3].get_color() != piece_color:
-                            move_list.append(self._convert_to_string_location(current_row - 2, current_col - 3))
-                if current_row + 2 < len(self._board):
-                    if self._board[current_row + 1][current_col - 2] is None:
-                        if self._board[current_row + 2][current_col - 3] is None or \
-                                self._board[current_row + 2][current_col - 3].get_color() != piece_color:
-                            move_list.append(self._convert_to_string_location(current_row + 2, current_col - 3))
-
+        Moves returned as square numbers.
+        """
+        board = self._board
+        move_list = [square]
+        for first_leg, second_leg, target_square in _ELEPHANT_TABLE[square]:
+            if not board[first_leg] and not board[second_leg]:
+                target = board[target_square]
+                if not target or target & COLOR_MASK != piece_color:
+                    move_list.append(target_square)
         return move_list
 
-    def _chariot_moves(self, piece_location, piece_color):
+    def _chariot_moves(self, square, piece_color):
         """
-        Takes as a parameter a vertex location in form '[col letter][row num]'
-        and a player color and returns a list of possible moves for a chariot
-        at the given location of the given color. Considers to make sure
+        Takes as a parameter a square number and a player color code and returns a list
+        of possible moves for a chariot at the given square of the given color. Considers to make sure
         it does not require moving through a piece illegally or arrive
         on a friendly piece when making the list of moves. Does not consider check.
-        Moves returned in same string location form as locations are inputted.
-        """
-        move_list = list()
-        move_list.append(piece_location)
-        current_row = int(piece_location[1:]) - 1
-        current_col = self._col_conversion[piece_location[0]]
-        slide_move_counter = 1
-
-        #Boolean value that remain true until we hit a piece or board edge along
-        #that direction (or in the case of diagonal if we arent in the palace)
-        left_bool = True
-        right_bool = True
-        up_bool = True
-        down_bool = True
-        left_down_bool = True
-        right_down_bool = True
-        left_up_bool = True
-        right_up_bool = True
-
-        #Loop through while there are valid moves in any direction, increasing distanced moved
-        # by 1 each time until we generate all the possible moves
-        while left_bool or right_bool or up_bool or down_bool or left_down_bool or \
-                        right_down_bool or left_up_bool or right_up_bool:
-            if current_row - slide_move_counter < 0:
-                up_bool = False
-            if current_row + slide_move_counter >= len(self._board):
-                down_bool = False
-            if current_col + slide_move_counter >= len(self._board[0]):
-                right_bool = False
-            if current_col - slide_move_counter < 0:
-                left_bool = False
-
-            #Orthogonal moves check (if their direction bool is not False) if at the current slide distance
-            # there is an empty vertex or an opponents piece, if so they add that vertex to move list.
-            # If there is any piece at the vertex current distance along that direction then the direction
-            # bool sets to False since the piece can't move past that position along that direction.
-
-            #moving left
-            if left_bool and (self._board[current_row][current_col - slide_move_counter] is None or \
-                            self._board[current_row][current_col - slide_move_counter].get_color() != piece_color):
-                move_list.append(self._convert_to_string_location(current_row, current_col - slide_move_counter))
-            if left_bool and self._board[current_row][current_col - slide_move_counter] is not None:
-                    left_bool = False
-
-            #movin right
-            if right_bool and (self._board[current_row][current_col + slide_move_counter] is None or \
-                            self._board[current_row][current_col + slide_move_counter].get_color() != piece_color):
-                move_list.append(self._convert_to_string_location(current_row, current_col + slide_move_counter))
-            if right_bool and self._board[current_row][current_col + slide_move_counter] is not None:
-                    right_bool = False
-
-            #moving up
-            if up_bool and (self._board[current_row - slide_move_counter][current_col] is None or \
-                            self._board[current_row - slide_move_counter][current_col].get_color() != piece_color):
-                move_list.append(self._convert_to_string_location(current_row - slide_move_counter, current_col))
-            if up_bool and self._board[current_row - slide_move_counter][current_col] is not None:
-                    up_bool = False
-
-            #moving down
-            if down_bool and (self._board[current_row + slide_move_counter][current_col] is None or \
-                            self._board[current_row + slide_move_counter][current_col].get_color() != piece_color):
-                move_list.append(self._convert_to_string_location(current_row + slide_move_counter, current_col))
-            if down_bool and self._board[current_row + slide_move_counter][current_col] is not None:
-                    down_bool = False
-
-            #If we hit third iteration, stop checking diagonals, no diagonal move of more than 2 is possible.
-            if slide_move_counter == 3:
-                left_up_bool = False
-                left_down_bool = False
-                right_up_bool = False
-                right_down_bool = False
-
-            #For each diagonal direction we check if the bool is still true and if a piece at origin location
-            #   Would be able to move diagonally that direction (ie in the palace along that sort of diagonal)
-            #   If we hit a piece or move out of the palace given slide distance then the directio bool become False
-            #   If bool is still true and we hit an empty spot or the opponents piece along the direction then we add
-            #   that location to the move list.
-
-            #diagonal left down
-            if left_down_bool and self._diag_left(piece_location, 1):
-                if slide_move_counter + current_row >= len(self._board) or \
-                        current_col - slide_move_counter < 0:
-                    left_down_bool = False
-                elif 2 < current_row + slide_move_counter < 7:
-                    left_down_bool = False
-                elif not 2 < current_col - slide_move_counter < 6:
-                    left_down_bool = False
-                elif self._board[current_row + slide_move_counter][current_col - slide_move_counter] is None:
-                    move_list.append(self._convert_to_string_location(current_row + slide_move_counter, current_col - slide_move_counter))
-                elif self._board[current_row + slide_move_counter][current_col - slide_move_counter].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(current_row + slide_move_counter,
-                                                                      current_col - slide_move_counter))
-                    left_down_bool = False
-                else:
-                    left_down_bool = False
-            else:
-                left_down_bool = False
-
-            # diagonal left up
-            if left_up_bool and self._diag_left(piece_location, -1):
-                if current_row - slide_move_counter < 0 or \
-                        current_col - slide_move_counter < 0:
-                    left_up_bool = False
-                elif 2 < current_row - slide_move_counter < 7:
-                    left_up_bool = False
-                elif not 2 < current_col - slide_move_counter < 6:
-                    left_up_bool = False
-                elif self._board[current_row - slide_move_counter][current_col - slide_move_counter] is None:
-                    move_list.append(self._convert_to_string_location(current_row - slide_move_counter,
-                                                                      current_col - slide_move_counter))
-                elif self._board[current_row - slide_move_counter][current_col - slide_move_counter].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(current_row - slide_move_counter,
-                                                                      current_col - slide_move_counter))
-                    left_up_bool = False
-                else:
-                    left_up_bool = False
-            else:
-                left_up_bool = False
-
-            # diagonal right up
-            if right_up_bool and self._diag_right(piece_location, -1):
-                if current_row - slide_move_counter < 0 or \
-                        current_col + slide_move_counter >= len(self._board[0]):
-                    right_up_bool = False
-                elif 2 < current_row - slide_move_counter < 7:
-                    right_up_bool = False
-                elif not 2 < current_col + slide_move_counter < 6:
-                    right_up_bool = False
-                elif self._board[current_row - slide_move_counter][current_col + slide_move_counter] is None:
-                    move_list.append(self._convert_to_string_location(current_row - slide_move_counter,
-                                                                      current_col + slide_move_counter))
-                elif self._board[current_row - slide_move_counter][current_col + slide_move_counter].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(current_row - slide_move_counter,
-                                                                      current_col + slide_move_counter))
-                    right_up_bool = False
-                else:
-                    right_up_bool = False
-            else:
-                right_up_bool = False
-
-            # diagonal right down
-            if right_down_bool and self._diag_right(piece_location, 1):
-                if current_row + slide_move_counter >= len(self._board) or \
-                        current_col + slide_move_counter >= len(self._board[0]):
-                    right_down_bool = False
-                elif 2 < current_row + slide_move_counter < 7:
-                    right_down_bool = False
-                elif not 2 < current_col + slide_move_counter < 6:
-                    right_down_bool = False
-                elif self._board[current_row + slide_move_counter][current_col + slide_move_counter] is None:
-                    move_list.append(self._convert_to_string_location(current_row + slide_move_counter,
-                                                                      current_col + slide_move_counter))
-                elif self._board[current_row + slide_move_counter][current_col + slide_move_counter].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(current_row + slide_move_counter,
-                                                                      current_col + slide_move_counter))
-                    right_down_bool = False
+        Moves returned as square numbers.
+        """
+        board = self._board
+        move_list = [square]
+        #Slide along each ray until we hit a piece, adding every empty vertex
+        # and the first opponents piece along the way.
+        for ray in _RAYS[square]:
+            for ray_square in ray:
+                target = board[ray_square]
+                if not target:
+                    move_list.append(ray_square)
                 else:
-                    right_down_bool = False
-            else:
-                right_down_bool = False
-
-
-            slide_move_counter += 1
-
+                    if target & COLOR_MASK != piece_color:
+                        move_list.append(ray_square)
+                    break
         return move_list
 
-    def _diag_left(self, vertex_location, vertical_direction):
-        """
-        Helper function to determine if a Solider/Chariot/Cannon at the given location
-        and with the given vertical_direction (-1 for up, 1 for down) that it moves
-        could move diagonally left (along palace diagonal).
-        Returns True if so, False otherwise.  Really just checks if there is a line
-        diagonally that direction from the given location.
-        """
-        if vertical_direction > 0:
-            if vertex_location in ['f8','e9', 'f1','e2']:
-                return True
-            return False
-        if vertical_direction < 0:
-            if vertex_location in ['f3','e2','f10','e9']:
-                return True
-            return False
-        return False
-
-    def _diag_right(self, vertex_location, vertical_direction):
-        """
-        Helper function to determine if a Solider/Chariot/Cannon at the given location
-        and with the given vertical_direction (-1 for up, 1 for down) that it moves
-        could move diagonally right (along palace diagonal) in that direction.
-        Returns True if so, False otherwise.
-        """
-        if vertical_direction > 0:
-            if vertex_location in ['d8', 'e9','d1','e2']:
-                return True
-            return False
-        if vertical_direction < 0:
-            if vertex_location in ['d3', 'e2','d10','e9']:
-                return True
-            return False
-        return False
-
-    def _soldier_moves(self, piece_location, piece_color):
+    def _soldier_moves(self, square, piece_color):
         """
-        Takes as a parameter a vertex location in form '[col letter][row num]'
-        and a player color and returns a list of possible moves for a soldier
-        at the given location of the given color. Considers to make sure
+        Takes as a parameter a square number and a player color code and returns a list
+        of possible moves for a soldier at the given square of the given color. Considers to make sure
         it does not arrive on a friendly piece when making the list of moves.
         Does not consider check.
-        Moves returned in same string location form as locations are inputted.
-        """
-        move_list = list()
-        move_list.append(piece_location)
-        #vertical_move used to determine if piece moves up or down the board
-        # -1 for up, 1 for down.
-        if piece_color == 'blue':
-            vertical_move = -1
-        else:
-            vertical_move = 1
-        current_row = int(piece_location[1:]) - 1
-        current_col = self._col_conversion[piece_location[0]]
-        left_col = current_col - 1
-        right_col = current_col + 1
-        next_row = current_row + vertical_move
-
-        #move left
-        if current_col > 0:
-            if self._board[current_row][left_col] is None or \
-                self._board[current_row][left_col].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(current_row, left_col))
-
-        #move right
-        if current_col < 8:
-            if self._board[current_row][right_col] is None or \
-                self._board[current_row][right_col].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(current_row, right_col))
-
-        #move up
-        if vertical_move < 0:
-            if current_row > 0:
-                if self._board[next_row][current_col] is None or \
-                    self._board[next_row][current_col].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(next_row, current_col))
-
-        #move down
-        if vertical_move > 0:
-            if current_row < 9:
-                if self._board[next_row][current_col] is None or \
-                    self._board[next_row][current_col].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(next_row, current_col))
-
-        #diagonal left
-        if self._diag_left(piece_location, vertical_move):
-            if self._board[next_row][left_col] is None or \
-                    self._board[next_row][left_col].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(next_row, left_col))
-
-        #diagonal right
-        if self._diag_right(piece_location, vertical_move):
-            if self._board[next_row][right_col] is None or \
-                    self._board[next_row][right_col].get_color() != piece_color:
-                    move_list.append(self._convert_to_string_location(next_row, right_col))
-
+        Moves returned as square numbers.
+        """
+        board = self._board
+        move_list = [square]
+        for target_square in _SOLDIER_TABLE[piece_color][square]:
+            target = board[target_square]
+            if not target or target & COLOR_MASK != piece_color:
+                move_list.append(target_square)
         return move_list
 
-    def _guard_moves(self, piece_location, piece_color):
+    def _guard_moves(self, square, piece_color):
         """
-        Takes as a parameter a vertex location in form '[col letter][row num]'
-        and a player color and returns a list of possible moves for a guard or general
-        at the given location of the given color. Considers to make sure
+        Takes as a parameter a square number and a player color code and returns a list
+        of possible moves for a guard or general at the given square of the given color. Considers to make sure
         it does not arrive on a friendly piece when making the list of moves,
         and that the move would not take it out of the palace.
         Does not consider check.
-        Moves returned in same string location form as locations are inputted.
-        """
-        move_list = list()
-        move_list.append(piece_location)
-        current_row = int(piece_location[1:]) - 1
-        current_col = self._col_conversion[piece_location[0]]
-
-        #For blue guards checks for moves within the blue palace
-        if piece_color == 'blue':
-
-            #Iterates through each square in the palace looking to see if moving there
-            # would be a valid move
-            for row_index in range(7, 10):
-                for col_index in range(3, 6):
-                    row_dist = abs(row_index - current_row)
-                    col_dist = abs(col_index - current_col)
-                    if row_dist > 1 or col_dist > 1:
-                        continue
-
-                    #Checks each of the non-existent diagonal conditions
-                    # and skips this iteration if it would be a move from
-                    #  one of the non-diagonal connected squares in a diagonal direction
-                    if current_col == 3 and current_row == 8:
-                        if row_dist == 1 and col_dist == 1:
-                            continue
-                    if current_col == 5 and current_row == 8:
-                        if row_dist == 1 and col_dist == 1:
-                            continue
-                    if current_col == 4 and current_row == 7:
-                        if row_dist == 1 and col_dist == 1:
-                            continue
-                    if current_col == 4 and current_row == 9:
-                        if row_dist == 1 and col_dist == 1:
-                            continue
-
-                    if self._board[row_index][col_index] is None or \
-                            self._board[row_index][col_index].get_color() == 'red':
-                        move_list.append(self._col_conversion[col_index] + str(row_index + 1))
-
-        # If not blue then it is red and we do the parrallel comparisons within the red palace.
-        else:
-            for row_index in range(0, 3):
-                for col_index in range(3, 6):
-                    row_dist = abs(row_index - current_row)
-                    col_dist = abs(col_index - current_col)
-                    if row_dist > 1 or col_dist > 1:
-                        continue
-                    if current_col == 3 and current_row == 1:
-                        if row_dist == 1 and col_dist == 1:
-                            continue
-                    if current_col == 5 and current_row == 1:
-                        if row_dist == 1 and col_dist == 1:
-                            continue
-                    if current_col == 4 and current_row == 0:
-                        if row_dist == 1 and col_dist == 1:
-                            continue
-                    if current_col == 4 and current_row == 2:
-                        if row_dist == 1 and col_dist == 1:
-                            continue
-                    if self._board[row_index][col_index] is None or \
-                            self._board[row_index][col_index].get_color() == 'blue':
-                        move_list.append(self._col_conversion[col_index] + str(row_index + 1))
+        Moves returned as square numbers.
+        """
+        board = self._board
+        move_list = [square]
+        for target_square in _PALACE_TABLE[square]:
+            target = board[target_square]
+            if not target or target & COLOR_MASK != piece_color:
+                move_list.append(target_square)
         return move_list
 
 
 
 
-
+#The moves main() plays to bring its game to the verge of checkmate, the first 8 move some pieces
+# around and the rest set up the checkmate
+DEMO_SETUP_MOVES = (
+    ('e9', 'e8'), ('e2', 'e3'), ('f10', 'e10'), ('d1', 'e1'), ('a10', 'a9'), ('a1', 'a2'), ('a9', 'f9'), ('a2', 'f2'),
+    ('f9', 'f2'), ('e3', 'd3'), ('f2', 'f1'), ('d3', 'd2'), ('i7', 'h7'), ('i4', 'h4'), ('i10', 'i2'), ('d2', 'd1'),
+    ('h8', 'd8'), ('a4', 'a5'), ('f1', 'f2'), ('e1', 'f1'), ('e7', 'd7'), ('c1', 'd3'), ('d8', 'i8'), ('i1', 'i2'),
+    ('f2', 'f4'), ('e4', 'f4'), ('i8', 'i1'), ('h3', 'h7'), ('c7', 'c6'), ('h7', 'e7'), ('c6', 'c5'), ('i2', 'i9'),
+    ('c5', 'c4'), ('e7', 'e10'), ('c4', 'c3'), ('e10', 'h10'), ('c3', 'c2'), ('d3', 'e5'), ('c2', 'b2'), ('e5', 'f7'),
+)
 
 
 def main():
@@ -1175,49 +1268,11 @@ def main():
     print(game.make_move('a4', 'a4'), True)  # this will pass the Red's turn and return True
     keep_playing = True
     game = JanggiGame()
-    #moving some pieces around
-    game.make_move('e9','e8')
-    game.make_move('e2','e3')
-    game.make_move('f10','e10')
-    game.make_move('d1','e1')
-    game.make_move('a10','a9')
-    game.make_move('a1','a2')
-    game.make_move('a9','f9')
-    game.make_move('a2','f2')
-    #setting up a checkmate
-    game.make_move('f9','f2')
-    game.make_move('e3','d3')
-    game.make_move('f2','f1')
-    game.make_move('d3','d2')
-    game.make_move('i7','h7')
-    game.make_move('i4','h4')
-    game.make_move('i10','i2')
-    game.make_move('d2','d1')
-    game.make_move('h8','d8')
-    game.make_move('a4','a5')
-    game.make_move('f1','f2')
-    game.make_move('e1','f1')
-    game.make_move('e7', 'd7')
-    game.make_move('c1', 'd3')
-    game.make_move('d8', 'i8')
-    game.make_move('i1', 'i2')
-    game.make_move('f2', 'f4')
-    game.make_move('e4', 'f4')
-    game.make_move('i8', 'i1')
-    game.make_move('h3', 'h7')
-    game.make_move('c7', 'c6')
-    game.make_move('h7', 'e7')
-    game.make_move('c6', 'c5')
-    game.make_move('i2', 'i9')
-    game.make_move('c5', 'c4')
-    game.make_move('e7', 'e10')
-    game.make_move('c4', 'c3')
-    game.make_move('e10', 'h10')
-    game.make_move('c3', 'c2')
-    game.make_move('d3', 'e5')
-    game.make_move('c2', 'b2')
-    game.make_move('e5', 'f7')
     with open('move_save.txt', 'w') as save_file:
+        #The setup moves are logged too, so the log replays from the start position
+        for origin, destination in DEMO_SETUP_MOVES:
+            game.make_move(origin, destination)
+            save_file.write("game.make_move('" + origin + "','" + destination + "')\n")
         while keep_playing:
             print(game)
             to_move = input("which piece would you like to move? ")
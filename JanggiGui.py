@@ -1,21 +1,247 @@
 # Author:Stew Towle
 # Date: November 2022
 # Description: This script contains the GUI for playing Janggi using my original Janggi program
-#       It utilizes pygame to make the gui.
+#       It utilizes pygame to make the gui. AI moves are worked out on a background thread so the
+#       window stays responsive while the AI thinks:
+#           python JanggiGui.py --ai-time 5
 
+import argparse
 import pygame as pg
 import JanggiGame as jg
 import JanggiAi as ai
+import queue
 import random
+import threading
+import time
 
 FRAME_RATE = 15
+#Seconds the AI gets per move (None to play ai_move_simple's choice instead of searching), and how
+# long its chosen piece is shown selected before the move is made
+DEFAULT_AI_TIME = 2.0
+AI_MOVE_DELAY = 1.0
+#The square names of a pass, as the AI worker reports it
+PASS_MOVE = ('a1', 'a1')
 BOARD_DARK = pg.Color("dark gray")
 BOARD_LIGHT = pg.Color("white")
 BG_COL = pg.Color("gray")
 TEXT_COL = pg.Color("indigo")
 ON_COL = pg.Color("green")
 OFF_COL = pg.Color("darkslategray")
+HIGHLIGHT_COL = pg.Color("light green")
 
+#Fonts, piece sprites and rendered text are made once and reused every frame
+_FONTS = dict()
+_SPRITES = dict()
+_TEXTS = dict()
+
+
+def get_font(size):
+    """Returns pygame's default font at the given (pixel) size, only loading it the first time."""
+    size = int(size)
+    if size not in _FONTS:
+        _FONTS[size] = pg.font.Font(None, size)
+    return _FONTS[size]
+
+
+def render_text(text, size, color):
+    """Returns a surface with the text rendered in the default font at size and color, rendered once."""
+    key = (text, int(size), tuple(color))
+    if key not in _TEXTS:
+        _TEXTS[key] = get_font(size).render(text, False, color)
+    return _TEXTS[key]
+
+
+def piece_sprites(cell_size):
+    """
+    Returns a dict of every GamePiece to a cell_size square surface (transparent outside the
+    piece) with the piece drawn on it: a circle of its color, gold ringed for generals, and the
+    first three letters of its name. They are drawn once per cell size.
+    """
+    if cell_size not in _SPRITES:
+        half_cell = cell_size / 2
+        label_font = get_font(half_cell)
+        sprites = dict()
+        for type_code in range(jg.GENERAL, jg.SOLDIER + 1):
+            for color in ('blue', 'red'):
+                piece = jg.GamePiece(jg.PIECE_NAMES[type_code], color)
+                sprite = pg.Surface((int(cell_size), int(cell_size)), pg.SRCALPHA)
+                center = (half_cell, half_cell)
+                if type_code == jg.GENERAL:
+                    pg.draw.circle(sprite, pg.Color("gold"), center, half_cell)
+                pg.draw.circle(sprite, color, center, half_cell - 3)
+                text = label_font.render(piece.get_name()[:3], False, pg.Color("white"))
+                text_size = text.get_size()
+                sprite.blit(text, (half_cell - (text_size[0] / 2), half_cell - (text_size[1] / 2)))
+                sprites[piece] = sprite
+        _SPRITES[cell_size] = sprites
+    return _SPRITES[cell_size]
+
+
+def position_key(game):
+    """Returns a key that identifies the game's position (the board and the player to move)."""
+    return game.get_square_codes(), game.get_whose_turn()
+
+
+class AiJob:
+    """
+    One piece of work for the AiWorker thread: the position key (see position_key) its move is
+    for (None when pondering every reply, which only warms the table), the key of the GUI's
+    position when it was started, the event that stops its search, and whether it is still
+    pondering or has been cancelled.
+    """
+
+    def __init__(self, key, started_from, pondering):
+        self.key = key
+        self.started_from = started_from
+        self.pondering = pondering
+        self.cancelled = False
+        self.stop_event = threading.Event()
+        self.timer = None
+
+    def cancel(self):
+        """Stops the job's search, nothing it finds is ever returned."""
+        self.cancelled = True
+        self.stop_event.set()
+        if self.timer is not None:
+            self.timer.cancel()
+
+
+class AiWorker:
+    """
+    Works out AI moves on a background thread so the GUI never waits on them. start hands it a
+    position, poll returns the move for that position once it is ready (a pass is PASS_MOVE).
+    The thread searches its own copy of the game, so the GUI's game can be drawn (and even
+    changed, the result is then dropped) while it thinks.
+    ponder uses the opponent's turn: it searches the position after the reply the last search
+    predicted (or, with no prediction, the opponent's position itself) with no time limit. If the
+    opponent plays the predicted reply start turns that search into the real one, which gets the
+    full time budget on top of the time it already had, otherwise it is stopped and the new search
+    starts from the transposition table the ponder filled.
+    """
+
+    def __init__(self, time_budget=DEFAULT_AI_TIME):
+        """
+        Takes the seconds to search per move, or None to pick a random move from the top tier of
+        ai_move_simple as the GUI always has. The transposition table is kept for the whole game.
+        """
+        self.time_budget = time_budget
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self._table = ai.TranspositionTable()
+        self._results = queue.Queue()
+        self._thread = None
+        self._job = None
+        #(position key after the last move found, the (origin, destination) reply its search predicted)
+        self._prediction = None
+
+    def start(self, game):
+        """Starts working out a move for the game's player to move, taking over a ponder of that position."""
+        key = position_key(game)
+        job = self._job
+        if job is not None and job.pondering:
+            if job.key == key:
+                self.ponder_hits += 1
+                job.pondering = False
+                job.started_from = key
+                job.timer = threading.Timer(self.time_budget, job.stop_event.set)
+                job.timer.daemon = True
+                job.timer.start()
+                return
+            self.ponder_misses += 1
+        self._launch(type(game).from_notation(game.to_notation()), AiJob(key, key, False))
+
+    def ponder(self, game):
+        """Starts pondering while the game's player to move (the AI's opponent) thinks."""
+        if self.time_budget is None:
+            return
+        started_from = position_key(game)
+        copy = type(game).from_notation(game.to_notation())
+        key = None
+        if self._prediction is not None and self._prediction[0] == started_from and \
+                copy.make_move(*self._prediction[1]):
+            key = position_key(copy)
+        self._launch(copy, AiJob(key, started_from, True))
+
+    def status(self):
+        """Returns 'thinking' while a move is being worked out, 'pondering' while pondering, otherwise None."""
+        if self._job is None:
+            return None
+        return 'pondering' if self._job.pondering else 'thinking'
+
+    def started_from(self):
+        """Returns the position key the GUI had when the current job was started, None if there is none."""
+        return None if self._job is None else self._job.started_from
+
+    def poll(self, game):
+        """
+        Returns the (origin, destination) square names of the move worked out for the game's
+        position, or None if it isn't ready. Results for other (stale) positions are dropped.
+        """
+        if self._job is None or self._job.pondering:
+            return None
+        while True:
+            try:
+                job, move = self._results.get_nowait()
+            except queue.Empty:
+                return None
+            if job is self._job and job.key == position_key(game):
+                self._job = None
+                return move
+
+    def cancel(self):
+        """Stops the current job, its result will never be returned."""
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def shutdown(self, timeout=1.0):
+        """Cancels any work and waits up to timeout seconds for the thread to finish."""
+        self.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _launch(self, game, job):
+        """
+        Cancels the current job and starts a thread doing job on game (a copy the thread owns).
+        The old thread is waited for so two searches never share the table.
+        """
+        self.cancel()
+        if self._thread is not None:
+            self._thread.join()
+        self._job = job
+        self._thread = threading.Thread(target=self._think, args=(game, job), daemon=True)
+        self._thread.start()
+
+    def _think(self, game, job):
+        """Thread side: works out the move for the game and queues it with its job unless cancelled."""
+        if self.time_budget is None:
+            move = self._simple_move(game)
+        else:
+            #A ponder searches until it is stopped, by a ponder hit's timer or by cancelling it
+            depth = ai.MAX_SEARCH_DEPTH if job.pondering else None
+            time_limit = None if job.pondering else self.time_budget
+            result = ai.search(game, depth, time_limit, self._table, job.stop_event)
+            pv = [(jg.SQUARE_NAMES[move.origin], jg.SQUARE_NAMES[move.destination]) for move in result.pv]
+            move = pv[0] if result.move is not None else PASS_MOVE
+            if job.key is not None and not job.cancelled and len(pv) > 1 and game.make_move(*move):
+                self._prediction = (position_key(game), pv[1])
+        if not job.cancelled and job.key is not None:
+            self._results.put((job, move))
+
+    @staticmethod
+    def _simple_move(game):
+        """Returns a random move from the top tier of ai_move_simple that make_move accepts, or PASS_MOVE."""
+        potential_moves = ai.ai_move_simple(game, game.get_whose_turn())
+        if not potential_moves:
+            return PASS_MOVE
+        top_val = potential_moves[0][0]
+        choices = [move for move in potential_moves if move[0] == top_val]
+        random.shuffle(choices)
+        for choice in choices:
+            if game.make_move(choice[1], choice[2]):
+                return choice[1], choice[2]
+        return PASS_MOVE
 
 
 class JanggiGui:
@@ -23,8 +249,11 @@ class JanggiGui:
     Contains the GUI for playing Janggi
     """
 
-    def __init__(self, size=None):
-        """"""
+    def __init__(self, size=None, ai_time=DEFAULT_AI_TIME, ponder=True):
+        """
+        Takes the board width in pixels, the AI's seconds per move (None for the simple AI) and
+        whether the AI ponders on its human opponent's turn.
+        """
         self.game = jg.JanggiGame()
         self.WIDTH = 760 if size is None else size
         self.HEIGHT = (self.WIDTH / 9) * 10
@@ -36,8 +265,25 @@ class JanggiGui:
         self.piece_selected = None
         self.last_move_valid = True
         self.played_by_ai = {'blue': False, 'red': False}
+        self.ai_worker = AiWorker(ai_time)
+        #The AI move waiting to be made (square names) and the time.monotonic() to make it at
+        self.pending_ai_move = None
+        self.pending_ai_time = 0
+        #Position keys of the last positions the AI was started and pondered on, so it does each once
+        self.ai_started_on = None
+        self.ponder = ponder
+        self.ponder_started_on = None
         self.BUTTON_PADDING = self.CELL_SIZE // 8
         self.button_height = self.CELL_SIZE // 2 - (self.BUTTON_PADDING // 2)
+        #Render state, set up once the display exists: the static board surface, the (piece,
+        # highlighted) last drawn on each square and the header (info text and buttons) last drawn
+        self.board_surface = None
+        self.drawn_squares = None
+        self.drawn_header = None
+        #Squares (row, col) to highlight for the selected piece: it and its legal destinations,
+        # worked out again only when the selection or position (highlight_key) changes
+        self.highlighted = set()
+        self.highlight_key = None
 
     def run(self):
         """Runs a fresh game"""
@@ -45,11 +291,9 @@ class JanggiGui:
         random.seed()
         screen = pg.display.set_mode((self.WIDTH + (2 * self.SIDE_PADDING), self.PADDING + self.HEIGHT + (2 * self.SIDE_PADDING)))
         clock = pg.time.Clock()
-        screen.fill(pg.Color("gray"))
+        self.board_surface = None
         self.draw_game(screen)
         running = True
-        cur_turn = None
-        has_played = self.game.get_whose_turn()
         while running:
             for event in pg.event.get():
                 if event.type == pg.QUIT:
@@ -59,11 +303,16 @@ class JanggiGui:
                     if mouse_pos[1] < self.PADDING:
                         if mouse_pos[0] > self.WIDTH - 2*self.CELL_SIZE:
                             if mouse_pos[1] < self.button_height:
-                                self.played_by_ai['blue'] = not self.played_by_ai['blue']
+                                self.toggle_ai('blue')
                             elif mouse_pos[1] > self.button_height + self.BUTTON_PADDING and \
                                 mouse_pos[1] < 2*self.button_height + self.BUTTON_PADDING:
-                                self.played_by_ai['red'] = not self.played_by_ai['red']
-                    if not self.piece_selected:
+                                self.toggle_ai('red')
+                    elif self.played_by_ai[self.game.get_whose_turn()] or self.pending_ai_move is not None:
+                        #The board belongs to the AI while it is on move (the selection shown is its own
+                        # once it has picked a move), only the buttons work
+                        if self.pending_ai_move is None:
+                            self.piece_selected = None
+                    elif not self.piece_selected:
                         attempt = self.get_click_location(mouse_pos)
                         if self.game.get_board()[attempt[0]][attempt[1]]:
                             self.piece_selected = attempt
@@ -71,55 +320,73 @@ class JanggiGui:
                         self.attempt_move(self.piece_selected, self.get_click_location(mouse_pos))
                         self.piece_selected = None
 
-            if has_played is False and self.played_by_ai[cur_turn]:
-                has_played = True
-                self.make_ai_move(self.game.get_whose_turn(), screen, clock)
-                clock.tick(FRAME_RATE)
-
-            if cur_turn != self.game.get_whose_turn():
-                cur_turn = self.game.get_whose_turn()
-                has_played = False
-
+            self.update_ai()
             self.draw_game(screen)
             clock.tick(FRAME_RATE)
-            pg.display.flip()
+        self.ai_worker.shutdown()
+        pg.quit()
+
+    def toggle_ai(self, color):
+        """Turns the AI for color on or off, stopping its move if it was working one out."""
+        self.played_by_ai[color] = not self.played_by_ai[color]
+        self.ponder_started_on = None
+        if not self.played_by_ai[color] and self.game.get_whose_turn() == color:
+            self.ai_worker.cancel()
+            self.ai_started_on = None
+            if self.pending_ai_move is not None:
+                self.pending_ai_move = None
+                self.piece_selected = None
 
-    def make_ai_move(self, color, screen, clock):
+    def update_ai(self):
         """
-        Makes a move using ai_simple_move from JanggiAi. Displays the move as well.
+        Called every frame: starts the AI worker when it is an AI player's turn (or pondering when
+        it is the turn of a human playing the AI), picks up its move when it is ready (showing the
+        piece selected for AI_MOVE_DELAY seconds) and then makes it. Never waits on the AI.
         """
-        potential_moves = ai.ai_move_simple(self.game, color)
-        if not potential_moves:
-            print("NO VALID MOVES FOR AI - red")
-        else:
-            current_move = potential_moves[0]
-            top_val = current_move[0]
-            choices = list()
-            for move in potential_moves:
-                if move[0] > top_val:
-                    break
-                choices.append(move)
-            current_move = choices[random.randrange(len(choices))]
-            print("choices", choices)
-            #clock.tick(5)
-            self.piece_selected = (int(current_move[1][1:]) - 1, self.col_conversion[current_move[1][0]])
-            self.draw_game(screen)
-            clock.tick(FRAME_RATE)
-            pg.display.flip()
-            clock.tick(1)
-
-            #This deals with the potential of an invalid move being attempted by picking another move
-            while not self.game.make_move(current_move[1], current_move[2]):
-                choices.remove(current_move)
-                if len(choices) == 0:
-                    print("No possible moves, so pass")
-                    if not self.game.make_move("a1","a1"):
-                        print("game is over because no valid moves in check, should have registered as checkmate")
-                        if self.game.is_in_checkmate(color):
-                            self.game._game_state = 'BLUE_WON' if color == 'red' else 'RED_WON'
-                    break
-                current_move = choices[random.randrange(len(choices))]
+        key = position_key(self.game)
+        if self.pending_ai_move is not None:
+            if key != self.ai_started_on:
+                #the position was changed by hand while the move was being shown
+                self.pending_ai_move = None
+            elif time.monotonic() >= self.pending_ai_time:
+                self.make_ai_move(*self.pending_ai_move)
+                self.pending_ai_move = None
+                self.piece_selected = None
+            return
+        if self.ai_worker.status() == 'thinking' and self.ai_worker.started_from() != key:
+            self.ai_worker.cancel()
+        if self.game.get_game_state() != 'UNFINISHED':
+            self.ai_worker.cancel()
+            return
+        turn = self.game.get_whose_turn()
+        if not self.played_by_ai[turn]:
+            #A human's turn: ponder if they are playing the AI
+            if self.ponder and self.played_by_ai[ai.COLOR_SWITCH[turn]]:
+                if key != self.ponder_started_on:
+                    self.ponder_started_on = key
+                    self.ai_worker.ponder(self.game)
+            elif self.ai_worker.status() == 'pondering':
+                self.ai_worker.cancel()
+            return
+        if key != self.ai_started_on:
+            self.ai_started_on = key
             self.piece_selected = None
+            self.ai_worker.start(self.game)
+            return
+        move = self.ai_worker.poll(self.game)
+        if move is not None:
+            self.pending_ai_move = move
+            self.pending_ai_time = time.monotonic() + AI_MOVE_DELAY
+            if move != PASS_MOVE:
+                self.piece_selected = (int(move[0][1:]) - 1, self.col_conversion[move[0][0]])
+
+    def make_ai_move(self, origin, destination):
+        """Makes the AI's move, passing if it isn't accepted."""
+        color = self.game.get_whose_turn()
+        if not self.game.make_move(origin, destination) and not self.game.make_move(*PASS_MOVE):
+            print("game is over because no valid moves in check, should have registered as checkmate")
+            if self.game.is_in_checkmate(color):
+                self.game._game_state = 'BLUE_WON' if color == 'red' else 'RED_WON'
 
     def get_click_location(self, mouse_pos):
         """Returns location as row, col (which is reversed to how pygame handles things, but matches janggiGame)"""
@@ -135,15 +402,59 @@ class JanggiGui:
 
 #############DRAWING BOARD LOGIC###################
     def draw_game(self, screen):
-        """Draws the entire game"""
-        self.draw_board(screen)
-        self.draw_pieces(screen)
+        """
+        Draws the game, only redrawing the squares and header that changed since the last call
+        and updating just those parts of the display. The first call draws and shows everything.
+        """
+        dirty = list()
+        if self.board_surface is None:
+            self.board_surface = self.make_board_surface(screen.get_size())
+            screen.blit(self.board_surface, (0, 0))
+            self.drawn_squares = [None] * jg.BOARD_SIZE
+            self.drawn_header = None
+            self.draw_pieces(screen)
+            self.draw_header(screen)
+            pg.display.flip()
+            return
+        dirty.extend(self.draw_pieces(screen))
+        dirty.extend(self.draw_header(screen))
+        if dirty:
+            pg.display.update(dirty)
+
+    def make_board_surface(self, size):
+        """Returns a surface of the given size with everything that never changes drawn: background, border and squares."""
+        surface = pg.Surface(size)
+        surface.fill(BG_COL)
+        pg.draw.rect(surface, pg.Color("black"), pg.Rect(0, self.PADDING, jg.BOARD_COLS*self.CELL_SIZE + (2 * self.SIDE_PADDING),
+                                                         jg.BOARD_ROWS*self.CELL_SIZE + (2 * self.SIDE_PADDING)), self.SIDE_PADDING)
+        for i in range(jg.BOARD_ROWS):
+            for j in range(jg.BOARD_COLS):
+                # make every other square white
+                pg.draw.rect(surface, BOARD_LIGHT if (i + j) % 2 == 0 else BOARD_DARK, self.square_rect(i, j))
+        return surface
+
+    def square_rect(self, row, col):
+        """Returns the pygame Rect of the board square at row, col."""
+        return pg.Rect(self.SIDE_PADDING + (col * self.CELL_SIZE),
+                       self.PADDING + self.SIDE_PADDING + (row * self.CELL_SIZE),
+                       self.CELL_SIZE, self.CELL_SIZE)
+
+    def draw_header(self, screen):
+        """Redraws the info text and ai buttons above the board if they changed, returns the list of rects drawn."""
+        header = (self.game.get_game_state(), self.game.get_whose_turn(),
+                  self.played_by_ai['blue'], self.played_by_ai['red'], self.ai_worker.status())
+        if header == self.drawn_header:
+            return []
+        self.drawn_header = header
+        header_rect = pg.Rect(0, 0, screen.get_width(), self.PADDING)
+        screen.blit(self.board_surface, header_rect, header_rect)
         self.draw_text_info(screen)
         self.draw_ai_buttons(screen)
+        return [header_rect]
 
     def draw_ai_buttons(self, screen):
         """Draws selectable buttons for having ai make moves for a given color"""
-        a_font = pg.font.Font(None, int (self.CELL_SIZE // 4))
+        font_size = self.CELL_SIZE // 4
         button_left = self.WIDTH - (2 * self.CELL_SIZE)
         blue_text = "AI play for blue (ON)" if self.played_by_ai['blue'] else "AI play for blue (OFF)"
         red_text = "AI play for red (ON)" if self.played_by_ai['red'] else "AI play for red (OFF)"
@@ -151,82 +462,86 @@ class JanggiGui:
         red_color = ON_COL if self.played_by_ai['red'] else OFF_COL
         pg.draw.rect(screen, blue_color, pg.Rect(button_left, 0, self.CELL_SIZE*2, self.button_height))
         pg.draw.rect(screen, red_color, pg.Rect(button_left, self.button_height+ 3, self.CELL_SIZE * 2, self.button_height))
-        text = a_font.render(blue_text, False, TEXT_COL)
-        screen.blit(text, (button_left, 3))
-        text = a_font.render(red_text, False, TEXT_COL)
-        screen.blit(text, (button_left, self.button_height + self.BUTTON_PADDING))
+        screen.blit(render_text(blue_text, font_size, TEXT_COL), (button_left, 3))
+        screen.blit(render_text(red_text, font_size, TEXT_COL), (button_left, self.button_height + self.BUTTON_PADDING))
 
     def draw_text_info(self, screen):
-        a_font = pg.font.Font(None, int(self.CELL_SIZE // 2))
+        font_size = self.CELL_SIZE // 2
         if self.game.get_game_state() == 'UNFINISHED':
-            text = a_font.render(f"It is {self.game.get_whose_turn()} player's turn.", False, TEXT_COL)
+            status = self.ai_worker.status()
+            status = f" (AI {status}...)" if status else ""
+            text = render_text(f"It is {self.game.get_whose_turn()} player's turn.{status}", font_size, TEXT_COL)
         else:
-            text = a_font.render(f"The game is over: {self.game.get_game_state()}.", False, TEXT_COL)
+            text = render_text(f"The game is over: {self.game.get_game_state()}.", font_size, TEXT_COL)
         screen.blit(text, (0,0))
 
     def draw_pieces(self, screen):
-        """Draws the game pieces onto the board"""
+        """
+        Redraws every square whose piece or highlighting changed since it was last drawn (the
+        board under it from the static surface, then the highlight and piece sprite) and returns
+        the list of rects drawn.
+        """
         game_board = self.game.get_board()
+        sprites = piece_sprites(self.CELL_SIZE)
+        self.update_highlights(game_board)
+        dirty = list()
         for row_index, row in enumerate(game_board):
             for col_index, piece in enumerate(row):
-                if piece:
-                    self.draw_a_piece(screen, row_index, col_index, piece)
-
-    def draw_a_piece(self, screen, row, col, piece):
-        """Given a row, column and JanggiPiece object draws it in the appropriate square"""
-        color = piece.get_color()
-        half_cell = self.CELL_SIZE / 2
-        center = (self.SIDE_PADDING + (col * self.CELL_SIZE) + half_cell,
-                  self.PADDING + self.SIDE_PADDING + (row * self.CELL_SIZE) + half_cell)
-        if piece.get_name() == "GENERAL":
-            pg.draw.circle(screen, pg.Color("gold"), center, half_cell)
-        circle = pg.draw.circle(screen, color, center, half_cell - 3)
-        the_font = pg.font.Font(None, int(half_cell))
-        text = the_font.render(piece.get_name()[:3], False, pg.Color("white"))
-        text_size = text.get_size()
-        text_placement = (center[0] - (text_size[0] / 2), center[1] - (text_size[1] / 2))
-        screen.blit(text, text_placement)
-
-    def draw_board(self, screen):
-        """Draws the squares of the board with outline and highlights selected square"""
-        pg.draw.rect(screen, BG_COL, pg.Rect(0, 0, self.WIDTH, self.HEIGHT))
-        game_board = self.game.get_board()
-        pg.draw.rect(screen, pg.Color("black"), pg.Rect(0, self.PADDING, len(game_board[0])*self.CELL_SIZE + (2 * self.SIDE_PADDING),
-                                                        len(game_board)*self.CELL_SIZE + (2 * self.SIDE_PADDING)), self.SIDE_PADDING)
-        for i in range(len(game_board)):
-            for j in range(len(game_board[0])):
+                highlighted = self.should_highlight(row_index, col_index)
+                square = row_index * jg.BOARD_COLS + col_index
+                if self.drawn_squares[square] == (piece, highlighted):
+                    continue
+                self.drawn_squares[square] = (piece, highlighted)
+                rect = self.square_rect(row_index, col_index)
+                screen.blit(self.board_surface, rect, rect)
                 #highlight selected piece
-                if self.piece_selected and self.should_highlight(i, j):
-                    pg.draw.rect(screen, pg.Color("light green"),
-                                 pg.Rect(self.SIDE_PADDING + (j * self.CELL_SIZE),
-                                         self.PADDING + self.SIDE_PADDING + (i * self.CELL_SIZE),
-                                         self.CELL_SIZE, self.CELL_SIZE))
-                # make every other square white
-                elif (i + j) % 2 == 0:
-                    pg.draw.rect(screen, BOARD_LIGHT,
-                                 pg.Rect(self.SIDE_PADDING + (j*self.CELL_SIZE),
-                                         self.PADDING + self.SIDE_PADDING + (i*self.CELL_SIZE),
-                                         self.CELL_SIZE, self.CELL_SIZE))
-                else:
-                    pg.draw.rect(screen, BOARD_DARK,
-                                 pg.Rect(self.SIDE_PADDING + (j * self.CELL_SIZE),
-                                         self.PADDING + self.SIDE_PADDING + (i * self.CELL_SIZE),
-                                         self.CELL_SIZE, self.CELL_SIZE))
+                if highlighted:
+                    pg.draw.rect(screen, HIGHLIGHT_COL, rect)
+                if piece:
+                    screen.blit(sprites[piece], rect)
+                dirty.append(rect)
+        return dirty
 
+    def update_highlights(self, game_board):
+        """
+        Recomputes the set of squares to highlight if the selection or position changed since it
+        was last worked out: the selected square and, if it holds a piece of the player to move in
+        an unfinished game, the destinations of its legal moves (moves that leave its own general
+        in check are not shown, make_move would reject them).
+        """
+        key = (self.piece_selected, self.game.get_square_codes(), self.game.get_whose_turn(),
+               self.game.get_game_state())
+        if key == self.highlight_key:
+            return
+        self.highlight_key = key
+        self.highlighted = set()
+        if not self.piece_selected:
+            return
+        row, col = self.piece_selected
+        self.highlighted.add((row, col))
+        piece = game_board[row][col]
+        if piece is None or piece.get_color() != self.game.get_whose_turn() or \
+                self.game.get_game_state() != 'UNFINISHED':
+            return
+        square = row * jg.BOARD_COLS + col
+        for move in self.game.generate_legal_moves(piece.get_color()):
+            if move.origin == square:
+                self.highlighted.add(divmod(move.destination, jg.BOARD_COLS))
 
     def should_highlight(self, i, j):
-        if i == self.piece_selected[0] and j == self.piece_selected[1]:
-            return True
-        list_potentials = self.game.list_moves(self.piece_selected)
-        if self.game.convert_loc_to_str(i,j) in list_potentials:
-            return True
-        return False
-
+        """Returns True if the square at row i, col j is the selected piece or one of its legal moves."""
+        return (i, j) in self.highlighted
 
 
-def main():
+def main(arguments=None):
     """starts a fresh game"""
-    game = JanggiGui()
+    parser = argparse.ArgumentParser(description="Play Janggi.")
+    parser.add_argument('--size', type=int, help="board width in pixels (default 760)")
+    parser.add_argument('--ai-time', type=float, default=DEFAULT_AI_TIME,
+                        help="seconds the AI searches per move, 0 for the simple AI (default 2)")
+    parser.add_argument('--no-ponder', action='store_true', help="don't let the AI think on your turn")
+    options = parser.parse_args(arguments)
+    game = JanggiGui(options.size, options.ai_time or None, not options.no_ponder)
     game.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+# Author: Stew Towle
+# Date: November 2022
+# Description: Perft (performance test) for the JanggiGame move generator. Counts the leaf nodes
+#       of the legal move tree from the start position and a set of stored test positions, which
+#       both proves the move generator is still exactly right (the counts must not change) and
+#       measures how fast it is. Passing is not counted as a move. Run as a script for the CLI:
+#           python JanggiPerft.py --depth 3
+#           python JanggiPerft.py --position near_mate --depth 2 --divide
+#           python JanggiPerft.py --bitboard
+
+import argparse
+import sys
+import time
+
+import JanggiBitboard
+import JanggiGame
+
+#Test positions as the moves that reach them from the start, with the expected leaf counts at
+# depths 1, 2 and 3 (found with the slow reference generator).
+TEST_POSITIONS = {
+    'start': ([], [31, 961, 30506]),
+    'opening': ([('a7', 'b7'), ('h1', 'g3'), ('h10', 'g8'), ('e4', 'e5'), ('b7', 'b6'), ('c1', 'd3'),
+                 ('b6', 'b5'), ('c4', 'c5'), ('b5', 'c5'), ('d3', 'c5')],
+                [37, 1476, 54417]),
+    'middlegame': ([('a7', 'b7'), ('h1', 'g3'), ('h10', 'g8'), ('e4', 'e5'), ('b7', 'b6'), ('c1', 'd3'),
+                    ('b6', 'b5'), ('c4', 'c5'), ('b5', 'c5'), ('d3', 'c5'), ('c7', 'c6'), ('c5', 'e4'),
+                    ('g7', 'g6'), ('i4', 'i5'), ('g8', 'f6'), ('e5', 'f5'), ('f6', 'd5'), ('i1', 'i4'),
+                    ('e7', 'e6'), ('a4', 'a5'), ('c10', 'd8'), ('a1', 'a4'), ('b8', 'e8'), ('f5', 'e5')],
+                   [44, 1738, 75030]),
+    'palace': ([('h10', 'g8'), ('e2', 'd2'), ('b10', 'd7'), ('a1', 'a3'), ('h8', 'e8'), ('a4', 'a5'),
+                ('e8', 'e4'), ('i1', 'i3'), ('e4', 'i4'), ('i3', 'i4'), ('e7', 'e6'), ('g4', 'h4'),
+                ('i7', 'i6'), ('h1', 'i3'), ('g8', 'h10'), ('h3', 'h10'), ('e9', 'd8'), ('i4', 'i6'),
+                ('i10', 'i6'), ('h10', 'h1'), ('i6', 'i3'), ('h1', 'h10'), ('e6', 'd6'), ('h10', 'f10')],
+               [44, 1041, 44688]),
+    #The position JanggiGame.main sets up before play begins
+    'near_mate': (JanggiGame.DEMO_SETUP_MOVES,
+                  [25, 1071, 26351]),
+}
+
+
+def load_position(name, game_class=JanggiGame.JanggiGame):
+    """Returns a new game of game_class (JanggiGame or a subclass) set up at the named test position."""
+    game = game_class()
+    for origin, destination in TEST_POSITIONS[name][0]:
+        if not game.make_move(origin, destination):
+            raise ValueError("test position " + name + " has an illegal move " + origin + destination)
+    return game
+
+
+def perft(game, depth):
+    """
+    Returns the number of leaf nodes of the legal move tree depth plies deep from the game's
+    position, for the player whose turn it is. The game is left as it was found.
+    """
+    if depth == 0:
+        return 1
+    moves = game.generate_legal_moves(game.get_whose_turn())
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game.push_move(move.origin, move.destination)
+        nodes += perft(game, depth - 1)
+        game.pop_move()
+    return nodes
+
+
+def reference_perft(game, depth):
+    """
+    Same count as perft, but found the slow way through the public string API: every pseudo-legal
+    move from list_moves is made and kept only if it doesn't leave the mover in check. Used to
+    check perft (and to find the expected counts of new test positions).
+    """
+    if depth == 0:
+        return 1
+    color = game.get_whose_turn()
+    nodes = 0
+    for origin, destination in _reference_moves(game, color):
+        game.push_move(origin, destination)
+        if not game.is_in_check(color):
+            nodes += reference_perft(game, depth - 1)
+        game.pop_move()
+    return nodes
+
+
+def _reference_moves(game, color):
+    """Yields (origin, destination) square numbers of every pseudo-legal non-pass move for color."""
+    board = game.get_board()
+    for row in range(JanggiGame.BOARD_ROWS):
+        for col in range(JanggiGame.BOARD_COLS):
+            piece = board[row][col]
+            if piece is not None and piece.get_color() == color:
+                origin = row * JanggiGame.BOARD_COLS + col
+                for location in game.list_moves((row, col)):
+                    destination = JanggiGame.SQUARE_BY_NAME[location]
+                    if destination != origin:
+                        yield origin, destination
+
+
+def divide(game, depth, counter=perft):
+    """
+    Returns a dict of each legal root move (as an 'origin-destination' string) to the number of
+    leaf nodes below it at depth plies, so a wrong total can be traced to the move it comes from.
+    """
+    counts = dict()
+    for move in game.generate_legal_moves(game.get_whose_turn()):
+        game.push_move(move.origin, move.destination)
+        counts[JanggiGame.SQUARE_NAMES[move.origin] + '-' + JanggiGame.SQUARE_NAMES[move.destination]] = \
+            counter(game, depth - 1)
+        game.pop_move()
+    return counts
+
+
+def main(arguments=None):
+    """Runs the perft CLI, returns 1 if any count differs from the expected count, 0 otherwise."""
+    parser = argparse.ArgumentParser(description="Count leaf nodes of the Janggi move tree.")
+    parser.add_argument('--depth', type=int, default=3, help="deepest ply to count (default 3)")
+    parser.add_argument('--position', choices=sorted(TEST_POSITIONS), action='append',
+                        help="test position to run (repeatable, default all)")
+    parser.add_argument('--divide', action='store_true', help="show the count below each root move")
+    parser.add_argument('--reference', action='store_true',
+                        help="count with the slow reference generator instead of generate_legal_moves")
+    parser.add_argument('--bitboard', action='store_true', help="count with JanggiBitboard.BitboardJanggiGame")
+    options = parser.parse_args(arguments)
+    game_class = JanggiBitboard.BitboardJanggiGame if options.bitboard else JanggiGame.JanggiGame
+    counter = reference_perft if options.reference else perft
+
+    failed = False
+    for name in options.position or list(TEST_POSITIONS):
+        expected = TEST_POSITIONS[name][1]
+        game = load_position(name, game_class)
+        print("position", name)
+        for depth in range(1, options.depth + 1):
+            start = time.perf_counter()
+            nodes = counter(game, depth)
+            elapsed = time.perf_counter() - start
+            if depth <= len(expected):
+                status = "ok" if nodes == expected[depth - 1] else "EXPECTED " + str(expected[depth - 1])
+                failed = failed or nodes != expected[depth - 1]
+            else:
+                status = ""
+            rate = nodes / elapsed if elapsed > 0 else 0
+            print(f"  depth {depth}: {nodes} nodes in {elapsed:.3f}s ({rate:,.0f} nodes/s) {status}")
+        if options.divide:
+            for move, nodes in sorted(divide(game, options.depth, counter).items()):
+                print(f"    {move}: {nodes}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
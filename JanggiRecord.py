@@ -0,0 +1,375 @@
+# Author: Stew Towle
+# Date: November 2022
+# Description: Compact binary game records and an indexed archive of them. A record is a small
+#       header (result, side to move, move counters, move count and metadata length), the start
+#       position as one byte per square (its piece code), the metadata as UTF-8 JSON and then two
+#       bytes per move (origin * 90 + destination, little endian, a pass has the same origin and
+#       destination). An archive is a file header, the records one after another, an index of
+#       where each record starts and a footer pointing at the index. ArchiveReader memory-maps the
+#       archive, so game N is found through the index and its moves streamed straight from the map
+#       without reading the rest of the file. Run as a script to pack logs into an archive or look
+#       inside one:
+#           python JanggiRecord.py pack games.jga move_save.txt tournament.jsonl
+#           python JanggiRecord.py info games.jga --game 0
+
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+import JanggiGame
+
+ARCHIVE_MAGIC = b'JANGGIAR'
+FOOTER_MAGIC = b'JANGGIIX'
+ARCHIVE_VERSION = 1
+RESULTS = ('UNFINISHED', 'BLUE_WON', 'RED_WON', 'DRAW')
+TURNS = ('blue', 'red')
+
+#file header: magic, version, padding to 16 bytes
+_ARCHIVE_HEADER = struct.Struct('<8sH6x')
+#record header: result, side to move, plies since a capture, move number, move count, metadata bytes
+_RECORD_HEADER = struct.Struct('<BBHHIH')
+#The record header's metadata length is 16 bits
+MAX_METADATA_BYTES = 0xFFFF
+#and so are both move counters
+MAX_COUNTER = 0xFFFF
+#footer: where the index starts, how many records there are, magic
+_FOOTER = struct.Struct('<QQ8s')
+#array and memoryview use the machine's byte order, records are little endian
+_SWAP_BYTES = sys.byteorder != 'little'
+
+#A decoded game record: the start position's square codes (bytes), the side to move there, its
+# (plies since a capture, move number) counters, the list of Moves, the result and a metadata dict.
+GameRecord = namedtuple('GameRecord', ['square_codes', 'turn', 'counters', 'moves', 'result', 'metadata'])
+
+#Header of a record without its position or moves, for scanning an archive cheaply. metadata is
+# None when it wasn't asked for.
+RecordHeader = namedtuple('RecordHeader', ['result', 'turn', 'counters', 'move_count', 'metadata'])
+
+
+def record_game(game, result=None, metadata=None):
+    """
+    Returns the GameRecord of a JanggiGame's start position and every move made since, with the
+    game's state as the result unless one of RESULTS is given (e.g. 'DRAW' for an adjudicated game).
+    """
+    square_codes, turn, counters = game.get_start_position()
+    return GameRecord(square_codes, turn, counters, game.get_move_history(),
+                      result or game.get_game_state(), metadata or dict())
+
+
+def encode_record(record):
+    """Returns the bytes of a GameRecord, raises ValueError if it can't be stored."""
+    if record.result not in RESULTS:
+        raise ValueError("record result must be one of " + ", ".join(RESULTS))
+    if record.turn not in TURNS:
+        raise ValueError("record turn must be one of " + ", ".join(TURNS))
+    if len(record.counters) != 2 or not all(isinstance(counter, int) and 0 <= counter <= MAX_COUNTER
+                                            for counter in record.counters):
+        raise ValueError("record counters " + str(tuple(record.counters)) + " must be two whole numbers from 0 to " +
+                         str(MAX_COUNTER))
+    metadata = json.dumps(record.metadata, separators=(',', ':')).encode('utf-8')
+    if len(metadata) > MAX_METADATA_BYTES:
+        raise ValueError("record metadata is " + str(len(metadata)) + " bytes of JSON, at most " +
+                         str(MAX_METADATA_BYTES) + " fit")
+    moves = array('H', [origin * JanggiGame.BOARD_SIZE + destination for origin, destination in record.moves])
+    if _SWAP_BYTES:
+        moves.byteswap()
+    header = _RECORD_HEADER.pack(RESULTS.index(record.result), TURNS.index(record.turn), record.counters[0],
+                                 record.counters[1], len(moves), len(metadata))
+    return header + bytes(record.square_codes) + metadata + moves.tobytes()
+
+
+def decode_record(data, offset=0):
+    """Returns the GameRecord whose bytes start at offset in data (bytes, or an mmap)."""
+    header = _read_header(data, offset)
+    start = offset + _RECORD_HEADER.size
+    square_codes = bytes(data[start:start + JanggiGame.BOARD_SIZE])
+    moves = list(_iter_moves(data, start + JanggiGame.BOARD_SIZE + _metadata_length(data, offset),
+                             header.move_count))
+    return GameRecord(square_codes, header.turn, header.counters, moves, header.result, header.metadata)
+
+
+def _metadata_length(data, offset):
+    """Returns the metadata length of the record at offset."""
+    return _RECORD_HEADER.unpack_from(data, offset)[5]
+
+
+def _read_header(data, offset, with_metadata=True):
+    """Returns the RecordHeader of the record at offset, its metadata None unless with_metadata."""
+    result, turn, quiet_plies, move_number, move_count, metadata_length = _RECORD_HEADER.unpack_from(data, offset)
+    metadata = None
+    if with_metadata:
+        start = offset + _RECORD_HEADER.size + JanggiGame.BOARD_SIZE
+        metadata = json.loads(bytes(data[start:start + metadata_length]).decode('utf-8')) if metadata_length else dict()
+    return RecordHeader(RESULTS[result], TURNS[turn], (quiet_plies, move_number), move_count, metadata)
+
+
+def _iter_moves(data, start, move_count):
+    """Yields the Moves of move_count two byte move codes starting at start in data."""
+    if _SWAP_BYTES:
+        codes = array('H', bytes(data[start:start + 2 * move_count]))
+        codes.byteswap()
+    else:
+        codes = memoryview(data)[start:start + 2 * move_count].cast('H')
+    for code in codes:
+        yield JanggiGame.Move(*divmod(code, JanggiGame.BOARD_SIZE))
+
+
+class ArchiveWriter:
+    """
+    Writes GameRecords to a new archive file. The index and footer are written by close (or on
+    leaving a with block), an archive that was never closed has no index and can't be read. Leaving
+    a with block by an exception discards the file instead, so a failed pack never leaves a
+    complete looking archive of some of the games.
+    """
+
+    def __init__(self, path):
+        """Creates (or replaces) the archive file at path."""
+        self._path = path
+        self._file = open(path, 'wb')
+        self._file.write(_ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION))
+        self._offsets = array('Q')
+        self._position = _ARCHIVE_HEADER.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def __len__(self):
+        """Returns the number of records written so far."""
+        return len(self._offsets)
+
+    def add(self, record):
+        """Appends a GameRecord to the archive, returns its game number."""
+        data = encode_record(record)
+        self._offsets.append(self._position)
+        self._file.write(data)
+        self._position += len(data)
+        return len(self._offsets) - 1
+
+    def add_game(self, game, result=None, metadata=None):
+        """Appends the record of a JanggiGame (see record_game), returns its game number."""
+        return self.add(record_game(game, result, metadata))
+
+    def close(self):
+        """Writes the index and footer and closes the file."""
+        if self._file.closed:
+            return
+        offsets = array('Q', self._offsets)
+        if _SWAP_BYTES:
+            offsets.byteswap()
+        self._file.write(offsets.tobytes())
+        self._file.write(_FOOTER.pack(self._position, len(self._offsets), FOOTER_MAGIC))
+        self._file.close()
+
+    def discard(self):
+        """Closes and deletes the archive file without finishing it, if it hasn't been closed already."""
+        if self._file.closed:
+            return
+        self._file.close()
+        os.remove(self._path)
+
+
+class ArchiveReader:
+    """
+    Reads an archive through a read-only memory map. Only the footer is read on opening, each
+    record is found through the index when it's asked for, so scanning the headers of millions of
+    games never touches their positions or moves.
+    """
+
+    def __init__(self, path):
+        """Opens and maps the archive file at path, raises ValueError if it isn't an archive."""
+        self._file = open(path, 'rb')
+        self._index = ()
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(path + " is empty, not an archive")
+        if len(self._map) < _ARCHIVE_HEADER.size + _FOOTER.size:
+            self.close()
+            raise ValueError(path + " is too short to be a game archive")
+        magic, version = _ARCHIVE_HEADER.unpack_from(self._map, 0)
+        index_start, count, footer_magic = _FOOTER.unpack_from(self._map, len(self._map) - _FOOTER.size)
+        if magic != ARCHIVE_MAGIC or footer_magic != FOOTER_MAGIC:
+            self.close()
+            raise ValueError(path + " is not a complete game archive")
+        if version != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError(path + " is archive version " + str(version) + ", not " + str(ARCHIVE_VERSION))
+        if _SWAP_BYTES:
+            self._index = array('Q', self._map[index_start:index_start + 8 * count])
+            self._index.byteswap()
+        else:
+            self._index = memoryview(self._map)[index_start:index_start + 8 * count].cast('Q')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """Returns the number of games in the archive."""
+        return len(self._index)
+
+    def __iter__(self):
+        """Yields every GameRecord in order."""
+        for number in range(len(self._index)):
+            yield self.record(number)
+
+    def header(self, number, with_metadata=True):
+        """
+        Returns the RecordHeader (result, turn, counters, move count, metadata) of game number.
+        Decoding the metadata JSON is most of the cost, scans that don't need it should leave
+        with_metadata off (the header's metadata is then None).
+        """
+        return _read_header(self._map, self._index[number], with_metadata)
+
+    def record(self, number):
+        """Returns the GameRecord of game number."""
+        return decode_record(self._map, self._index[number])
+
+    def moves(self, number):
+        """
+        Yields the Moves of game number straight from the map. The map can't be closed while one of
+        these generators is part way through.
+        """
+        offset = self._index[number]
+        move_count = _RECORD_HEADER.unpack_from(self._map, offset)[4]
+        start = offset + _RECORD_HEADER.size + JanggiGame.BOARD_SIZE + _metadata_length(self._map, offset)
+        return _iter_moves(self._map, start, move_count)
+
+    def start_game(self, number):
+        """Returns a new JanggiGame set up at the start position of game number."""
+        offset = self._index[number]
+        header = _read_header(self._map, offset, False)
+        start = offset + _RECORD_HEADER.size
+        return JanggiGame.JanggiGame.from_square_codes(self._map[start:start + JanggiGame.BOARD_SIZE],
+                                                       header.turn, header.counters)
+
+    def close(self):
+        """Releases the map and closes the file."""
+        if not self._file.closed:
+            #The index view has to go before the map it points into can close
+            if isinstance(self._index, memoryview):
+                self._index.release()
+            self._map.close()
+            self._file.close()
+
+
+#make_move('x','y') statements as written to move_save.txt by JanggiGame.main
+_MOVE_SAVE_LINE = re.compile(r"make_move\(\s*'([a-i]\d+)'\s*,\s*'([a-i]\d+)'\s*\)")
+#origin and destination squares run together, as in the tournament runner's JSONL move lists
+_MOVE_PAIR = re.compile(r'^([a-i]\d+)([a-i]\d+)$')
+
+
+def records_from_move_save(path, start=None):
+    """
+    Yields a GameRecord for each game in a move_save.txt style log of make_move statements, as
+    JanggiGame.main writes them: a game ends when it is won and the next one starts from the
+    start position. The first game starts from the start position too unless start gives where it
+    started, either a notation string (see JanggiGame.START_NOTATION) or a sequence of (origin,
+    destination) moves from the start position that were made before the log began (they are part
+    of its record, JanggiGame.DEMO_SETUP_MOVES for logs from before main logged its setup).
+    The moves are replayed to check them and to find the results, an illegal move raises ValueError.
+    """
+    if isinstance(start, str):
+        game = JanggiGame.JanggiGame.from_notation(start)
+    else:
+        game = JanggiGame.JanggiGame()
+        for move_number, move in enumerate(start or (), 1):
+            if not game.make_move(*move):
+                raise ValueError("start move " + str(move_number) + " is not a legal move: " + ''.join(move))
+    game_number = 0
+    with open(path) as log_file:
+        for line_number, line in enumerate(log_file, 1):
+            match = _MOVE_SAVE_LINE.search(line)
+            if match is None:
+                continue
+            if not game.make_move(*match.groups()):
+                raise ValueError(path + " line " + str(line_number) + " is not a legal move: " + line.strip())
+            if game.get_game_state() != 'UNFINISHED':
+                yield record_game(game, metadata={'source': path, 'game': game_number})
+                game_number += 1
+                game = JanggiGame.JanggiGame()
+    if game_number == 0 or game.get_move_history():
+        yield record_game(game, metadata={'source': path, 'game': game_number})
+
+
+def records_from_tournament(path):
+    """Yields a GameRecord for each game in a JanggiTournament JSONL file, keeping its other fields as metadata."""
+    with open(path) as jsonl_file:
+        for line in jsonl_file:
+            if not line.strip():
+                continue
+            game_record = json.loads(line)
+            moves = list()
+            for move_text in game_record.pop('moves'):
+                match = _MOVE_PAIR.match(move_text)
+                if match is None:
+                    raise ValueError(path + " has a move that isn't two squares: " + move_text)
+                origin, destination = match.groups()
+                moves.append(JanggiGame.Move(JanggiGame.SQUARE_BY_NAME[origin], JanggiGame.SQUARE_BY_NAME[destination]))
+            result = game_record.pop('result')
+            start = JanggiGame.JanggiGame()
+            square_codes, turn, counters = start.get_start_position()
+            yield GameRecord(square_codes, turn, counters, moves, result, game_record)
+
+
+def main(arguments=None):
+    """Runs the archive CLI."""
+    parser = argparse.ArgumentParser(description="Pack Janggi game logs into a binary archive, or inspect one.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help="write an archive from move_save.txt logs and tournament JSONL files")
+    pack.add_argument('archive')
+    pack.add_argument('logs', nargs='+', help="*.jsonl files are read as tournament output, anything else as move_save.txt")
+    start = pack.add_mutually_exclusive_group()
+    start.add_argument('--start', metavar='NOTATION', help="position the first game of each move_save.txt log starts from")
+    start.add_argument('--demo-setup', action='store_true',
+                       help="move_save.txt logs start after JanggiGame.main's setup moves (logs written before it logged them)")
+    info = commands.add_parser('info', help="summarize an archive")
+    info.add_argument('archive')
+    info.add_argument('--game', type=int, action='append', help="print a game's header and moves (repeatable)")
+    options = parser.parse_args(arguments)
+
+    if options.command == 'pack':
+        with ArchiveWriter(options.archive) as writer:
+            for path in options.logs:
+                if path.endswith('.jsonl'):
+                    records = records_from_tournament(path)
+                else:
+                    records = records_from_move_save(path, JanggiGame.DEMO_SETUP_MOVES if options.demo_setup
+                                                     else options.start)
+                for record in records:
+                    writer.add(record)
+            print(len(writer), "games written to", options.archive)
+        return 0
+
+    with ArchiveReader(options.archive) as reader:
+        results = dict()
+        moves = 0
+        for number in range(len(reader)):
+            header = reader.header(number, False)
+            results[header.result] = results.get(header.result, 0) + 1
+            moves += header.move_count
+        print(len(reader), "games,", moves, "moves:", ", ".join(f"{result} {count}" for result, count in sorted(results.items())))
+        for number in options.game or list():
+            print("game", number, reader.header(number))
+            print("  ", ' '.join(JanggiGame.SQUARE_NAMES[origin] + JanggiGame.SQUARE_NAMES[destination]
+                                 for origin, destination in reader.moves(number)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
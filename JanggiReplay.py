@@ -0,0 +1,194 @@
+# Author: Stew Towle
+# Date: November 2022
+# Description: Streaming replay and validation of JanggiRecord game archives. Every stage is a
+#       generator: records are read from the memory-mapped archive one at a time, their moves
+#       streamed from the map and replayed through JanggiGame.make_move, and what comes out is a
+#       stream of per-move states, validation errors and game ends, so no whole game (or archive)
+#       is ever held in memory. validate_archive fans the games out across worker processes for
+#       large archives, each worker maps the archive itself and only errors come back. Run as a
+#       script to re-validate archives (after a rules change, say):
+#           python JanggiReplay.py games.jga --workers 8
+#           python JanggiReplay.py games.jga --game 12 --steps
+
+import argparse
+import multiprocessing
+import sys
+from collections import namedtuple
+
+import JanggiGame
+import JanggiRecord
+
+DEFAULT_CHUNK_GAMES = 500
+
+#A move that was replayed: the game number, its ply (1 for the first move), the Move and the live
+# JanggiGame just after it (it changes as the replay goes on, copy anything that has to be kept).
+ReplayStep = namedtuple('ReplayStep', ['game_number', 'ply', 'move', 'game'])
+
+#Something wrong with a record: the game number, the ply of the move at fault (or the number of moves
+# for a problem with the start position or result), the Move (or None) and what is wrong.
+ReplayError = namedtuple('ReplayError', ['game_number', 'ply', 'move', 'message'])
+
+#The end of a game's replay: the game number, the plies replayed and the replayed game state.
+ReplayEnd = namedtuple('ReplayEnd', ['game_number', 'plies', 'state'])
+
+
+def replay_game(game_number, game, moves, result=None, metadata=None):
+    """
+    Replays moves (any iterable of Moves) on game through make_move, yielding a ReplayStep after
+    each one. An illegal move yields a ReplayError and ends the replay. If the record's result is
+    given it is checked against the replayed game: a checkmate must have the recorded result and
+    a recorded win must end in checkmate unless its metadata gives another 'reason' (the
+    tournament runner's adjudications). Always finishes with a ReplayEnd.
+    """
+    ply = 0
+    for move in moves:
+        ply += 1
+        origin = JanggiGame.SQUARE_NAMES[move.origin] if 0 <= move.origin < JanggiGame.BOARD_SIZE else None
+        destination = JanggiGame.SQUARE_NAMES[move.destination] \
+            if 0 <= move.destination < JanggiGame.BOARD_SIZE else None
+        if origin is None or destination is None:
+            yield ReplayError(game_number, ply, move, "move is off the board")
+            yield ReplayEnd(game_number, ply - 1, game.get_game_state())
+            return
+        if game.get_game_state() != 'UNFINISHED':
+            yield ReplayError(game_number, ply, move, "move made after the game ended " + game.get_game_state())
+            yield ReplayEnd(game_number, ply - 1, game.get_game_state())
+            return
+        turn = game.get_whose_turn()
+        if not game.make_move(origin, destination):
+            yield ReplayError(game_number, ply, move, "illegal move " + origin + destination + " for " + turn)
+            yield ReplayEnd(game_number, ply - 1, game.get_game_state())
+            return
+        yield ReplayStep(game_number, ply, move, game)
+
+    state = game.get_game_state()
+    if result is not None:
+        reason = (metadata or dict()).get('reason', 'checkmate')
+        if state != 'UNFINISHED' and state != result:
+            yield ReplayError(game_number, ply, None, "recorded " + result + " but the replay ends " + state)
+        elif state == 'UNFINISHED' and result in ('BLUE_WON', 'RED_WON') and reason == 'checkmate':
+            yield ReplayError(game_number, ply, None, "recorded " + result + " but the replay ends without checkmate")
+    yield ReplayEnd(game_number, ply, state)
+
+
+def replay_archive(reader, numbers=None):
+    """
+    Yields the replay (see replay_game) of every game of an open JanggiRecord.ArchiveReader, or
+    just the given game numbers, one game after another. A start position that can't be set up
+    yields a ReplayError and a ReplayEnd for that game.
+    """
+    for number in range(len(reader)) if numbers is None else numbers:
+        header = reader.header(number)
+        try:
+            game = reader.start_game(number)
+        except ValueError as error:
+            yield ReplayError(number, 0, None, "bad start position: " + str(error))
+            yield ReplayEnd(number, 0, None)
+            continue
+        yield from replay_game(number, game, reader.moves(number), header.result, header.metadata)
+
+
+def validation_errors(events):
+    """Filters a replay event stream down to its ReplayErrors."""
+    return (event for event in events if isinstance(event, ReplayError))
+
+
+#Each worker process keeps the archives it has opened, so a chunk doesn't remap the file
+_worker_readers = dict()
+
+
+def _validate_chunk(task):
+    """
+    Worker side of validate_archive: replays the games first to last - 1 of the archive at path
+    and returns the list of ReplayErrors and the number of moves replayed.
+    """
+    path, first, last = task
+    reader = _worker_readers.get(path)
+    if reader is None:
+        reader = _worker_readers[path] = JanggiRecord.ArchiveReader(path)
+    errors = list()
+    moves = 0
+    for event in replay_archive(reader, range(first, last)):
+        if isinstance(event, ReplayError):
+            errors.append(event)
+        elif isinstance(event, ReplayEnd):
+            moves += event.plies
+    return errors, moves
+
+
+def validate_archive(path, workers=1, chunk_games=DEFAULT_CHUNK_GAMES, progress=None):
+    """
+    Replays every game of the archive at path and yields each ReplayError, in game order, as the
+    games are checked. With workers above 1 the games are split into chunks of chunk_games and
+    replayed by that many processes (None for one per cpu). progress, if given, is called after
+    each chunk with the number of games and moves checked so far.
+    """
+    with JanggiRecord.ArchiveReader(path) as reader:
+        game_count = len(reader)
+    tasks = [(path, first, min(first + chunk_games, game_count)) for first in range(0, game_count, chunk_games)]
+    games = 0
+    moves = 0
+    if workers == 1:
+        chunks = map(_validate_chunk, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        chunks = pool.imap(_validate_chunk, tasks)
+    try:
+        for (path, first, last), (errors, chunk_moves) in zip(tasks, chunks):
+            yield from errors
+            games += last - first
+            moves += chunk_moves
+            if progress is not None:
+                progress(games, moves)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        if workers == 1:
+            for reader in _worker_readers.values():
+                reader.close()
+            _worker_readers.clear()
+
+
+def main(arguments=None):
+    """Runs the replay CLI, returns 1 if any record failed validation, 0 otherwise."""
+    parser = argparse.ArgumentParser(description="Replay and validate JanggiRecord game archives.")
+    parser.add_argument('archives', nargs='+')
+    parser.add_argument('--workers', type=int, default=1, help="processes to validate with (0 for one per cpu)")
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_GAMES, help="games per worker task")
+    parser.add_argument('--game', type=int, action='append', help="replay only this game (repeatable)")
+    parser.add_argument('--steps', action='store_true', help="print the position after every move")
+    options = parser.parse_args(arguments)
+
+    failed = False
+    for path in options.archives:
+        if options.game or options.steps:
+            with JanggiRecord.ArchiveReader(path) as reader:
+                for event in replay_archive(reader, options.game):
+                    if isinstance(event, ReplayStep):
+                        if options.steps:
+                            print(f"{path} game {event.game_number} ply {event.ply}: {event.game.to_notation()}")
+                    elif isinstance(event, ReplayError):
+                        failed = True
+                        print(f"{path} game {event.game_number} ply {event.ply}: {event.message}")
+                    else:
+                        print(f"{path} game {event.game_number}: {event.plies} plies, {event.state}")
+            continue
+
+        checked = [0, 0]
+
+        def progress(games, moves):
+            checked[:] = games, moves
+
+        error_count = 0
+        for error in validate_archive(path, options.workers or None, options.chunk, progress):
+            error_count += 1
+            print(f"{path} game {error.game_number} ply {error.ply}: {error.message}")
+        print(f"{path}: {checked[0]} games, {checked[1]} moves replayed, {error_count} errors")
+        failed = failed or error_count > 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+# Author: Stew Towle
+# Date: November 2022
+# Description: Headless self-play tournament runner. Plays games between engine configurations
+#       (every pair of the engines given, each engine taking blue in half of the games) in
+#       parallel worker processes with no GUI and no delays. Games are capped in length and
+#       adjudicated on material, every finished game is streamed to a JSONL file as it comes in
+#       and the final report gives each pairing's Elo difference with a 95% error bar, plus the
+#       games and moves per second. Engines are written kind:option=value,... for example
+#           python JanggiTournament.py search:depth=2 simple --games 200 --output games.jsonl
+#       Engine kinds:
+#           random                  a uniformly random legal move
+#           simple                  a random move from the top tier of JanggiAi.ai_move_simple
+#           search:depth=N,time=S,mb=M
+#                                   JanggiAi.search to depth N and/or S seconds per move with
+#                                   an M megabyte transposition table kept for the whole game
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import JanggiAi
+import JanggiGame
+
+DEFAULT_MAX_MOVES = 200
+DEFAULT_OPENING_MOVES = 4
+#A lead of at least this much material wins a game that reaches the move cap (or both players pass)
+ADJUDICATION_MARGIN = 500
+#A lead of at least RESIGN_MARGIN held for RESIGN_MOVES moves in a row ends the game early
+RESIGN_MARGIN = 2000
+RESIGN_MOVES = 10
+
+
+class RandomEngine:
+    """Plays a uniformly random legal move."""
+
+    def __init__(self, options):
+        """Takes the option dict from the engine spec (random has no options)."""
+        if options:
+            raise ValueError("random engine takes no options")
+
+    def choose_move(self, game, rng):
+        """Returns the (origin, destination) strings of the move to make, or None to pass."""
+        moves = game.generate_legal_moves(game.get_whose_turn())
+        if not moves:
+            return None
+        move = rng.choice(moves)
+        return JanggiGame.SQUARE_NAMES[move.origin], JanggiGame.SQUARE_NAMES[move.destination]
+
+
+class SimpleEngine:
+    """Plays a random move from the best priority tier of JanggiAi.ai_move_simple, like the GUI does."""
+
+    def __init__(self, options):
+        """Takes the option dict from the engine spec (simple has no options)."""
+        if options:
+            raise ValueError("simple engine takes no options")
+
+    def choose_move(self, game, rng):
+        """Returns the (origin, destination) strings of the move to make, or None to pass."""
+        potential_moves = JanggiAi.ai_move_simple(game, game.get_whose_turn())
+        if not potential_moves:
+            return None
+        top_tier = potential_moves[0][0]
+        choices = [move for move in potential_moves if move[0] == top_tier]
+        move = rng.choice(choices)
+        return move[1], move[2]
+
+
+class SearchEngine:
+    """Plays the best move found by JanggiAi.search, keeping its transposition table between moves."""
+
+    def __init__(self, options):
+        """Takes the option dict from the engine spec: depth, time (seconds per move) and mb."""
+        unknown = set(options) - {'depth', 'time', 'mb'}
+        if unknown:
+            raise ValueError("unknown search engine options " + ", ".join(sorted(unknown)))
+        self._depth = int(options['depth']) if 'depth' in options else None
+        self._time_limit = float(options['time']) if 'time' in options else None
+        self._table = JanggiAi.TranspositionTable(float(options.get('mb', JanggiAi.DEFAULT_TABLE_MB)))
+
+    def choose_move(self, game, rng):
+        """Returns the (origin, destination) strings of the move to make, or None to pass."""
+        result = JanggiAi.search(game, self._depth, self._time_limit, self._table)
+        if result.move is None:
+            return None
+        return JanggiGame.SQUARE_NAMES[result.move.origin], JanggiGame.SQUARE_NAMES[result.move.destination]
+
+
+ENGINE_KINDS = {'random': RandomEngine, 'simple': SimpleEngine, 'search': SearchEngine}
+
+
+def make_engine(spec):
+    """Returns a new engine for a 'kind:option=value,...' spec, raises ValueError if it isn't valid."""
+    kind, _, option_text = spec.partition(':')
+    if kind not in ENGINE_KINDS:
+        raise ValueError("unknown engine kind " + kind + " (choose from " + ", ".join(ENGINE_KINDS) + ")")
+    options = dict()
+    for option in filter(None, option_text.split(',')):
+        key, equals, value = option.partition('=')
+        if not equals:
+            raise ValueError("engine option " + option + " is not key=value")
+        options[key] = value
+    return ENGINE_KINDS[kind](options)
+
+
+def _material_lead(game):
+    """Returns blue's material minus red's."""
+    return game.get_material('blue') - game.get_material('red')
+
+
+def _adjudicate(game, margin):
+    """Returns the result of a game stopped early: a win for the side ahead by margin material, or a draw."""
+    lead = _material_lead(game)
+    if lead >= margin:
+        return 'BLUE_WON'
+    if lead <= -margin:
+        return 'RED_WON'
+    return 'DRAW'
+
+
+def play_game(blue_spec, red_spec, seed, max_moves=DEFAULT_MAX_MOVES, opening_moves=DEFAULT_OPENING_MOVES):
+    """
+    Plays one game between two engine specs and returns its record as a dict. The first
+    opening_moves moves are random legal moves (from seed) so repeated pairings don't replay the
+    same game. A game ends with checkmate, when it reaches max_moves or both players pass in a row
+    (adjudicated on material), or when one side holds a RESIGN_MARGIN lead for RESIGN_MOVES moves.
+    """
+    rng = random.Random(seed)
+    engines = {'blue': make_engine(blue_spec), 'red': make_engine(red_spec)}
+    opening = RandomEngine({})
+    game = JanggiGame.JanggiGame()
+    moves = list()
+    passes = 0
+    lopsided = 0
+    reason = None
+    start = time.perf_counter()
+    while game.get_game_state() == 'UNFINISHED':
+        if len(moves) >= max_moves:
+            reason = 'move_cap'
+            break
+        color = game.get_whose_turn()
+        engine = opening if len(moves) < opening_moves else engines[color]
+        move = engine.choose_move(game, rng)
+        if move is None:
+            move = ('a1', 'a1')
+        if not game.make_move(*move):
+            raise RuntimeError(blue_spec + " vs " + red_spec + ": " + color + " chose illegal move " + str(move))
+        moves.append(move)
+        passes = passes + 1 if move[0] == move[1] else 0
+        if passes >= 2:
+            reason = 'passes'
+            break
+        lopsided = lopsided + 1 if abs(_material_lead(game)) >= RESIGN_MARGIN else 0
+        if lopsided >= RESIGN_MOVES:
+            reason = 'resigned'
+            break
+
+    if reason is None:
+        result = game.get_game_state()
+        reason = 'checkmate'
+    elif reason == 'resigned':
+        result = _adjudicate(game, RESIGN_MARGIN)
+    else:
+        result = _adjudicate(game, ADJUDICATION_MARGIN)
+    return {'blue': blue_spec, 'red': red_spec, 'seed': seed, 'result': result, 'reason': reason,
+            'plies': len(moves), 'seconds': time.perf_counter() - start,
+            'moves': [origin + destination for origin, destination in moves]}
+
+
+def _play_game_task(task):
+    """Worker side of run_tournament: plays one game from its (game number, arguments) task."""
+    number, arguments = task
+    record = play_game(*arguments)
+    record['game'] = number
+    return record
+
+
+def _mute_worker():
+    """Pool initializer, sends worker output (ai_move_simple prints every move list) to devnull."""
+    sys.stdout = open(os.devnull, 'w')
+
+
+def schedule_games(engine_specs, games, seed, max_moves, opening_moves):
+    """
+    Returns the list of (game number, play_game arguments) tasks: games games for every pair of
+    engines, each engine taking blue in alternate games and consecutive pairs of games sharing
+    the same random opening so both engines play both sides of it.
+    """
+    tasks = list()
+    for first, second in itertools.combinations(engine_specs, 2):
+        for index in range(games):
+            game_seed = seed + index // 2
+            blue, red = (first, second) if index % 2 == 0 else (second, first)
+            tasks.append((len(tasks), (blue, red, game_seed, max_moves, opening_moves)))
+    return tasks
+
+
+def run_tournament(tasks, workers=None, output=None):
+    """
+    Plays the scheduled games across a pool of workers processes (default one per cpu), writing each
+    record to the output file as a JSON line as soon as its game finishes. Returns the list of
+    records in the order they finished.
+    """
+    records = list()
+    with multiprocessing.Pool(workers, initializer=_mute_worker) as pool:
+        for record in pool.imap_unordered(_play_game_task, tasks):
+            records.append(record)
+            if output is not None:
+                output.write(json.dumps(record) + '\n')
+                output.flush()
+    return records
+
+
+def elo_difference(wins, draws, losses):
+    """
+    Returns the Elo difference implied by a score of wins, draws and losses and the half width of
+    its 95% confidence interval (from the standard error of the per game score). The difference
+    is infinite when every game was won or every game was lost, the error is then infinite too.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, math.inf
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def to_elo(fraction):
+        if fraction <= 0:
+            return -math.inf
+        if fraction >= 1:
+            return math.inf
+        return -400 * math.log10(1 / fraction - 1)
+
+    difference = to_elo(score)
+    if math.isinf(difference):
+        return difference, math.inf
+    return difference, (to_elo(score + margin) - to_elo(score - margin)) / 2
+
+
+def tally(records):
+    """
+    Returns a dict of (first engine, second engine) pairings, in the order their first game was
+    played, to the [wins, draws, losses] of the first engine.
+    """
+    pairings = dict()
+    for record in sorted(records, key=lambda record: record['game']):
+        blue, red = record['blue'], record['red']
+        key = (blue, red) if (red, blue) not in pairings else (red, blue)
+        counts = pairings.setdefault(key, [0, 0, 0])
+        if record['result'] == 'DRAW':
+            counts[1] += 1
+        elif (record['result'] == 'BLUE_WON') == (key[0] == blue):
+            counts[0] += 1
+        else:
+            counts[2] += 1
+    return pairings
+
+
+def print_report(records, elapsed):
+    """Prints each pairing's record and Elo difference, then the reasons games ended and throughput."""
+    for (first, second), (wins, draws, losses) in tally(records).items():
+        difference, margin = elo_difference(wins, draws, losses)
+        print(f"{first} vs {second}: +{wins} ={draws} -{losses}  Elo {difference:+.0f} +/- {margin:.0f}")
+    reasons = dict()
+    for record in records:
+        reasons[record['reason']] = reasons.get(record['reason'], 0) + 1
+    print("ended by", ", ".join(f"{reason} {count}" for reason, count in sorted(reasons.items())))
+    plies = sum(record['plies'] for record in records)
+    if elapsed > 0:
+        print(f"{len(records)} games, {plies} moves in {elapsed:.1f}s: "
+              f"{len(records) / elapsed:.2f} games/s, {plies / elapsed:.0f} moves/s")
+
+
+def main(arguments=None):
+    """Runs the tournament CLI."""
+    parser = argparse.ArgumentParser(description="Play headless self-play games between Janggi engines.")
+    parser.add_argument('engines', nargs='+', help="engine specs, kind:option=value,... (at least two)")
+    parser.add_argument('--games', type=int, default=100, help="games per pair of engines (default 100)")
+    parser.add_argument('--workers', type=int, help="worker processes (default one per cpu)")
+    parser.add_argument('--max-moves', type=int, default=DEFAULT_MAX_MOVES,
+                        help="moves before a game is adjudicated (default 200)")
+    parser.add_argument('--opening-moves', type=int, default=DEFAULT_OPENING_MOVES,
+                        help="random moves to start each game with (default 4)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game's random opening")
+    parser.add_argument('--output', metavar='PATH', help="JSONL file to stream the game records to")
+    options = parser.parse_args(arguments)
+    if len(options.engines) < 2:
+        parser.error("give at least two engines")
+    for spec in options.engines:
+        try:
+            make_engine(spec)
+        except ValueError as error:
+            parser.error(str(error))
+
+    tasks = schedule_games(options.engines, options.games, options.seed, options.max_moves,
+                           options.opening_moves)
+    start = time.perf_counter()
+    if options.output:
+        with open(options.output, 'w') as output:
+            records = run_tournament(tasks, options.workers, output)
+    else:
+        records = run_tournament(tasks, options.workers)
+    print_report(records, time.perf_counter() - start)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+# Author: Stew Towle
+# Date: November 2022
+# Description: Checks for the parts of the Janggi programs that perft can't see: position notation
+#       and hashing, the incremental evaluation and its weights, binary game records and archives,
+#       transposition table entries, the bitboard game's move generation, the move list cache and
+#       the alpha-beta search (serial and parallel). Uses unittest so it runs either way:
+#           python -m pytest test_janggi.py
+#           python -m unittest test_janggi
+
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import JanggiAi
+import JanggiBitboard
+import JanggiGame
+import JanggiRecord
+
+#Seeds of the random games the checks are run over, and how long they are played for
+GAME_SEEDS = range(8)
+GAME_PLIES = 120
+
+#Blue's general on d10 in check from the chariot on d1, its other squares covered by the chariots
+# on a9 and i10: checkmated, whoever the notation says is to move
+MATE_BOARD = '3K4r/r8/9/9/9/9/9/9/9/3r1k3'
+#Red to move mates with the chariot from i1 to i10, and no other way
+MATE_IN_ONE = '3K5/r8/9/9/9/9/9/9/9/5k2r r'
+#A few pieces each, small enough to search every line
+SMALL_POSITIONS = ('4K4/9/3A5/9/4p4/9/4P4/9/4a4/4k4 b', '3K5/4A4/9/9/1c7/9/7N1/9/4k4/9 b',
+                   '9/5K3/9/2P6/9/8n/3P5/3ab4/5a3/5k3 b', MATE_IN_ONE)
+
+
+def random_game(seed, plies=GAME_PLIES, game_class=JanggiGame.JanggiGame):
+    """
+    Returns a game of game_class played plies random legal moves (captures preferred, so pieces
+    come off and games end) from the start position, or until it ends, and the list of positions
+    along the way as (notation, position hash) with the start first.
+    """
+    rng = random.Random(seed)
+    game = game_class()
+    positions = [(game.to_notation(), game.position_hash())]
+    for _ in range(plies):
+        if game.get_game_state() != 'UNFINISHED':
+            break
+        moves = game.generate_legal_moves(game.get_whose_turn(), True)
+        captures = [move for move in moves
+                    if move.origin != move.destination and game.get_square_codes()[move.destination]]
+        move = rng.choice(captures or moves)
+        game.make_move(JanggiGame.SQUARE_NAMES[move.origin], JanggiGame.SQUARE_NAMES[move.destination])
+        positions.append((game.to_notation(), game.position_hash()))
+    return game, positions
+
+
+class NotationTest(unittest.TestCase):
+    """to_notation, from_notation and position_hash agree with each other and with play."""
+
+    def test_start_position(self):
+        game = JanggiGame.JanggiGame()
+        self.assertEqual(game.to_notation(), JanggiGame.START_NOTATION)
+        loaded = JanggiGame.JanggiGame.from_notation(JanggiGame.START_NOTATION)
+        self.assertEqual(loaded.get_square_codes(), game.get_square_codes())
+        self.assertEqual(loaded.position_hash(), game.position_hash())
+
+    def test_round_trip_along_random_games(self):
+        for seed in GAME_SEEDS:
+            game, positions = random_game(seed)
+            for notation, position_hash in positions:
+                loaded = JanggiGame.JanggiGame.from_notation(notation)
+                self.assertEqual(loaded.to_notation(), notation)
+                self.assertEqual(loaded.position_hash(), position_hash)
+            self.assertEqual(loaded.get_game_state(), game.get_game_state())
+            self.assertEqual(loaded.get_whose_turn(), game.get_whose_turn())
+
+    def test_counters_are_optional(self):
+        loaded = JanggiGame.JanggiGame.from_notation(JanggiGame.START_NOTATION.rsplit(' ', 2)[0])
+        self.assertEqual(loaded.to_notation(), JanggiGame.START_NOTATION)
+        self.assertEqual(loaded.to_notation(counters=False), JanggiGame.START_NOTATION.rsplit(' ', 2)[0])
+
+    def test_checkmate_is_a_finished_game(self):
+        blue_to_move = JanggiGame.JanggiGame.from_notation(MATE_BOARD + ' b')
+        red_to_move = JanggiGame.JanggiGame.from_notation(MATE_BOARD + ' r')
+        for game in (blue_to_move, red_to_move):
+            self.assertEqual(game.get_game_state(), 'RED_WON')
+            self.assertEqual(game.get_whose_turn(), 'red')
+        self.assertEqual(blue_to_move.to_notation(), red_to_move.to_notation())
+        self.assertEqual(blue_to_move.position_hash(), red_to_move.position_hash())
+
+    def test_invalid_positions(self):
+        for notation in ('RBNA1ABNR/4K4 b',                                   #too few ranks
+                         JanggiGame.START_NOTATION.replace('4K4', '4K3'),     #short rank
+                         JanggiGame.START_NOTATION.replace('4K4', '9'),       #no blue general
+                         JanggiGame.START_NOTATION.replace('4K4', 'K8'),      #general out of the palace
+                         JanggiGame.START_NOTATION.replace(' b ', ' x '),     #no side to move
+                         '9/4K4/9/9/9/9/9/9/3k5/4r4 r'):                      #blue in check on red's turn
+            with self.assertRaises(ValueError, msg=notation):
+                JanggiGame.JanggiGame.from_notation(notation)
+
+
+def scratch_evaluation(game, color, weights=JanggiGame.DEFAULT_WEIGHTS):
+    """Returns the game's evaluation for color added up square by square from the weights."""
+    code_values = weights.get_code_values()
+    piece_square = weights.get_piece_square_codes()
+    score = 0
+    for square, code in enumerate(game.get_square_codes()):
+        if code:
+            value = code_values[code] + piece_square[code * JanggiGame.BOARD_SIZE + square]
+            score += value if code & JanggiGame.COLOR_MASK == JanggiGame.COLOR_CODES[color] else -value
+    return score
+
+
+class EvaluationTest(unittest.TestCase):
+    """The incrementally kept evaluation always equals one added up from scratch."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self._directory = directory.name
+
+    def assert_evaluation(self, game, weights=JanggiGame.DEFAULT_WEIGHTS):
+        for color in ('blue', 'red'):
+            self.assertEqual(game.evaluation(color), scratch_evaluation(game, color, weights), game.to_notation())
+
+    def load(self, weights):
+        """Writes weights to a JSON file and returns them read back with load_eval_weights."""
+        path = os.path.join(self._directory, 'weights.json')
+        with open(path, 'w') as weights_file:
+            json.dump(weights, weights_file)
+        return JanggiGame.load_eval_weights(path)
+
+    def replay(self, weights):
+        """Plays the random games through push_move on games using weights, takes them back part way and replays."""
+        for seed in GAME_SEEDS:
+            moves = random_game(seed)[0].get_move_history()
+            game = JanggiGame.JanggiGame(weights=weights)
+            rng = random.Random(seed)
+            for move in moves:
+                game.push_move(*move)
+                self.assert_evaluation(game, weights)
+                if rng.random() < 0.2:
+                    #Take back a few moves (captures included) and make them again
+                    undone = [game.pop_move() for _ in range(min(rng.randint(1, 4), len(game.get_move_history())))]
+                    self.assert_evaluation(game, weights)
+                    for _ in undone:
+                        game.push_move(*moves[len(game.get_move_history())])
+                        self.assert_evaluation(game, weights)
+            while game.get_move_history():
+                game.pop_move()
+                self.assert_evaluation(game, weights)
+            self.assertEqual(game.evaluation('blue'), JanggiGame.JanggiGame(weights=weights).evaluation('blue'))
+
+    def test_incremental_default_weights(self):
+        self.replay(JanggiGame.DEFAULT_WEIGHTS)
+
+    def test_incremental_loaded_weights(self):
+        self.replay(self.load({'piece_values': {'SOLDIER': 250, 'CANNON': 650},
+                               'piece_square': {'CANNON': [[row * 9 + col for col in range(9)] for row in range(10)]}}))
+
+    def test_load_eval_weights(self):
+        ramp = [[row * 9 + col for col in range(9)] for row in range(10)]
+        weights = self.load({'piece_values': {'SOLDIER': 250}, 'piece_square': {'CANNON': ramp}})
+        values = list(JanggiGame.DEFAULT_PIECE_VALUES)
+        values[JanggiGame.SOLDIER] = 250
+        self.assertEqual(weights.get_piece_values(), tuple(values))
+        self.assertEqual(weights.get_code_values()[JanggiGame.SOLDIER | JanggiGame.RED], 250)
+        piece_square = weights.get_piece_square_codes()
+        #Tables are listed from the owner's back rank: red's is rank 1, blue's rank 10
+        for name, row, col in (('a1', 0, 0), ('i1', 0, 8), ('e4', 3, 4), ('a10', 9, 0)):
+            square = JanggiGame.SQUARE_NAMES.index(name)
+            self.assertEqual(piece_square[(JanggiGame.CANNON | JanggiGame.RED) * JanggiGame.BOARD_SIZE + square],
+                             ramp[row][col], name)
+            self.assertEqual(piece_square[(JanggiGame.CANNON | JanggiGame.BLUE) * JanggiGame.BOARD_SIZE + square],
+                             ramp[9 - row][col], name)
+        #Tables that weren't given keep their defaults
+        self.assertEqual(piece_square, JanggiGame.EvalWeights(piece_square={'CANNON': ramp}).get_piece_square_codes())
+        self.assertEqual(self.load({}).get_piece_square_codes(), JanggiGame.DEFAULT_WEIGHTS.get_piece_square_codes())
+        #A game set up with the weights scores with them
+        game = JanggiGame.JanggiGame.from_notation(random_game(3, 40)[1][-1][0], weights=weights)
+        self.assertIs(game.get_weights(), weights)
+        self.assert_evaluation(game, weights)
+        for bad in ({'piece_square': {'CANNON': ramp[:9]}}, {'piece_square': {'CANNON': [row[:8] for row in ramp]}},
+                    {'piece_values': {'DRAGON': 900}}):
+            with self.assertRaises(ValueError, msg=str(bad)[:40]):
+                self.load(bad)
+
+
+class RecordTest(unittest.TestCase):
+    """Records survive encoding and an archive finds each of several games through its index."""
+
+    def setUp(self):
+        self._games = [random_game(seed)[0] for seed in GAME_SEEDS]
+        #One game from a set up position, part way through its move counters
+        notation = random_game(99, 30)[1][-1][0]
+        self._games.append(JanggiGame.JanggiGame.from_notation(notation))
+        self._games[-1].make_move('a1', 'a1')
+        self._records = [JanggiRecord.record_game(game, metadata={'game': number})
+                         for number, game in enumerate(self._games)]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self._directory = directory.name
+
+    def test_encode_decode(self):
+        for record in self._records:
+            self.assertEqual(JanggiRecord.decode_record(JanggiRecord.encode_record(record)), record)
+        #Records decode from anywhere in a buffer
+        data = b'padding' + JanggiRecord.encode_record(self._records[0])
+        self.assertEqual(JanggiRecord.decode_record(data, len(b'padding')), self._records[0])
+
+    def test_adjudicated_result(self):
+        record = JanggiRecord.record_game(self._games[0], 'DRAW')
+        self.assertEqual(JanggiRecord.decode_record(JanggiRecord.encode_record(record)).result, 'DRAW')
+        with self.assertRaises(ValueError):
+            JanggiRecord.encode_record(record._replace(result='ABANDONED'))
+
+    def test_metadata_limit(self):
+        record = self._records[0]
+        largest = record._replace(metadata={'note': 'x' * (JanggiRecord.MAX_METADATA_BYTES - len('{"note":""}'))})
+        self.assertEqual(JanggiRecord.decode_record(JanggiRecord.encode_record(largest)), largest)
+        with self.assertRaises(ValueError):
+            JanggiRecord.encode_record(largest._replace(metadata={'note': largest.metadata['note'] + 'x'}))
+
+    def test_counter_limits(self):
+        record = self._records[0]
+        for counters in ((JanggiRecord.MAX_COUNTER, JanggiRecord.MAX_COUNTER), (0, 0)):
+            fitting = record._replace(counters=counters)
+            self.assertEqual(JanggiRecord.decode_record(JanggiRecord.encode_record(fitting)), fitting)
+        for counters in ((JanggiRecord.MAX_COUNTER + 1, 1), (0, JanggiRecord.MAX_COUNTER + 1), (-1, 1), (0,)):
+            with self.assertRaises(ValueError, msg=str(counters)):
+                JanggiRecord.encode_record(record._replace(counters=counters))
+
+    def test_failed_pack_leaves_no_archive(self):
+        path = os.path.join(self._directory, 'games.jga')
+        with self.assertRaises(ValueError):
+            with JanggiRecord.ArchiveWriter(path) as writer:
+                writer.add(self._records[0])
+                writer.add(self._records[1]._replace(counters=(JanggiRecord.MAX_COUNTER + 1, 1)))
+        self.assertFalse(os.path.exists(path))
+        #Closing it first keeps what was written
+        with self.assertRaises(RuntimeError):
+            with JanggiRecord.ArchiveWriter(path) as writer:
+                writer.add(self._records[0])
+                writer.close()
+                raise RuntimeError("after closing")
+        with JanggiRecord.ArchiveReader(path) as reader:
+            self.assertEqual(list(reader), self._records[:1])
+
+    def test_archive_index(self):
+        path = os.path.join(self._directory, 'games.jga')
+        with JanggiRecord.ArchiveWriter(path) as writer:
+            for number, record in enumerate(self._records):
+                self.assertEqual(writer.add(record), number)
+        with JanggiRecord.ArchiveReader(path) as reader:
+            self.assertEqual(len(reader), len(self._records))
+            self.assertEqual(list(reader), self._records)
+            #Backwards, so every lookup goes through the index rather than following on
+            for number in reversed(range(len(self._records))):
+                record, game = self._records[number], self._games[number]
+                self.assertEqual(reader.record(number), record)
+                self.assertEqual(list(reader.moves(number)), record.moves)
+                header = reader.header(number)
+                self.assertEqual((header.result, header.turn, header.counters, header.move_count, header.metadata),
+                                 (record.result, record.turn, record.counters, len(record.moves), {'game': number}))
+                self.assertIsNone(reader.header(number, False).metadata)
+                start = reader.start_game(number)
+                self.assertEqual(start.to_notation(), JanggiGame.JanggiGame.from_square_codes(
+                    record.square_codes, record.turn, record.counters).to_notation())
+                for origin, destination in record.moves:
+                    start.make_move(JanggiGame.SQUARE_NAMES[origin], JanggiGame.SQUARE_NAMES[destination])
+                self.assertEqual(start.to_notation(), game.to_notation())
+                self.assertEqual(start.position_hash(), game.position_hash())
+
+    def test_not_an_archive(self):
+        complete = os.path.join(self._directory, 'games.jga')
+        with JanggiRecord.ArchiveWriter(complete) as writer:
+            for record in self._records:
+                writer.add(record)
+        with open(complete, 'rb') as file:
+            data = file.read()
+        for name, contents in (('empty.jga', b''),
+                               ('short.jga', JanggiRecord.ARCHIVE_MAGIC),
+                               ('unindexed.jga', data[:-JanggiRecord._FOOTER.size])):
+            path = os.path.join(self._directory, name)
+            with open(path, 'wb') as file:
+                file.write(contents)
+            with self.assertRaises(ValueError, msg=name):
+                JanggiRecord.ArchiveReader(path)
+
+
+class TranspositionTableTest(unittest.TestCase):
+    """Entries come back out of the packed table as they went in."""
+
+    def setUp(self):
+        self._table = JanggiAi.TranspositionTable(1)
+        self._keys = sorted({position_hash for _, position_hash in random_game(0)[1]})
+
+    def test_store_probe(self):
+        scores = (0, 1, -1, 12345, -12345, JanggiAi.MATE_SCORE, -JanggiAi.MATE_SCORE,
+                  JanggiAi.MATE_SCORE - 7, -JanggiAi.MATE_SCORE + 7)
+        bounds = (JanggiAi.EXACT_BOUND, JanggiAi.LOWER_BOUND, JanggiAi.UPPER_BOUND)
+        moves = (None, JanggiGame.Move(0, 1), JanggiGame.Move(89, 88), JanggiGame.PASS_MOVE)
+        for number, score in enumerate(scores):
+            for bound in bounds:
+                for move in moves:
+                    key = self._keys[number]
+                    depth = number % JanggiAi.MAX_SEARCH_DEPTH + 1
+                    self._table.store(key, depth, score, bound, move)
+                    self.assertEqual(self._table.probe(key), (depth, score, bound, move))
+
+    def test_missing_and_cleared(self):
+        for key in self._keys:
+            self.assertIsNone(self._table.probe(key))
+        for key in self._keys:
+            self._table.store(key, 3, -250, JanggiAi.UPPER_BOUND, None)
+        self.assertEqual(self._table.probe(self._keys[0]), (3, -250, JanggiAi.UPPER_BOUND, None))
+        self._table.clear()
+        for key in self._keys:
+            self.assertIsNone(self._table.probe(key))
+
+    def test_bucket_keeps_deeper_result(self):
+        buckets = len(self._table) // 2
+        deep, shallow, newer = 5, 5 + buckets, 5 + 2 * buckets
+        self._table.store(deep, 8, 100, JanggiAi.EXACT_BOUND, None)
+        self._table.store(shallow, 2, -100, JanggiAi.LOWER_BOUND, None)
+        self.assertEqual(self._table.probe(deep), (8, 100, JanggiAi.EXACT_BOUND, None))
+        self.assertEqual(self._table.probe(shallow), (2, -100, JanggiAi.LOWER_BOUND, None))
+        #The second slot is always replaced
+        self._table.store(newer, 1, 0, JanggiAi.UPPER_BOUND, None)
+        self.assertIsNone(self._table.probe(shallow))
+        self.assertEqual(self._table.probe(deep)[0], 8)
+        #A later search may overwrite the deep result
+        self._table.new_search()
+        self._table.store(shallow, 2, -100, JanggiAi.LOWER_BOUND, None)
+        self.assertIsNone(self._table.probe(deep))
+
+
+class BitboardTest(unittest.TestCase):
+    """BitboardJanggiGame generates exactly JanggiGame's moves, checks and hashes."""
+
+    def assert_same_position(self, game, bitboard):
+        self.assertEqual(bitboard.to_notation(), game.to_notation())
+        self.assertEqual(bitboard.position_hash(), game.position_hash())
+        bitboard._check_consistency()
+        for square in range(JanggiGame.BOARD_SIZE):
+            self.assertEqual(sorted(bitboard._list_moves(square)), sorted(game._list_moves(square)),
+                             JanggiGame.SQUARE_NAMES[square])
+        for color in ('blue', 'red'):
+            self.assertEqual(bitboard.is_in_check(color), game.is_in_check(color))
+        turn = game.get_whose_turn()
+        self.assertEqual(set(bitboard.generate_legal_moves(turn, True)), set(game.generate_legal_moves(turn, True)))
+
+    def test_random_games(self):
+        for seed in GAME_SEEDS:
+            game = random_game(seed)[0]
+            bitboard = JanggiBitboard.BitboardJanggiGame()
+            replay = JanggiGame.JanggiGame()
+            self.assert_same_position(replay, bitboard)
+            for origin, destination in game.get_move_history():
+                for player in (replay, bitboard):
+                    player.make_move(JanggiGame.SQUARE_NAMES[origin], JanggiGame.SQUARE_NAMES[destination])
+                self.assert_same_position(replay, bitboard)
+            self.assertEqual(bitboard.get_game_state(), game.get_game_state())
+            #Every legal move made and taken back leaves the bitboards matching the board
+            for move in bitboard.generate_legal_moves(bitboard.get_whose_turn(), True):
+                bitboard.push_move(*move)
+                bitboard._check_consistency()
+                bitboard.pop_move()
+            self.assert_same_position(replay, bitboard)
+
+    def test_set_up_positions(self):
+        for seed in GAME_SEEDS:
+            notation = random_game(seed, GAME_PLIES // 2)[1][-1][0]
+            self.assert_same_position(JanggiGame.JanggiGame.from_notation(notation),
+                                      JanggiBitboard.BitboardJanggiGame.from_notation(notation))
+
+
+class MoveCacheTest(unittest.TestCase):
+    """The move list cache changes how fast moves are listed, never which, and counts what it does."""
+
+    def test_same_moves_with_cache_on(self):
+        for seed in GAME_SEEDS[:4]:
+            moves = random_game(seed)[0].get_move_history()
+            uncached = JanggiGame.JanggiGame()
+            cached = JanggiGame.JanggiGame()
+            cached.set_move_cache_size(64)
+            #Forward through the game and back again, so positions come round after pop_move too
+            for step in list(moves) + [None] * len(moves):
+                for game in (uncached, cached):
+                    if step is None:
+                        game.pop_move()
+                    else:
+                        game.push_move(*step)
+                for square in range(JanggiGame.BOARD_SIZE):
+                    self.assertEqual(cached._list_moves(square), uncached._list_moves(square))
+            self.assertEqual(cached.to_notation(), JanggiGame.START_NOTATION)
+            hits, misses, held = cached.get_move_cache_stats()
+            self.assertGreater(hits, 0)
+            self.assertEqual(held, 64)
+
+    def test_counters(self):
+        game = JanggiGame.JanggiGame()
+        game.set_move_cache_size(2)
+        chariot, horse, cannon, empty = (JanggiGame.SQUARE_NAMES.index(name) for name in ('a1', 'b1', 'b3', 'e5'))
+        self.assertEqual(game._list_moves(empty), [])
+        self.assertEqual(game.get_move_cache_stats(), (0, 0, 0))
+        game._list_moves(chariot)
+        game._list_moves(chariot)
+        self.assertEqual(game.get_move_cache_stats(), (1, 1, 1))
+        game._list_moves(horse)
+        game._list_moves(chariot)
+        #Holding two lists, the horse's is now the least recently used and makes way for the cannon's
+        game._list_moves(cannon)
+        game._list_moves(chariot)
+        self.assertEqual(game.get_move_cache_stats(), (3, 3, 2))
+        game._list_moves(horse)
+        self.assertEqual(game.get_move_cache_stats(), (3, 4, 2))
+        #After a move the position's lists are new, taking it back finds the old ones again
+        game.push_move(chariot, JanggiGame.SQUARE_NAMES.index('a2'))
+        game._list_moves(horse)
+        self.assertEqual(game.get_move_cache_stats(), (3, 5, 2))
+        game.pop_move()
+        game._list_moves(horse)
+        self.assertEqual(game.get_move_cache_stats(), (4, 5, 2))
+        game.set_move_cache_size(1)
+        self.assertEqual(game.get_move_cache_stats(), (4, 5, 1))
+        game.clear_move_cache()
+        self.assertEqual(game.get_move_cache_stats(), (0, 0, 0))
+
+    def test_off_counts_nothing(self):
+        with mock.patch.object(JanggiGame, 'MOVE_CACHE_SIZE', 0):
+            game = random_game(0)[0]
+        self.assertEqual(game.get_move_cache_stats(), (0, 0, 0))
+        with mock.patch.object(JanggiGame, 'MOVE_CACHE_SIZE', 16):
+            game = random_game(0)[0]
+        hits, misses, held = game.get_move_cache_stats()
+        self.assertGreater(misses, 0)
+        self.assertEqual(held, 16)
+        game.set_move_cache_size(0)
+        game.clear_move_cache()
+        game.generate_legal_moves(game.get_whose_turn(), True)
+        self.assertEqual(game.get_move_cache_stats(), (0, 0, 0))
+
+
+def minimax(board, depth, ply=0):
+    """
+    Returns the score of the position for the player to move searched depth plies deep trying every
+    move (and pass), scored as JanggiAi.search scores them, without any pruning.
+    """
+    color = board.get_whose_turn()
+    if depth == 0:
+        return JanggiAi.evaluate(board, color)
+    moves = board.generate_legal_moves(color, True)
+    if not moves:
+        return -JanggiAi.MATE_SCORE + ply
+    scores = list()
+    for move in moves:
+        board.push_move(*move)
+        scores.append(-minimax(board, depth - 1, ply + 1))
+        board.pop_move()
+    return max(scores)
+
+
+class SearchTest(unittest.TestCase):
+    """The alpha-beta search finds what a full search would, serially and across processes."""
+
+    def test_mate_in_one(self):
+        board = JanggiGame.JanggiGame.from_notation(MATE_IN_ONE)
+        result = JanggiAi.search(board, 3)
+        self.assertEqual(result.move, JanggiGame.Move(JanggiGame.SQUARE_NAMES.index('i1'),
+                                                      JanggiGame.SQUARE_NAMES.index('i10')))
+        self.assertEqual(result.score, JanggiAi.MATE_SCORE - 1)
+        #Searched from the mated side, which has no move left to play
+        board.push_move(*result.move)
+        self.assertEqual(JanggiAi.search(board, 3), JanggiAi.SearchResult(None, -JanggiAi.MATE_SCORE, 0, [], 0))
+        board.pop_move()
+        board.make_move('i1', 'i10')
+        self.assertEqual(board.get_game_state(), 'RED_WON')
+
+    def test_same_as_minimax(self):
+        for notation in SMALL_POSITIONS:
+            for depth in (1, 2, 3):
+                board = JanggiGame.JanggiGame.from_notation(notation)
+                score = minimax(board, depth)
+                result = JanggiAi.search(board, depth)
+                self.assertEqual(result.score, score, (notation, depth))
+                self.assertEqual(board.to_notation(counters=False), notation)
+                #The move it chose is worth that score
+                board.push_move(*result.move)
+                self.assertEqual(-minimax(board, depth - 1, 1), score, (notation, depth))
+
+    def test_parallel_matches_serial(self):
+        with JanggiAi.make_search_pool(2) as pool:
+            for seed in GAME_SEEDS[:4]:
+                notation = random_game(seed, 20 + 6 * seed)[1][-1][0]
+                board = JanggiGame.JanggiGame.from_notation(notation)
+                serial = JanggiAi.search(board, 3)
+                parallel = JanggiAi.search_parallel(board, 3, pool=pool)
+                self.assertEqual((parallel.score, parallel.depth), (serial.score, serial.depth))
+                self.assertIn(parallel.move, JanggiAi.search_moves(board))
+                #Which worker searched each root move makes no difference
+                self.assertEqual(JanggiAi.search_parallel(board, 3, workers=1), parallel)
+                self.assertEqual(board.to_notation(), notation)
+
+
+if __name__ == "__main__":
+    unittest.main()